@@ -0,0 +1,120 @@
+# 시작 전 1회 실행하는 스레드 수 / 배치 크기 / 워커 수 보정 (calibration)
+# - 스레드 수 × 배치 크기마다 인코딩(SBERT)과 검색(FAISS) 처리량/지연을 짧게 측정
+# - 워커 수 w = vcpu // 스레드 수로 보고 (요청당 인코딩+검색) 합계 처리량이 가장 큰 스레드 수 선택
+#   (워커 수를 고정하면 그 안에서만 고름), 배치 크기는 그 스레드 수에서 최대 처리량의 90%를 내는 가장 작은 값
+# - --write 이면 CPU_TUNING_PROFILE(기본 data/cpu_profile.json)에 저장 → 이후 시작 시 apply_cpu_tuning이 사용
+#
+# 실행: python -m api.core.auto_tune --workers 4 --write
+
+import argparse
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from api.core.cpu_tuning import hardware_fingerprint, save_profile, set_library_threads
+
+EncodeFn = Callable[..., Any]  # (texts, batch_size=) → (n, dim) 벡터
+SearchFn = Callable[[np.ndarray], Any]  # (b, dim) 쿼리 → 결과
+
+
+def _measure(fn: Callable[[], Any], seconds: float) -> List[float]:
+    # 최소 3회, seconds 동안 반복 실행한 회당 시간
+    fn()  # 첫 실행(스레드 풀 생성 등) 제외
+    times = []
+    until = time.perf_counter() + seconds
+    while len(times) < 3 or time.perf_counter() < until:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def sweep(encode: EncodeFn, search: SearchFn, dim: int, threads: List[int], batches: List[int],
+          seconds: float = 1.0, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """스레드 수 × 배치 크기별 인코딩/검색 처리량(건/초)과 회당 지연(ms)"""
+    rng = np.random.default_rng(0)
+    rows = []
+    for t in threads:
+        set_library_threads(t, t)
+        for b in batches:
+            texts = [f"창업 아이디어 {i} 기반 서비스 플랫폼 개발" for i in range(b)]
+            enc = max(1e-9, float(np.median(_measure(lambda: encode(texts, batch_size=b), seconds))))
+            q = rng.standard_normal((b, dim)).astype("float32")
+            q /= np.linalg.norm(q, axis=1, keepdims=True)
+            srch = max(1e-9, float(np.median(_measure(lambda: search(q), seconds))))
+            row = {"threads": t, "batch": b,
+                   "encode_per_s": round(b / enc, 1), "encode_ms": round(enc * 1000, 2),
+                   "search_per_s": round(b / srch, 1), "search_ms": round(srch * 1000, 2),
+                   "per_s": round(b / (enc + srch), 1)}  # 요청 1건 = 인코딩 + 검색
+            rows.append(row)
+            if progress is not None:
+                progress(row)
+    return rows
+
+
+def choose(rows: List[Dict[str, Any]], vcpu: int, workers: Optional[int] = None) -> Dict[str, Any]:
+    """측정 결과 → 스레드 수 / 워커 수 / SIMILAR_BATCH_MAX (같으면 스레드 적은 쪽)"""
+    best: Optional[Dict[str, Any]] = None
+    for t in sorted({r["threads"] for r in rows}):
+        procs = workers or max(1, vcpu // t)
+        if t * procs > vcpu and t > 1:
+            continue  # 워커 × 스레드가 vCPU를 넘으면 서로 다툼
+        at_t = [r for r in rows if r["threads"] == t]
+        peak = max(r["per_s"] for r in at_t)
+        batch = min(r["batch"] for r in at_t if r["per_s"] >= 0.9 * peak)
+        total = procs * peak
+        if best is None or total > best["predicted_per_s"]:
+            best = {"threads": t, "workers": procs, "similar_batch_max": batch, "predicted_per_s": round(total, 1)}
+    if best is None:
+        raise ValueError("측정 결과 없음")
+    return best
+
+
+def _print_curve(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'threads':>7} {'batch':>5} {'encode/s':>9} {'encode ms':>9} {'search/s':>9} {'search ms':>9} {'req/s':>8}")
+    for r in rows:
+        print(f"{r['threads']:>7} {r['batch']:>5} {r['encode_per_s']:>9.1f} {r['encode_ms']:>9.2f} "
+              f"{r['search_per_s']:>9.1f} {r['search_ms']:>9.2f} {r['per_s']:>8.1f}")
+
+
+def main() -> None:
+    vcpu = int(os.getenv("VCPU", os.cpu_count() or 1))
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=int(os.getenv("APP_WORKERS", "0")),
+                    help="워커 수 고정 (0이면 vcpu // 스레드 수로 같이 고름)")
+    ap.add_argument("--threads", default=",".join(str(t) for t in (1, 2, 4, 8, 16, 32, 64) if t <= vcpu))
+    ap.add_argument("--batches", default="1,8,32,64")
+    ap.add_argument("--corpus", type=int, default=20000, help="검색 측정용 합성 인덱스 크기")
+    ap.add_argument("--seconds", type=float, default=1.0, help="측정 지점당 시간")
+    ap.add_argument("--profile", default=os.getenv("CPU_TUNING_PROFILE", "data/cpu_profile.json"))
+    ap.add_argument("--write", action="store_true", help="결과를 프로파일로 저장")
+    args = ap.parse_args()
+
+    import api.embedding.vectorizer as vectorizer
+    from api.embedding.faiss_store import FaissStore
+
+    vectorizer.EMBED_SERVER_SOCKET = ""  # 이 프로세스의 모델로 측정
+    dim = vectorizer.embedding_dimension()
+    vecs = np.random.default_rng(1).standard_normal((args.corpus, dim)).astype("float32")
+    store = FaissStore(index_path="", dim=dim)
+    store.clear()
+    store.add_with_external_ids(vecs, [str(100000 + i) for i in range(args.corpus)])
+
+    threads = [int(t) for t in args.threads.split(",")]
+    batches = [int(b) for b in args.batches.split(",")]
+    print(f"vcpu={vcpu} backend={vectorizer.EMBED_BACKEND} corpus={args.corpus} dim={dim}")
+    rows = sweep(vectorizer.embed_texts, lambda q: store.search(q, top_k=30), dim, threads, batches, args.seconds)
+    _print_curve(rows)
+    best = choose(rows, vcpu, args.workers or None)
+    print(f"선택: threads={best['threads']} workers={best['workers']} "
+          f"SIMILAR_BATCH_MAX={best['similar_batch_max']} (예상 {best['predicted_per_s']} req/s)")
+    if args.write:
+        save_profile(args.profile, {**best, "fingerprint": hardware_fingerprint(vcpu),
+                                    "backend": vectorizer.EMBED_BACKEND, "created": int(time.time()), "curve": rows})
+        print(f"저장: {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
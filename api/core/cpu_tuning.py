@@ -1,5 +1,9 @@
 # CPU/스레드 튜닝: 한 곳에서 통제
+# - 기본은 고정 공식 (vcpu // workers, THREADS_PER_WORKER_CAP 이하)
+# - 보정 프로파일(python -m api.core.auto_tune --write 결과)이 있고 같은 하드웨어에서 만든 것이면 그 값을 사용
 import os
+import sys
+import json
 import platform
 import multiprocessing
 import logging
@@ -11,6 +15,56 @@ def _setenv(key: str, val: int | str):
     # 값이 이미 있으면 건들이지 않음
     os.environ.setdefault(key, str(val))
 
+def hardware_fingerprint(vcpu: int) -> dict:
+    # 프로파일을 만든 하드웨어와 같은지 비교용 (vCPU 수 + 아키텍처 + CPU 모델명)
+    model = ""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        model = platform.processor()
+    return {"vcpu": vcpu, "machine": platform.machine(), "cpu": model}
+
+def load_profile(path: str, vcpu: int) -> dict | None:
+    # 없거나 깨졌거나 다른 하드웨어에서 만든 프로파일은 무시 (고정 공식으로)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"[cpu]: 프로파일 읽기 실패, 무시: {path} ({e})")
+        return None
+    if profile.get("fingerprint") != hardware_fingerprint(vcpu):
+        log.info(f"[cpu]: 다른 하드웨어에서 만든 프로파일 무시: {path}")
+        return None
+    return profile
+
+def save_profile(path: str, profile: dict) -> None:
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def set_library_threads(torch_threads: int, faiss_threads: int) -> None:
+    # 이미 로드된 라이브러리에 스레드 수 직접 지정 (torch는 TORCH_NUM_THREADS env를 읽지 않음)
+    torch = sys.modules.get("torch")  # 임베딩 서버를 쓰는 워커처럼 torch를 안 올린 프로세스는 건너뜀
+    if torch is not None and torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+    if faiss_threads > 0:
+        import faiss
+        faiss.omp_set_num_threads(faiss_threads)
+
+def apply_runtime_threads() -> None:
+    # apply_cpu_tuning이 정한 env 값을 라이브러리 import 이후에 반영 (시작 시 + 모델 로드 직후 호출)
+    set_library_threads(int(os.getenv("TORCH_NUM_THREADS", "0")), int(os.getenv("FAISS_NUM_THREADS", "0")))
+
 def apply_cpu_tuning(default_workers: int | None = None) -> None:
     # 필요하면 끄기
     if os.getenv("ENABLE_CPU_TUNING", "1") in ("0", "false", "False"):
@@ -20,9 +74,16 @@ def apply_cpu_tuning(default_workers: int | None = None) -> None:
     vcpu = int(os.getenv("VCPU", multiprocessing.cpu_count()))
     workers = int(os.getenv("APP_WORKERS", default_workers or 1))
 
+    profile = load_profile(os.getenv("CPU_TUNING_PROFILE", "data/cpu_profile.json"), vcpu)
+
     # macOS는 OpenMP 충돌 방지 위해 1스레드 고정
     if IS_DARWIN:
         per = 1
+    elif profile:
+        # 보정 결과 (워커 수가 프로파일과 달라도 vCPU를 넘기지 않게)
+        per = max(1, min(int(profile["threads"]), vcpu // max(1, workers)))
+        if profile.get("similar_batch_max"):
+            _setenv("SIMILAR_BATCH_MAX", profile["similar_batch_max"])
     else:
         per = max(1, vcpu // max(1, workers))
         per = min(per, int(os.getenv("THREADS_PER_WORKER_CAP", "4")))
@@ -50,4 +111,4 @@ def apply_cpu_tuning(default_workers: int | None = None) -> None:
             log.warning("cpu: KMP_DUPLICATE_LIB_OK=TRUE 사용됨(개발용)")
 
     # 로깅
-    log.info(f"[cpu]: per={per}, [workers]={workers}, [vcpu]={vcpu}, [darwin]={IS_DARWIN}")
+    log.info(f"[cpu]: per={per}, [workers]={workers}, [vcpu]={vcpu}, [darwin]={IS_DARWIN}, [profile]={bool(profile)}")
@@ -0,0 +1,215 @@
+# 동시 요청 묶음 처리(micro-batching) + 추론 실행 제한(backpressure)
+# - /ai/similar는 sync def라 FastAPI 스레드풀에서 요청마다 따로 실행 → 1건짜리 인코딩/검색이 동시에 여러 개 돌며 OMP 스레드를 다툼
+# - 요청 스레드가 직접 처리하는 리더/팔로워 방식 (별도 워커 스레드 없음)
+#   실행 중인 묶음이 INFERENCE_WORKERS개 미만이면 도착한 스레드가 리더가 되어 바로 실행, 아니면 대기열에 쌓였다가
+#   다음 리더가 최대 SIMILAR_BATCH_MAX개까지 한 번에 처리 → 한가할 때는 지연 추가 없음, 붐빌수록 묶음이 커짐
+# - SIMILAR_BATCH_WINDOW_MS > 0이면 리더가 그 시간만큼 더 기다려 모은 뒤 실행 (지연 ↔ 묶음 크기)
+# - 대기열은 INFERENCE_QUEUE_MAX개까지(빈 대기열이면 그보다 큰 배치도 받음): 넘치면 바로 429, 예상 대기가 INFERENCE_DEADLINE_MS를 넘으면 바로 503
+#   (둘 다 Retry-After 초 포함), 대기 중에 기한이 지나면 그 자리에서 503 (이미 실행 중인 묶음은 끝까지 기다림)
+# - 묶음 처리 중 예외는 그 묶음의 모든 요청에 그대로 전달
+# - /ai/similar(services)와 공유 임베딩 서버(embedding) 양쪽에서 쓰므로 core에 둠
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+SIMILAR_BATCHING = os.getenv("SIMILAR_BATCHING", "1") not in ("0", "false", "False")
+SIMILAR_BATCH_MAX = int(os.getenv("SIMILAR_BATCH_MAX", "32"))
+SIMILAR_BATCH_WINDOW_MS = float(os.getenv("SIMILAR_BATCH_WINDOW_MS", "0"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))  # 동시에 실행하는 묶음 수 (스레드 예산을 나눠 씀)
+INFERENCE_QUEUE_MAX = int(os.getenv("INFERENCE_QUEUE_MAX", "128"))  # 0이면 제한 없음
+INFERENCE_DEADLINE_MS = float(os.getenv("INFERENCE_DEADLINE_MS", "2000"))  # 요청당 대기열 대기 기한 (실행 시작까지), 0이면 없음
+
+_WAIT_SAMPLES = 1024  # 대기 시간 분위수 계산용 최근 표본 수
+_EWMA_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나(429) 기한 안에 처리할 수 없음(503) - retry_after초 뒤 재시도 권장"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Slot:
+    __slots__ = ("item", "result", "error", "done", "taken", "enqueued", "deadline")
+
+    def __init__(self, item: Any, enqueued: float, deadline: Optional[float]):
+        self.item = item
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.taken = False  # 리더가 묶음으로 가져감 (이후로는 기한이 지나도 결과를 기다림)
+        self.enqueued = enqueued
+        self.deadline = deadline
+
+
+class QueryBatcher:
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch: int = SIMILAR_BATCH_MAX, window_ms: float = SIMILAR_BATCH_WINDOW_MS,
+                 workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_QUEUE_MAX,
+                 deadline_ms: float = INFERENCE_DEADLINE_MS):
+        self._run_batch = run_batch  # 요청 리스트 → 같은 순서의 결과 리스트
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window_ms) / 1000.0
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.deadline = max(0.0, deadline_ms) / 1000.0
+        self._cv = threading.Condition()
+        self._pending: List[_Slot] = []
+        self._running = 0  # 실행 중인 묶음 수
+        self._batch_seconds = 0.0  # 묶음 1회 실행 시간 EWMA (예상 대기 계산용)
+        self._waits: deque = deque(maxlen=_WAIT_SAMPLES)
+        self._batches = 0
+        self._items = 0
+        self._largest = 0
+        self._rejected_full = 0
+        self._rejected_deadline = 0
+        self._expired = 0
+
+    def submit(self, item: Any) -> Any:
+        """요청 1건 처리 (다른 스레드의 요청과 묶여서 실행될 수 있음, 결과가 나올 때까지 대기)"""
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: List[Any]) -> List[Any]:
+        """
+        요청 여러 건을 한 번에 대기열에 넣고 모두 끝날 때까지 대기 (배치 API용, 들어갈 자리가 없으면 전부 거절)
+        - Overloaded: 대기열 초과(429) / 예상 대기가 기한 초과(503) / 대기 중 기한 만료(503)
+        """
+        now = time.monotonic()
+        with self._cv:
+            self._admit(len(items))
+            deadline = now + self.deadline if self.deadline > 0 else None
+            slots = [_Slot(item, now, deadline) for item in items]
+            self._pending.extend(slots)
+            while not all(s.done for s in slots):
+                if self._running < self.workers and self._pending:
+                    self._lead()
+                    continue
+                self._wait_or_expire(slots)
+        for s in slots:
+            if s.error is not None:
+                raise s.error
+        return [s.result for s in slots]
+
+    # ---------- 내부 (모두 락을 잡은 상태에서 호출) ----------
+    def _admit(self, n: int) -> None:
+        # 대기열 한도보다 큰 배치 요청도 빈 대기열이면 받음 (아니면 재시도해도 계속 429)
+        # 기한은 이 요청의 첫 묶음이 시작될 때까지로 판단 (나머지 묶음은 요청 스레드가 이어서 실행)
+        depth = len(self._pending)
+        if self.max_queue and depth and depth + n > self.max_queue:
+            self._rejected_full += 1
+            raise Overloaded(429, self._retry_after(depth), "추론 대기열이 가득 참")
+        if self.deadline > 0 and self._estimated_wait(depth + min(n, self.max_batch)) > self.deadline:
+            self._rejected_deadline += 1
+            raise Overloaded(503, self._retry_after(depth), "기한 안에 처리할 수 없음")
+
+    def _estimated_wait(self, depth: int) -> float:
+        # 앞에 쌓인 요청이 묶음 몇 번 뒤에 실행되는지 × 묶음 시간 (빈 실행 자리는 바로 시작, 실행 중인 묶음은 반쯤 끝났다고 봄)
+        free = self.workers - self._running
+        rounds = max(0, math.ceil(depth / self.max_batch) - max(0, free)) / self.workers
+        if free <= 0:
+            rounds += 0.5
+        return rounds * self._batch_seconds
+
+    def _retry_after(self, depth: int) -> int:
+        return max(1, math.ceil(self._estimated_wait(depth)))
+
+    def _wait_or_expire(self, slots: List[_Slot]) -> None:
+        deadline = min((s.deadline for s in slots if not s.taken and s.deadline is not None), default=None)
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if timeout == 0.0 or not self._cv.wait(timeout):
+            if deadline is not None and time.monotonic() >= deadline:
+                self._expire(slots)
+
+    def _expire(self, slots: List[_Slot]) -> None:
+        # 아직 묶음으로 안 넘어간 요청만 대기열에서 빼고 503
+        expired = [s for s in slots if not s.taken and not s.done]
+        if not expired:
+            return
+        gone = set(map(id, expired))
+        self._pending = [s for s in self._pending if id(s) not in gone]
+        for s in expired:
+            s.error = Overloaded(503, self._retry_after(len(self._pending)), "대기 중 기한 초과")
+            s.done = True
+        self._expired += len(expired)
+
+    def _lead(self) -> None:
+        self._running += 1
+        batch = self._take_batch()
+        self._cv.release()
+        try:
+            started = time.perf_counter()
+            self._run(batch)
+            elapsed = time.perf_counter() - started
+        finally:
+            self._cv.acquire()
+            self._running -= 1
+            self._cv.notify_all()  # 결과 받은 팔로워 깨우기 + 남은 요청 중 다음 리더
+        if batch:
+            a = _EWMA_ALPHA if self._batches else 1.0
+            self._batch_seconds = (1 - a) * self._batch_seconds + a * elapsed
+            self._batches += 1
+            self._items += len(batch)
+            self._largest = max(self._largest, len(batch))
+
+    def _take_batch(self) -> List[_Slot]:
+        # 모으는 시간 동안은 wait로 락을 풀어 다른 요청이 대기열에 들어오게 함
+        if self.window > 0:
+            until = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch:
+                left = until - time.monotonic()
+                if left <= 0:
+                    break
+                self._cv.wait(left)
+        batch = self._pending[:self.max_batch]
+        del self._pending[:self.max_batch]
+        now = time.monotonic()
+        for s in batch:
+            s.taken = True
+            self._waits.append(now - s.enqueued)
+        return batch
+
+    def _run(self, batch: List[_Slot]) -> None:
+        # 락 밖에서 실행
+        if not batch:
+            return
+        try:
+            results = self._run_batch([s.item for s in batch])
+            for s, r in zip(batch, results):
+                s.result = r
+        except BaseException as e:
+            for s in batch:
+                s.error = e
+        for s in batch:
+            s.done = True
+
+    # ---------- 지표 ----------
+    def stats(self) -> Dict[str, Any]:
+        with self._cv:
+            waits = np.asarray(self._waits, dtype=np.float64) * 1000.0
+            return {
+                "queue_depth": len(self._pending),
+                "running_batches": self._running,
+                "batches": self._batches,
+                "requests": self._items,
+                "avg_batch": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "max_batch": self._largest,
+                "batch_ms_ewma": round(self._batch_seconds * 1000.0, 2),
+                "wait_ms_p50": round(float(np.percentile(waits, 50)), 2) if len(waits) else 0.0,
+                "wait_ms_p99": round(float(np.percentile(waits, 99)), 2) if len(waits) else 0.0,
+                "rejected_queue_full": self._rejected_full,
+                "rejected_deadline": self._rejected_deadline,
+                "expired_in_queue": self._expired,
+                "config": {"max_batch_size": self.max_batch, "window_ms": self.window * 1000.0,
+                           "workers": self.workers, "max_queue": self.max_queue,
+                           "deadline_ms": self.deadline * 1000.0},
+            }
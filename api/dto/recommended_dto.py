@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 # 창업 지원 사업 추천 Request
@@ -10,3 +10,7 @@ class StartupRequestDTO(BaseModel):
 class SimilarSupportDTO(BaseModel):
     external_ref: str
     score: float  # 코사인 유사도(내적값)
+
+# 창업 지원 사업 일괄 추천 Request (아이디어 여러 개를 한 번에)
+class StartupBatchRequestDTO(BaseModel):
+    ideas: List[StartupRequestDTO] = Field(min_length=1, max_length=100)
@@ -8,6 +8,8 @@ class StartupSupportSyncRequest(BaseModel):
     after_external_ref: Optional[str] = Field(default=None, alias="afterExternalRef")
     # 마감일이 지나 삭제할 공고 k-startup Key
     expired_external_refs: Optional[List[str]] = Field(default=None, alias="expiredExternalRefs")
+    # true면 원본 저장소 기준 신규/변경 공고만 반환 (변경 없는 공고가 이어지면 수집 중단)
+    changed_only: bool = Field(default=False, alias="changedOnly")
     model_config = ConfigDict(populate_by_name=True)  # snake/camel 모두 허용
 
 # Response
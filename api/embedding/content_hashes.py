@@ -0,0 +1,66 @@
+# external_ref → 내용 해시 테이블
+# - 해시 = sha1(모델 식별자(출처+백엔드) + 색인 텍스트(제목+본문)) → 모델/백엔드가 바뀌면 전부 다시 임베딩
+# - 동기화 때 해시가 같은 공고는 임베딩/FAISS 삭제·재추가를 모두 생략
+# - FaissStore가 인덱스와 같이 들고 있다가 같은 버전 파일로 저장 (manifest로 함께 게시)
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional
+
+from api.embedding.index_files import atomic_write
+
+
+def content_hash(text: str, model_name: str) -> str:
+    h = hashlib.sha1()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def hashes_path(index_path: str) -> str:
+    return f"{index_path}.hashes.json"
+
+
+class ContentHashTable:
+    def __init__(self, data: Optional[Dict[str, str]] = None):
+        self._data: Dict[str, str] = data if data is not None else {}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, ref: str) -> Optional[str]:
+        return self._data.get(ref)
+
+    def copy(self) -> "ContentHashTable":
+        return ContentHashTable(dict(self._data))
+
+    def unchanged(self, refs: List[str], hashes: List[str]) -> List[bool]:
+        """ref별로 저장된 해시와 같은지 (없는 ref는 False)"""
+        return [self._data.get(r) == h for r, h in zip(refs, hashes)]
+
+    def update(self, refs: Iterable[str], hashes: Iterable[str]) -> None:
+        self._data.update(zip(refs, hashes))
+
+    def remove(self, refs: Iterable[str]) -> None:
+        for r in refs:
+            self._data.pop(r, None)
+
+    def clear(self) -> None:
+        self._data = {}
+
+    # ---------- 파일 ----------
+    def load(self, path: str) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, path: str) -> None:
+        def _write(tmp: str) -> None:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, separators=(",", ":"))
+
+        atomic_write(path, _write)
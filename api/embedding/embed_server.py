@@ -0,0 +1,313 @@
+# 여러 uvicorn 워커가 함께 쓰는 로컬 임베딩 서버 (모델 1개, Unix 소켓 + 공유 메모리)
+# - APP_WORKERS>1이면 워커마다 모델을 따로 올리고 vCPU를 나눠 써서, 워커끼리는 요청을 묶지 못함
+# - 서버 프로세스 하나가 모델을 갖고 모든 워커의 요청을 QueryBatcher로 묶어 한 번에 인코딩
+# - 텍스트는 소켓(길이 접두 JSON)으로 받고, 결과 벡터는 워커가 만든 공유 메모리에 바로 써서 돌려줌
+# - 워커는 EMBED_SERVER_SOCKET만 설정하면 embed_texts / count_tokens / embedding_dimension이 서버를 거침
+# - 워커의 모델 식별자(vectorizer.MODEL_ID: 내용 해시/쿼리 캐시 키/manifest에 쓰임)가 서버 모델과 다르면 첫 호출에서 실패
+#   (.env가 어긋나 서로 다른 임베딩 공간의 벡터가 한 인덱스에 섞이는 것 방지)
+#
+# 실행: EMBED_SERVER_SOCKET=/tmp/changup-embed.sock python -m api.embedding.embed_server
+
+import os
+
+from api.core.cpu_tuning import apply_cpu_tuning
+
+if __name__ == "__main__":
+    # 서버 프로세스 하나가 vCPU를 전부 씀 (라이브러리 import 전에 스레드 수 결정)
+    os.environ["APP_WORKERS"] = "1"
+    apply_cpu_tuning()
+
+import argparse
+import atexit
+import json
+import logging
+import socket
+import struct
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import api.embedding.vectorizer as vectorizer
+from api.core.query_batcher import QueryBatcher
+
+logger = logging.getLogger("startup_service")
+
+EMBED_SERVER_BATCH_MAX = int(os.getenv("EMBED_SERVER_BATCH_MAX", "64"))  # 한 번에 묶는 요청 수
+EMBED_SERVER_WINDOW_MS = float(os.getenv("EMBED_SERVER_WINDOW_MS", "0"))
+EMBED_SERVER_TIMEOUT = float(os.getenv("EMBED_SERVER_TIMEOUT", "60"))  # 워커 쪽 응답 대기 (초)
+
+_HEADER = struct.Struct("!I")
+_MIN_SHM = 1 << 20
+
+
+def _send(sock: socket.socket, msg: Dict[str, Any]) -> None:
+    body = json.dumps(msg, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    # 상대가 연결을 닫았으면 None
+    head = _recv_exact(sock, _HEADER.size)
+    if head is None:
+        return None
+    body = _recv_exact(sock, _HEADER.unpack(head)[0])
+    return None if body is None else json.loads(body)
+
+
+_attach_lock = threading.Lock()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # 워커가 만든 세그먼트에 붙기만 함: 3.13 미만은 붙을 때도 resource_tracker에 등록돼 서버 종료 시 지워지거나
+    # (같은 부모에서 띄운 경우) 워커의 등록을 지워버리므로, 붙는 동안만 등록을 건너뜀
+    with _attach_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _write(shm: shared_memory.SharedMemory, vecs: np.ndarray) -> None:
+    view = np.ndarray(vecs.shape, dtype=np.float32, buffer=shm.buf)
+    view[...] = vecs
+    del view  # 버퍼 참조가 남아 있으면 close 불가
+
+
+class EmbedServer:
+    def __init__(self, socket_path: str,
+                 encode: Optional[Callable[..., Any]] = None,
+                 count: Optional[Callable[[List[str]], Any]] = None,
+                 dim: Optional[int] = None, model: Optional[str] = None,
+                 max_batch: int = EMBED_SERVER_BATCH_MAX, window_ms: float = EMBED_SERVER_WINDOW_MS):
+        self.socket_path = socket_path
+        self._encode = encode or vectorizer.embed_texts
+        self._count = count or vectorizer.count_tokens
+        self.dim = dim or vectorizer.embedding_dimension()
+        self.model = model or vectorizer.MODEL_ID
+        # 요청 1건 = (텍스트 목록, batch_size), 큐 제한/기한은 각 워커의 QueryBatcher가 담당
+        self._batcher = QueryBatcher(self._run_batch, max_batch=max_batch, window_ms=window_ms,
+                                     workers=1, max_queue=0, deadline_ms=0)
+        self._sock: Optional[socket.socket] = None
+        self._stop = threading.Event()
+
+    def _run_batch(self, items: List[Tuple[List[str], int]]) -> List[np.ndarray]:
+        texts = [t for batch, _ in items for t in batch]
+        vecs = np.asarray(self._encode(texts, batch_size=max(bs for _, bs in items)), dtype=np.float32)
+        out, start = [], 0
+        for batch, _ in items:
+            out.append(vecs[start:start + len(batch)])
+            start += len(batch)
+        return out
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # 이전 실행이 남긴 소켓 파일
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o660)  # 같은 사용자/그룹의 워커만
+        sock.listen(128)
+        self._sock = sock
+        logger.info("[임베딩서버] 시작: socket=%s dim=%d model=%s", self.socket_path, self.dim, self.model)
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = sock.accept()
+                except OSError:
+                    break  # stop()으로 닫힘
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sock is not None:
+            self._sock.shutdown(socket.SHUT_RDWR)
+            self._sock.close()
+
+    def _handle(self, conn: socket.socket) -> None:
+        # 연결 1개 = 워커 스레드 1개, 요청은 순서대로 하나씩
+        shm: Optional[shared_memory.SharedMemory] = None
+        try:
+            while True:
+                req = _recv(conn)
+                if req is None:
+                    break
+                try:
+                    op = req.get("op")
+                    if op == "info":
+                        _send(conn, {"dim": self.dim, "model": self.model, "backend": vectorizer.EMBED_BACKEND})
+                    elif op == "tokens":
+                        _send(conn, {"lengths": np.asarray(self._count(req["texts"])).tolist()})
+                    elif op == "embed":
+                        vecs = self._batcher.submit((req["texts"], int(req.get("batch_size", 64))))
+                        if shm is None or shm.name != req["shm"]:
+                            if shm is not None:
+                                shm.close()
+                            shm = _attach(req["shm"])
+                        if vecs.nbytes > shm.size:
+                            raise ValueError(f"공유 메모리 부족: {vecs.nbytes} > {shm.size}")
+                        _write(shm, vecs)
+                        _send(conn, {"n": int(vecs.shape[0]), "dim": int(vecs.shape[1])})
+                    else:
+                        _send(conn, {"error": f"알 수 없는 op: {op}"})
+                except Exception as e:  # 인코딩 실패 등은 그 요청에만 오류로 응답
+                    _send(conn, {"error": f"{type(e).__name__}: {e}"})
+        except OSError:
+            pass  # 워커 종료/연결 끊김
+        finally:
+            if shm is not None:
+                shm.close()
+            conn.close()
+
+
+class _Conn:
+    def __init__(self, socket_path: str, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def ensure(self, nbytes: int) -> shared_memory.SharedMemory:
+        # 결과 받을 공유 메모리 (모자라면 2배씩 키워서 새로 만듦)
+        if self.shm is None or self.shm.size < nbytes:
+            size = max(nbytes, _MIN_SHM, 2 * self.shm.size if self.shm is not None else 0)
+            self._release()
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        return self.shm
+
+    def _release(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        finally:
+            self._release()
+
+
+class EmbedClient:
+    """
+    워커 쪽 클라이언트: 스레드마다 연결 1개 + 공유 메모리 1개, 실패 시 한 번 다시 연결
+    model: 워커가 기대하는 모델 식별자 (기본 vectorizer.MODEL_ID), 서버 모델과 다르면 RuntimeError
+    """
+
+    def __init__(self, socket_path: str, timeout: float = EMBED_SERVER_TIMEOUT, model: Optional[str] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.model = model
+        self._local = threading.local()
+        self._conns: List[_Conn] = []
+        self._lock = threading.Lock()
+        self._info: Optional[Dict[str, Any]] = None
+        atexit.register(self.close)
+
+    def _conn(self) -> _Conn:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _Conn(self.socket_path, self.timeout)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            with self._lock:
+                if conn in self._conns:
+                    self._conns.remove(conn)
+            conn.close()
+
+    def _call(self, req: Dict[str, Any], nbytes: int = 0) -> Tuple[_Conn, Dict[str, Any]]:
+        for attempt in (0, 1):  # 서버 재시작 등으로 끊긴 연결은 한 번 새로 연결
+            try:
+                conn = self._conn()
+                if nbytes:
+                    req["shm"] = conn.ensure(nbytes).name
+                _send(conn.sock, req)
+                resp = _recv(conn.sock)
+                if resp is None:
+                    raise ConnectionError("임베딩 서버가 연결을 닫음")
+                break
+            except OSError:
+                self._drop()
+                if attempt:
+                    raise
+        if "error" in resp:
+            raise RuntimeError(f"임베딩 서버 오류: {resp['error']}")
+        return conn, resp
+
+    def info(self) -> Dict[str, Any]:
+        if self._info is None:
+            info = self._call({"op": "info"})[1]
+            expected = self.model or vectorizer.MODEL_ID
+            if info.get("model") != expected:
+                raise RuntimeError(f"임베딩 서버 모델 불일치: 서버={info.get('model')!r}, 워커={expected!r} "
+                                   "(EMBED_MODEL_DIR/EMBED_BACKEND 설정 확인)")
+            self._info = info
+        return self._info
+
+    def dimension(self) -> int:
+        return int(self.info()["dim"])
+
+    def count_tokens(self, texts: List[str]) -> np.ndarray:
+        self.info()  # 모델 확인 (다른 토크나이저 기준 길이로 배치를 나누지 않도록)
+        return np.asarray(self._call({"op": "tokens", "texts": list(texts)})[1]["lengths"], dtype=np.int64)
+
+    def embed(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        dim = self.dimension()
+        if not texts:
+            return np.zeros((0, dim), dtype=np.float32)
+        req = {"op": "embed", "texts": list(texts), "batch_size": batch_size}
+        conn, resp = self._call(req, nbytes=len(texts) * dim * 4)
+        view = np.ndarray((resp["n"], resp["dim"]), dtype=np.float32, buffer=conn.shm.buf)
+        out = view.copy()
+        del view
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+
+def serve(socket_path: str, **kwargs) -> None:
+    # 서버 프로세스에서는 모델을 직접 사용 (같은 .env를 읽어도 자기 자신에게 보내지 않도록)
+    vectorizer.EMBED_SERVER_SOCKET = ""
+    vectorizer.embed_texts(["warmup"])  # 모델 로드/첫 forward를 요청 전에
+    EmbedServer(socket_path, **kwargs).serve_forever()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--socket", default=os.getenv("EMBED_SERVER_SOCKET", "/tmp/changup-embed.sock"))
+    args = ap.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# 쿼리 임베딩 LRU 캐시
+# - 키: 정규화된 쿼리 텍스트 + 모델 이름의 해시
+# - 용량은 항목 수가 아니라 바이트로 제한 (벡터 크기 + 키 + 항목당 고정 오버헤드 추정치)
+# - TTL(선택) 지나면 조회 시 만료 처리
+# - 여러 요청 스레드에서 동시에 접근하므로 Lock으로 보호
+
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# OrderedDict 노드 + 튜플 + ndarray 헤더 등 대략적인 항목당 오버헤드
+_ENTRY_OVERHEAD = 256
+
+
+def normalize_query(text: Optional[str]) -> str:
+    # 공백만 다른 같은 쿼리는 같은 키가 되도록
+    if not text:
+        return ""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def query_key(text: str, model_name: str) -> str:
+    h = hashlib.sha1()
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalize_query(text).encode("utf-8"))
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, max_bytes: int, ttl_seconds: float = 0.0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.ttl_seconds = float(ttl_seconds or 0.0)
+        self._data: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _entry_bytes(key: str, vec: np.ndarray) -> int:
+        return int(vec.nbytes) + len(key) + _ENTRY_OVERHEAD
+
+    def _drop(self, key: str) -> None:
+        vec, _ = self._data.pop(key)
+        self._bytes -= self._entry_bytes(key, vec)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vec, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)  # 최근 사용으로 갱신
+            self.hits += 1
+            return vec
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.array(vec, dtype=np.float32)  # 호출자 배열과 분리된 복사본
+        vec.flags.writeable = False  # 캐시 값이 밖에서 수정되지 않도록
+        size = self._entry_bytes(key, vec)
+        if size > self.max_bytes:
+            return  # 한 항목이 전체 용량보다 크면 캐시하지 않음
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (vec, time.monotonic())
+            self._bytes += size
+            # 용량 초과 시 가장 오래 안 쓴 것부터 제거
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
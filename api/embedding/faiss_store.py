@@ -1,45 +1,299 @@
 # FAISS 인덱스 관리 클래스
 # - 코사인 유사도 기반 (코사인 = 정규화된 벡터들의 내적 값)
 # - external_ref(숫자 문자열)를 int로 바꿔 ID로 사용
+# - 내용이 바뀔 때마다 generation(프로세스 전역 단조 증가 값)을 올려 결과 캐시 무효화에 사용
+# - 인덱스 종류(flat/IVF/HNSW)는 IndexConfig로 선택, 벡터 수가 임계값을 넘으면 기존 벡터로 학습해 전환
+# - 압축 코덱(fp16/sq8/pq)이면 원본 벡터를 옆에 보관해 상위 후보를 정확한 내적으로 재정렬
+# - 저장은 버전별 파일 + manifest로 원자적 게시, 로드는 mmap(INDEX_MMAP=1) → 수정 직전에 메모리 사본으로 전환
+# - external_ref별 내용 해시 테이블도 같은 버전으로 저장 (변경 없는 공고는 재임베딩 생략)
+# - 공고 메타데이터(지역/나이/모집 여부/마감일) 컬럼도 같은 버전으로 저장 → 검색 중 IDSelector로 필터링
+#   (마감일이 지난 공고는 필터 없이 검색해도 제외, 실제 삭제는 expiry_sweeper가 모아서 처리)
+# - IDMap2(flat/HNSW) 삭제는 tombstone 표시만 (벡터 이동 없음), 표시가 쌓이면 StoreManager가 압축
+# - 한 번 게시한 기준 세그먼트는 그대로 두고 이후 변경은 델타 세그먼트로 저장 (segments.py)
+#   → 검색은 기준 인덱스 + 델타 인덱스를 각각 검색해서 점수 순으로 합침
 
+import itertools
+import logging
 import os
-from typing import Iterable, List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional
 
 import faiss
 import numpy as np
 
+from api.embedding.content_hashes import ContentHashTable, hashes_path
+from api.embedding.index_factory import (
+    IndexConfig,
+    apply_search_params,
+    build_index,
+    export_vectors,
+    index_codec,
+    index_kind,
+    index_layout,
+    search_parameters,
+    supports_remove,
+    supports_selector,
+)
+from api.embedding.index_files import (
+    cleanup_old_versions,
+    manifest_file,
+    publish_manifest,
+    read_index,
+    read_manifest,
+    versioned_path,
+    write_index_atomic,
+)
+from api.embedding.metadata import MetadataColumns, MetadataRow, SearchFilter, meta_path, with_expiry
+from api.embedding.raw_vectors import RawVectorStore, raw_paths
+from api.embedding.segments import SEGMENT_DELTAS, SegmentDelta, needs_fold, new_delta_index, segment_path
+from api.embedding.tombstones import TOMBSTONE_DELETES, Tombstones, tombstones_path
+
+logger = logging.getLogger("startup_service")
+
 INDEX_NOT_READY_MSG = "인덱스가 준비되지 않음"
 
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") not in ("0", "false", "False")
+# flat 인덱스에서 제외(필터/삭제 표시) 비율이 이 이하면 선택자 대신 더 많이 뽑아서 거름
+SEARCH_OVERFETCH_MAX_RATIO = float(os.getenv("SEARCH_OVERFETCH_MAX_RATIO", "0.3"))
+
+# 모든 FaissStore 인스턴스가 공유하는 세대 카운터 (복사본끼리도 값이 겹치지 않도록)
+_generations = itertools.count(1)
+
+
+def _empty_result(nq: int, k: int):
+    # 검색할 벡터가 없을 때의 (점수, ID) - 모두 빈 자리(-1)
+    return np.full((nq, k), -np.inf, dtype=np.float32), np.full((nq, k), -1, dtype=np.int64)
+
+
+def _merge_top_k(parts, k: int):
+    # 세그먼트별 (점수, ID) 결과를 점수 내림차순으로 합쳐 상위 k개 (빈 자리 -1은 뒤로)
+    scores = np.concatenate([s for s, _ in parts], axis=1)
+    ids = np.concatenate([i for _, i in parts], axis=1)
+    scores = np.where(ids >= 0, scores, -np.inf).astype(np.float32)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
 
 class FaissStore:
-    def __init__(self, index_path: str, dim: int):
+    def __init__(self, index_path: str, dim: int, config: Optional[IndexConfig] = None, model: str = ""):
         self.index_path = index_path
         self.dim = dim
+        self.model = model  # 벡터를 만든 임베딩 모델 이름 (manifest에 기록 → 모델 없이 차원/호환 여부 확인)
+        self.config = config or IndexConfig.from_env()
         self.index: faiss.Index | None = None
+        # 압축 코덱일 때만 원본 벡터 보관
+        self.raw: RawVectorStore | None = RawVectorStore(dim) if self.config.keeps_raw_vectors else None
+        self.hashes = ContentHashTable()  # external_ref → 내용 해시 (인덱스에 든 공고만)
+        self.meta = MetadataColumns()  # ID → 검색 필터용 메타데이터
+        self.tomb = Tombstones()  # 삭제 표시된 내부 위치 (IDMap2 인덱스만)
+        self.delta: faiss.Index | None = None  # 기준 세그먼트 게시 이후 추가된 벡터 (메모리, 정확 검색)
+        self.segments: List[str] = []  # 기준 세그먼트 위에 쌓인 델타 파일 (manifest 순서)
+        self._base_files: Optional[Dict[str, str]] = None  # 게시된 기준 세그먼트 파일 (None이면 다음 저장 때 전체 기록)
+        self._dirty: set = set()  # 마지막 저장 이후 벡터가 바뀐(삭제/추가) ID
+        self._dirty_meta: set = set()  # 마지막 저장 이후 메타데이터만 바뀐 ID
+        self.generation = 0  # 인덱스 내용 버전 (save/upsert/remove 때마다 증가)
+        self.version = 0  # 디스크에 게시된 manifest 버전 (로드/저장 기준)
+        self._mapped = False  # 인덱스가 파일에 mmap된 상태인지 (그대로 수정하면 안 됨)
+        self._shared = False  # 기준 인덱스를 다른 스냅샷과 공유 중인지 (그대로 수정하면 안 됨)
 
     # ---------- 기본 ----------
     @property
     def ntotal(self) -> int:
-        return int(self.index.ntotal) if self.index is not None else 0
+        # 살아 있는 벡터 수 (삭제 표시된 위치 제외, 델타 세그먼트 포함)
+        if self.index is None:
+            return 0
+        return self._base_live() + (int(self.delta.ntotal) if self.delta is not None else 0)
+
+    def _base_live(self) -> int:
+        return int(self.index.ntotal) - self.tomb.count
+
+    def _bump_generation(self) -> None:
+        self.generation = next(_generations)
 
     def _new_index(self) -> None:
         # 내적 기반 (코사인용) 벡터는 항상 정규화해서 넣고 검색해야 함
-        base = faiss.IndexFlatIP(self.dim)
-        self.index = faiss.IndexIDMap2(base)
+        # 빈 인덱스는 항상 flat으로 시작 (벡터가 쌓이면 _maybe_switch_index에서 전환)
+        self.index = build_index(self.config, self.dim)
+        if self.raw is not None:
+            self.raw = RawVectorStore(self.dim)
+        self.hashes = ContentHashTable()
+        self.meta = MetadataColumns()
+        self.tomb = Tombstones()
+        self._reset_segments()
+        self._bump_generation()
+
+    def _reset_segments(self) -> None:
+        # 기준 인덱스가 새로 만들어짐 → 다음 저장은 전체 기록
+        self.delta = None
+        self.segments = []
+        self._base_files = None
+        self._shared = False
 
     def load(self) -> None:
-        if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
+        manifest = read_manifest(self.index_path)
+        if manifest is not None:
+            data_path = manifest_file(self.index_path, manifest, "index")
+            self.version = int(manifest["version"])
+            self.model = self.model or manifest.get("model", "")
+        elif os.path.exists(self.index_path):
+            data_path = self.index_path  # manifest 이전 형식 (단일 파일)
+        else:
+            data_path = None
+
+        if data_path is not None:
+            self.index = read_index(data_path, mmap=INDEX_MMAP)
+            self._mapped = INDEX_MMAP
+            apply_search_params(self.index, self.config)
+            tomb_file = manifest_file(self.index_path, manifest, "tomb") if manifest else None
+            if tomb_file:
+                self.tomb.load(tomb_file)
+            self.tomb.grow(int(self.index.ntotal))
+            self._load_raw(data_path)
+            # 해시 파일이 없으면(이전 형식) 빈 테이블 → 다음 동기화 때 한 번 전부 임베딩
+            hashes_file = manifest_file(self.index_path, manifest, "hashes") if manifest else None
+            if hashes_file:
+                self.hashes.load(hashes_file)
+            # 메타데이터가 없으면(이전 형식) 필터 조건을 전부 통과 → 다음 동기화 때 채워짐
+            meta_file = manifest_file(self.index_path, manifest, "meta") if manifest else None
+            if meta_file:
+                self.meta.load(meta_file)
+            if manifest is not None:
+                self._base_files = dict(manifest["files"])
+                self._replay_segments(manifest.get("segments", []))
+            self._bump_generation()
+            if self._wanted_layout() != index_layout(self.index):
+                # 로드 시점엔 재학습하지 않음 (워커마다 중복 작업) → 다음 쓰기 때 전환
+                logger.info("[인덱스] 저장된 구성=%s, 설정=%s → 다음 동기화 때 전환",
+                            index_layout(self.index), (self.config.kind, self.config.codec))
         else:
             self._new_index()
 
+    def _load_raw(self, data_path: str) -> None:
+        if self.raw is None or self.raw.load(data_path):
+            return
+        # 원본 파일이 없고 인덱스가 float32면 인덱스에서 그대로 복원 가능 (압축본은 복원 불가)
+        if index_codec(self.index) == "float32" and self.ntotal:
+            ids, vecs = self._export_live()
+            self.raw.upsert(ids, vecs)
+
+    def _replay_segments(self, names: List[str]) -> None:
+        # 기준 세그먼트 위에 델타를 저장 순서대로 적용 (재학습/인덱스 전환 없음)
+        d = os.path.dirname(self.index_path) or "."
+        for name in names:
+            seg = SegmentDelta.load(os.path.join(d, name), self.dim)
+            self._remove(seg.drop, [str(i) for i in seg.drop])
+            if len(seg.ids):
+                self._add(seg.ids, self._normalize(seg.vecs))
+            self.hashes.update(seg.hash_refs, seg.hash_values)
+            self.meta.upsert(seg.meta_ids, seg.meta_rows)
+            self.segments.append(name)
+        self._dirty, self._dirty_meta = set(), set()
+        if names:
+            logger.info("[인덱스] 델타 세그먼트 %d개 적용, ntotal=%d", len(names), self.ntotal)
+
     def save(self) -> None:
-        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
-        faiss.write_index(self.index, self.index_path)
+        """
+        새 버전으로 게시
+        1) 기준 세그먼트가 게시돼 있으면 마지막 저장 이후 변경분만 <index>.v{N}.seg.npz 로 기록
+           아니면 <index>.v{N} (+ 원본 벡터/해시/메타데이터 파일) 전체 기록
+           (모두 임시파일 → fsync → rename)
+        2) manifest를 같은 방식으로 교체 → 이 시점부터 다른 워커/재시작이 새 버전을 읽음
+        """
+        assert self.index is not None, INDEX_NOT_READY_MSG
+        on_disk = read_manifest(self.index_path)
+        version = max(self.version, int(on_disk["version"]) if on_disk else 0) + 1
+        files = self._save_delta(version) if self._appends_to_delta() else self._save_base(version)
+        kind, codec = index_layout(self.index)
+        publish_manifest(self.index_path, version, files, segments=list(self.segments),
+                         ntotal=self.ntotal, dim=self.dim, model=self.model, kind=kind, codec=codec)
+        keep = {os.path.basename(f) for f in files.values()} | set(self.segments)
+        cleanup_old_versions(self.index_path, version, keep=keep)
+        self.version = version
+        self._dirty, self._dirty_meta = set(), set()
+        self._bump_generation()
+
+    def _save_base(self, version: int) -> Dict[str, str]:
+        self._fold_delta()
+        data_path = versioned_path(self.index_path, version)
+        write_index_atomic(self.index, data_path)
+        files = {"index": data_path}
+        if self.raw is not None:
+            self.raw.save(data_path)
+            files["raw_ids"], files["raw_vecs"] = raw_paths(data_path)
+        if self.tomb.count:
+            files["tomb"] = tombstones_path(data_path)
+            self.tomb.save(files["tomb"])
+        files["hashes"] = hashes_path(data_path)
+        self.hashes.save(files["hashes"])
+        files["meta"] = meta_path(data_path)
+        self.meta.save(files["meta"])
+        self._base_files = {k: os.path.basename(v) for k, v in files.items()}
+        self.segments = []
+        return files
+
+    def _save_delta(self, version: int) -> Dict[str, str]:
+        seg = self._pending_delta()
+        if not seg.is_empty():
+            path = segment_path(self.index_path, version)
+            seg.save(path)
+            self.segments.append(os.path.basename(path))
+        return dict(self._base_files)
+
+    def _pending_delta(self) -> SegmentDelta:
+        # 마지막 저장 이후 바뀐 ID의 현재 상태 (살아 있는 새 벡터는 모두 델타 인덱스에 있음)
+        drop = np.asarray(sorted(self._dirty), dtype=np.int64)
+        if self.delta is not None and self.delta.ntotal:
+            ids, vecs = export_vectors(self.delta)
+            keep = np.isin(ids, drop)
+            ids, vecs = ids[keep], vecs[keep]
+        else:
+            ids, vecs = np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32)
+        refs = [str(i) for i in drop if self.hashes.get(str(i)) is not None]
+        meta_ids = np.asarray(sorted(self._dirty | self._dirty_meta), dtype=np.int64)
+        rows = self.meta.get(meta_ids)
+        found = np.asarray([r is not None for r in rows], dtype=bool)
+        return SegmentDelta(dim=self.dim, drop=drop, ids=ids, vecs=vecs,
+                            hash_refs=refs, hash_values=[self.hashes.get(r) for r in refs],
+                            meta_ids=meta_ids[found] if len(meta_ids) else meta_ids,
+                            meta_rows=[r for r in rows if r is not None])
 
     def clear(self) -> None:
         # 전부 비우기
         self._new_index()
+        self._mapped = False
+
+    def _owned_index(self) -> faiss.Index:
+        # 직렬화 왕복으로 깊은 복사 (clone_index는 mmap된 코드를 뷰로 공유해서 수정 시 abort)
+        return faiss.deserialize_index(faiss.serialize_index(self.index))
+
+    def _ensure_writable(self) -> None:
+        if self._mapped or self._shared:
+            self.index = self._owned_index()
+            apply_search_params(self.index, self.config)
+            self._mapped = self._shared = False
+
+    def copy(self) -> "FaissStore":
+        # 같은 경로/차원을 가진 독립 복사본 (원본 인덱스는 건드리지 않음)
+        assert self.index is not None, INDEX_NOT_READY_MSG
+        other = FaissStore(index_path=self.index_path, dim=self.dim, config=self.config, model=self.model)
+        if self._appends_to_delta():
+            # 게시된 기준 세그먼트는 수정하지 않으므로 공유 (코퍼스 크기만큼 복사하지 않음, 델타만 복사)
+            other.index, other._mapped = self.index, self._mapped
+            self._shared = other._shared = True
+            other.delta = faiss.clone_index(self.delta) if self.delta is not None else None
+        else:
+            other.index = self._owned_index()
+            apply_search_params(other.index, other.config)
+        other.segments = list(self.segments)
+        other._base_files = dict(self._base_files) if self._base_files is not None else None
+        other._dirty, other._dirty_meta = set(self._dirty), set(self._dirty_meta)
+        if self.raw is not None:
+            other.raw = self.raw.copy()
+        other.hashes = self.hashes.copy()
+        other.meta = self.meta.copy()
+        other.tomb = self.tomb.copy()  # 직렬화 복사는 내부 위치를 그대로 유지
+        other.generation = self.generation  # 내용이 같으므로 같은 세대, 수정하면 새 세대
+        other.version = self.version
+        return other
 
     # ---------- 내부 메서드 ----------
     # 데이터 타입을 float32로 변환(FAISS가 요규하는 형식임)
@@ -55,6 +309,81 @@ class FaissStore:
         # "174700" 같은 문자열을 int64로 변환
         return np.asarray([np.int64(int(r)) for r in refs], dtype=np.int64)
 
+    def _uses_tombstones(self) -> bool:
+        return TOMBSTONE_DELETES and hasattr(self.index, "id_map")
+
+    def _appends_to_delta(self) -> bool:
+        # 기준 세그먼트가 게시된 뒤의 추가는 델타 인덱스로 (기준 인덱스는 읽기 전용)
+        return SEGMENT_DELTAS and self._base_files is not None and self._uses_tombstones()
+
+    def _id_map_view(self) -> np.ndarray:
+        # 위치 → 외부 ID (복사 없는 뷰, 인덱스가 바뀌지 않는 동안만 유효)
+        id_map = self.index.id_map
+        return faiss.rev_swig_ptr(id_map.data(), id_map.size()) if id_map.size() else np.empty(0, dtype=np.int64)
+
+    def _export_live(self) -> tuple[np.ndarray, np.ndarray]:
+        # 인덱스 벡터 전부 꺼내기 (삭제 표시된 위치 제외, IDMap2는 위치 순서로 나옴)
+        ids, vecs = export_vectors(self.index)
+        if self.tomb.count:
+            live = ~self.tomb.dead[:len(ids)]
+            ids, vecs = ids[live], vecs[live]
+        if self.delta is not None and self.delta.ntotal:
+            d_ids, d_vecs = export_vectors(self.delta)
+            ids, vecs = np.concatenate([ids, d_ids]), np.concatenate([vecs, d_vecs])
+        return ids, vecs
+
+    def live_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        # 살아 있는 (ID, 벡터) 전부 - 원본 보관소에 다 있으면 원본, 아니면 인덱스에서 복원한 값
+        if self.raw is not None and len(self.raw) == self.ntotal:
+            return self.raw.all()
+        return self._export_live()
+
+    def _fold_delta(self) -> None:
+        # 델타 벡터를 기준 인덱스에 그대로 추가 (재학습/재구성 없음, HNSW는 그래프에 삽입)
+        if self.delta is not None and self.delta.ntotal:
+            ids, vecs = export_vectors(self.delta)
+            self._ensure_writable()
+            self.index.add_with_ids(vecs, ids)
+            self.tomb.grow(int(self.index.ntotal))
+        self.delta = None
+
+    # ---------- 인덱스 종류 전환 ----------
+    def _wanted_layout(self) -> tuple[str, str]:
+        return self.config.effective_layout(self.ntotal)
+
+    def rebuild(self, exclude_ids: Optional[np.ndarray] = None) -> None:
+        """
+        현재 벡터를 전부 꺼내 설정에 맞는 새 인덱스로 다시 만들기
+        - IVF/PQ는 기존 벡터로 학습 (원본 보관소가 있으면 원본, 없으면 인덱스에서 복원한 값)
+        - exclude_ids: 재구성하면서 뺄 ID (삭제 미지원 인덱스용)
+        """
+        assert self.index is not None, INDEX_NOT_READY_MSG
+        self._mapped = False  # 새 인덱스로 통째로 교체됨
+        ids, vecs = self.live_vectors()
+        if exclude_ids is not None and len(exclude_ids):
+            keep = ~np.isin(ids, exclude_ids)
+            ids, vecs = ids[keep], vecs[keep]
+        vecs = self._normalize(vecs)
+        index = build_index(self.config, self.dim, train_vecs=vecs if len(vecs) else None)
+        if len(ids):
+            index.add_with_ids(vecs, ids)
+        self.index = index
+        self.tomb = Tombstones()  # 살아 있는 벡터만 옮겼으므로 표시도 비움 (= 압축)
+        self.tomb.grow(int(index.ntotal))
+        self._reset_segments()  # 델타도 새 인덱스에 들어감
+        self._bump_generation()
+        logger.info("[인덱스] 재구성 완료: layout=%s, ntotal=%d", index_layout(index), self.ntotal)
+
+    def _maybe_switch_index(self) -> None:
+        # 임계값 이상이면 설정된 ANN/압축 인덱스로, 임계값 절반 아래로 줄면 다시 flat으로 (잦은 전환 방지)
+        current = index_layout(self.index)
+        wanted = self._wanted_layout()
+        if current == wanted:
+            return
+        if wanted == ("flat", "float32") and self.ntotal >= self.config.exact_threshold // 2:
+            return
+        self.rebuild()
+
     # ---------- 추가/업서트/삭제 ----------
     def add_with_external_ids(self, vectors: np.ndarray, external_refs: List[str]) -> None:
         assert self.index is not None, INDEX_NOT_READY_MSG
@@ -62,36 +391,110 @@ class FaissStore:
         assert vecs.shape[1] == self.dim, "차원 불일치"
         vecs = self._normalize(vecs)
         ids = self._to_ids(external_refs)
-        self.index.add_with_ids(vecs, ids)
+        self._add(ids, vecs)
+        self._maybe_switch_index()
+
+    def _add(self, ids: np.ndarray, vecs: np.ndarray) -> None:
+        if self._appends_to_delta():
+            if self.delta is None:
+                self.delta = new_delta_index(self.dim)
+            self.delta.add_with_ids(vecs, ids)
+        else:
+            self._ensure_writable()
+            self.index.add_with_ids(vecs, ids)
+            self.tomb.grow(int(self.index.ntotal))
+        if self.raw is not None:
+            self.raw.upsert(ids, vecs)
+        self._dirty.update(ids.tolist())
+        self._bump_generation()
 
-    def upsert_with_external_ids(self, vectors: np.ndarray, external_refs: List[str]) -> None:
-        # 같은 ref가 있으면 지우고 다시 넣기
+    def upsert_with_external_ids(self, vectors: np.ndarray, external_refs: List[str],
+                                 content_hashes: Optional[List[str]] = None,
+                                 metadata: Optional[List[MetadataRow]] = None) -> None:
+        # 같은 ref가 있으면 지우고 다시 넣기 (content_hashes/metadata가 있으면 같이 갱신)
         self.remove_by_external_ids(external_refs)
         self.add_with_external_ids(vectors, external_refs)
+        if content_hashes is not None:
+            self.hashes.update(external_refs, content_hashes)
+        if metadata is not None:
+            self.update_metadata(external_refs, metadata)
+
+    def update_metadata(self, external_refs: List[str], rows: List[MetadataRow]) -> None:
+        # 벡터는 그대로 두고 메타데이터만 교체 (본문은 같고 마감일/모집 여부만 바뀐 공고)
+        if not external_refs:
+            return
+        ids = self._to_ids(external_refs)
+        self.meta.upsert(ids, rows)
+        self._dirty_meta.update(ids.tolist())
+        self._bump_generation()
 
     # external_id 기반 인덱스 제거
     def remove_by_external_ids(self, external_refs: Iterable[str]) -> int:
         assert self.index is not None,INDEX_NOT_READY_MSG
+        external_refs = [str(r) for r in external_refs]
         ids = self._to_ids(external_refs)
         before = self.ntotal
-        sel = faiss.IDSelectorArray(len(ids), ids) # IDSelectorArray  사용(대량 삭제 최적화를 위해)
+        if self._remove(ids, external_refs):
+            self._maybe_switch_index()
+        return before - self.ntotal
+
+    def _remove(self, ids: np.ndarray, external_refs: List[str]) -> bool:
+        # 반환: 인덱스 내용이 바뀌었는지
+        self.hashes.remove(external_refs)
+        self.meta.remove(ids)
+        self._dirty.update(ids.tolist())
+        if self._uses_tombstones():
+            # 위치에 표시만 (인덱스 자체는 그대로라 mmap 상태여도 복사할 필요 없음), 델타 인덱스는 바로 삭제
+            changed = False
+            if self.delta is not None and self.delta.ntotal and len(ids):
+                changed = self.delta.remove_ids(faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))) > 0
+            positions = self.tomb.live_positions(self._id_map_view(), ids)
+            if len(positions):
+                self.tomb.mark(positions)
+                changed = True
+            if changed:
+                if self.raw is not None:
+                    self.raw.remove(ids)
+                self._bump_generation()
+            return changed
+        self._ensure_writable()
+        if not supports_remove(self.index):
+            # HNSW: 실제로 들어 있는 ID가 있을 때만 삭제 대상 빼고 다시 구성
+            if not len(self.tomb.live_positions(self._id_map_view(), ids)):
+                return False
+            self.rebuild(exclude_ids=ids)
+            if self.raw is not None:
+                self.raw.remove(ids)
+            return True
+        sel = faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)) # IDSelectorArray  사용(대량 삭제 최적화를 위해)
         self.index.remove_ids(sel)
-        after = self.ntotal
-        return before - after
+        if self.raw is not None:
+            self.raw.remove(ids)
+        self._bump_generation()
+        return True
 
     # ---------- 검색 ----------
-    def search(self, query_vectors: np.ndarray, top_k: int = 10) -> List[List[Dict[str, Any]]]:
+    def search(self, query_vectors: np.ndarray, top_k: int = 10,
+               flt: Optional[SearchFilter] = None) -> List[List[Dict[str, Any]]]:
         """
         반환: 쿼리별 리스트
          {ref: "174700", score: float}
         score는 코사인 값(내적) 범위 대략 [-1, 1]
+        flt: 메타데이터 필터 (조건에 걸리는 ID는 검색 중에 제외 → 결과 개수가 줄지 않음)
+             마감일이 지난 공고 제외 조건은 항상 추가됨 (EXPIRY_FILTER=0이면 끔)
         """
         assert self.index is not None, INDEX_NOT_READY_MSG
         q = self._ensure_f32(query_vectors)
         assert q.shape[1] == self.dim, "차원 불일치"
         q = self._normalize(q)
+        if self.ntotal == 0:
+            return [[] for _ in range(q.shape[0])]  # 빈 flat 인덱스에 쿼리 20개 이상(BLAS 경로)이면 faiss가 비정상 종료
 
-        scores, ids = self.index.search(q, top_k)  # (nq, k)
+        rerank = self._rerank_enabled()
+        fetch_k = top_k * self.config.rerank_factor if rerank else top_k
+        scores, ids = self._search_index(q, fetch_k, flt)  # (nq, k)
+        if rerank:
+            scores, ids = self._rerank(q, scores, ids, top_k)
         results: List[List[Dict[str, Any]]] = []
         for i in range(ids.shape[0]):
             row: List[Dict[str, Any]] = []
@@ -103,9 +506,136 @@ class FaissStore:
             results.append(row)
         return results
 
-    def search_one(self, query_vector: np.ndarray, top_k: int = 10) -> List[Dict[str, Any]]:
+    def _search_index(self, q: np.ndarray, k: int, flt: Optional[SearchFilter]):
+        excl = self.meta.exclusion(with_expiry(flt))
+        parts = []
+        if int(self.index.ntotal):
+            # 기준 인덱스가 비어 있으면 검색하지 않음 (빈 flat 인덱스에 쿼리 20개 이상이면 faiss가 비정상 종료)
+            parts.append(self._search_base(q, k, excl))
+        if self.delta is not None and self.delta.ntotal:
+            # 델타 세그먼트도 같은 조건으로 검색해서 점수 순으로 합침 (다시 넣은 ID의 기준 쪽 벡터는 삭제 표시됨)
+            params = faiss.SearchParameters(sel=excl.sel) if excl is not None else None
+            parts.append(self.delta.search(q, min(k, int(self.delta.ntotal)), params=params))
+        if not parts:
+            return _empty_result(q.shape[0], k)
+        return parts[0] if len(parts) == 1 else _merge_top_k(parts, k)
+
+    def _search_base(self, q: np.ndarray, k: int, excl):
+        n_excluded = (len(excl) if excl is not None else 0) + self.tomb.count
+        if n_excluded == 0:
+            return self.index.search(q, k)
+        if not supports_selector(self.index):
+            # flat + PQ: 선택자를 못 쓰므로 제외 비율과 무관하게 뽑고 거르기 (모자라면 후보를 늘려 다시)
+            return self._overfetch_search(q, k, excl, n_excluded, exhaustive=True)
+        if index_kind(self.index) == "flat" and n_excluded <= SEARCH_OVERFETCH_MAX_RATIO * self.index.ntotal:
+            # brute force는 선택자를 넣으면 BLAS 대신 벡터별 비교로 느려짐 → 제외 비율이 작으면 넉넉히 뽑고 거르기
+            found = self._overfetch_search(q, k, excl, n_excluded)
+            if found is not None:
+                return found
+        return self._selector_search(q, k, excl)
+
+    def _search_positions(self, q: np.ndarray, k: int, sel=None):
+        # 내부 인덱스를 위치 기준으로 검색 → (점수, 위치, 외부 ID)
+        inner = faiss.downcast_index(self.index.index)
+        params = search_parameters(self.index, self.config, sel) if sel is not None else None
+        scores, pos = inner.search(q, k, params=params)
+        id_map = self._id_map_view()
+        return scores, pos, np.where(pos >= 0, id_map[np.maximum(pos, 0)], -1)
+
+    def _overfetch_search(self, q: np.ndarray, k: int, excl, n_excluded: int, exhaustive: bool = False):
+        # exhaustive: 통과한 후보가 모자라면 None 대신 후보 수를 두 배씩 늘려 다시 검색 (최대 전체)
+        n = int(self.index.ntotal)
+        if n == 0:
+            return _empty_result(q.shape[0], k)
+        ratio = min(n_excluded / n, 0.9)
+        fetch_k = min(n, k + int(np.ceil(2 * k * ratio / (1 - ratio))) + 16)
+        while True:
+            if self.tomb.count:
+                scores, pos, ids = self._search_positions(q, fetch_k)
+                valid = (pos >= 0) & ~self.tomb.dead[np.maximum(pos, 0)]
+            else:
+                scores, ids = self.index.search(q, fetch_k)
+                valid = ids >= 0
+            if excl is not None:
+                valid &= ~excl.excludes(ids)
+            if fetch_k >= n or (valid.sum(axis=1) >= min(k, self._base_live())).all():
+                break
+            if not exhaustive:
+                return None  # 제외된 결과가 위쪽에 몰림 → 선택자 검색으로
+            fetch_k = min(n, fetch_k * 2)
+        order = np.argsort(~valid, axis=1, kind="stable")[:, :k]  # 통과한 후보를 점수 순서 그대로 앞으로
+        keep = np.take_along_axis(valid, order, axis=1)
+        out_scores = np.where(keep, np.take_along_axis(scores, order, axis=1), -np.inf).astype(np.float32)
+        out_ids = np.where(keep, np.take_along_axis(ids, order, axis=1), -1)
+        return out_scores, out_ids
+
+    def _selector_search(self, q: np.ndarray, k: int, excl):
+        sel = excl.sel if excl is not None else None
+        live, _keep_tomb = self.tomb.selector()  # _keep_*: 검색 끝까지 비트맵 메모리 유지
+        if live is None:
+            return self.index.search(q, k, params=search_parameters(self.index, self.config, sel))
+        # 삭제 표시가 있으면 내부 인덱스를 위치 기준으로 검색 (메타데이터 필터는 위치 → ID 변환 후 적용)
+        if sel is not None:
+            translated = faiss.IDSelectorTranslated(self.index.id_map, sel)
+            live = faiss.IDSelectorAnd(live, translated)
+            _keep_tomb = (_keep_tomb, translated)
+        scores, _, ids = self._search_positions(q, k, live)
+        return scores, ids
+
+    def has_unsaved_changes(self) -> bool:
+        # 마지막 저장/로드 이후 바뀐 내용이 있는지 (기준 세그먼트가 새로 만들어졌으면 True)
+        return self._base_files is None or bool(self._dirty or self._dirty_meta)
+
+    def can_compact(self, purge: bool = True) -> bool:
+        # compact가 할 일이 있는지 (정리할 삭제 표시 또는 합칠 델타 세그먼트)
+        return bool(purge and self.tomb.count) or bool(self.segments)
+
+    def needs_purge(self) -> bool:
+        # 삭제 표시 비율이 임계값을 넘음 → 재구성해서 실제로 제거
+        return self.index is not None and self.tomb.needs_compaction(int(self.index.ntotal))
+
+    def needs_compaction(self) -> bool:
+        if self.index is None:
+            return False
+        delta_rows = int(self.delta.ntotal) if self.delta is not None else 0
+        return self.needs_purge() or needs_fold(len(self.segments), delta_rows, self._base_live())
+
+    def compact(self, purge: bool = True) -> int:
+        """
+        새 기준 세그먼트 만들기 (다음 save에서 전체 기록), 제거한 삭제 표시 수 반환
+        - purge: 삭제 표시된 벡터를 실제로 제거 (살아 있는 벡터로 재구성)
+        - 아니면 델타 벡터만 기준 인덱스에 추가 (재구성 없음, 삭제 표시는 기준 세그먼트 파일로 옮겨짐)
+        """
+        dropped = self.tomb.count if purge else 0
+        if dropped:
+            self.rebuild()
+        elif self.segments or self.delta is not None:
+            self._fold_delta()
+            self._base_files = None
+        return dropped
+
+    def _rerank_enabled(self) -> bool:
+        return (self.raw is not None and len(self.raw) > 0 and self.config.rerank_factor > 1
+                and index_codec(self.index) != "float32")
+
+    def _rerank(self, q: np.ndarray, scores: np.ndarray, ids: np.ndarray, top_k: int):
+        # 압축 인덱스 후보(top_k × factor)를 원본 벡터 내적으로 다시 점수 매겨 상위 top_k만
+        out_scores = np.full((ids.shape[0], top_k), -np.inf, dtype=np.float32)
+        out_ids = np.full((ids.shape[0], top_k), -1, dtype=np.int64)
+        for i in range(ids.shape[0]):
+            valid = ids[i] != -1
+            cand = ids[i][valid]
+            vecs, found = self.raw.get(cand)
+            exact = np.where(found, vecs @ q[i], scores[i][valid])  # 원본 없는 후보는 근사 점수 유지
+            order = np.argsort(-exact, kind="stable")[:top_k]
+            out_scores[i, :len(order)] = exact[order]
+            out_ids[i, :len(order)] = cand[order]
+        return out_scores, out_ids
+
+    def search_one(self, query_vector: np.ndarray, top_k: int = 10,
+                   flt: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
         q = query_vector.reshape(1, -1)
-        return self.search(q, top_k=top_k)[0]
+        return self.search(q, top_k=top_k, flt=flt)[0]
 
     # ---------- 편의 ----------
     def count(self) -> int:
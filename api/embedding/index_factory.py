@@ -0,0 +1,192 @@
+# FAISS 인덱스 종류 설정/생성
+# - INDEX_TYPE: flat(정확 검색, 기본) | ivf_flat | ivf_pq | hnsw
+# - 모두 내적(코사인) 기준, external_ref → int64 ID 그대로 사용
+# - IVF는 자체 ID 관리(add_with_ids/remove_ids)를 쓰고, 나머지는 IDMap2로 감쌈
+#   (IDMap2로 IVF를 감싸면 삭제 후 내부 번호와 id_map이 어긋남)
+# - VECTOR_CODEC: float32(기본) | fp16 | sq8 | pq → 벡터 저장 압축 방식 (인덱스 구조와 조합)
+# - 벡터 수가 EXACT_SEARCH_THRESHOLD 미만이면 설정과 무관하게 flat + float32(정확 검색) 유지
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+CODECS = ("float32", "fp16", "sq8", "pq")
+
+# 구조(kind) 별 팩토리 문자열에서 코덱 부분
+_FLAT_CODEC = {"float32": "Flat", "fp16": "SQfp16", "sq8": "SQ8"}
+_HNSW_CODEC = {"float32": "", "fp16": "_SQfp16", "sq8": "_SQ8"}
+
+
+def _env_int(key: str, default: int) -> int:
+    return int(os.getenv(key, str(default)))
+
+
+@dataclass
+class IndexConfig:
+    index_type: str = "flat"
+    codec: str = "float32"
+    nlist: int = 0  # 0이면 벡터 수 기준 자동 (≈ 4·√n)
+    pq_m: int = 48  # 384차원 기준 서브벡터 8차원
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 80
+    nprobe: int = 16
+    ef_search: int = 64
+    exact_threshold: int = 20000
+    rerank_factor: int = 0  # 압축 코덱일 때 top_k × factor 후보를 원본 벡터로 재정렬 (0/1이면 끔)
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"지원하지 않는 INDEX_TYPE: {self.index_type} (가능: {', '.join(INDEX_TYPES)})")
+        if self.index_type == "ivf_pq":
+            self.codec = "pq"  # 하위 호환: ivf_pq = ivf 구조 + pq 코덱
+        if self.codec not in CODECS:
+            raise ValueError(f"지원하지 않는 VECTOR_CODEC: {self.codec} (가능: {', '.join(CODECS)})")
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        return cls(
+            index_type=os.getenv("INDEX_TYPE", "flat").strip().lower(),
+            codec=os.getenv("VECTOR_CODEC", "float32").strip().lower(),
+            nlist=_env_int("IVF_NLIST", 0),
+            pq_m=_env_int("PQ_M", 48),
+            pq_nbits=_env_int("PQ_NBITS", 8),
+            hnsw_m=_env_int("HNSW_M", 32),
+            ef_construction=_env_int("HNSW_EF_CONSTRUCTION", 80),
+            nprobe=_env_int("IVF_NPROBE", 16),
+            ef_search=_env_int("HNSW_EF_SEARCH", 64),
+            exact_threshold=_env_int("EXACT_SEARCH_THRESHOLD", 20000),
+            rerank_factor=_env_int("RERANK_FACTOR", 0),
+        )
+
+    @property
+    def kind(self) -> str:
+        return "ivf" if self.index_type.startswith("ivf") else self.index_type
+
+    @property
+    def keeps_raw_vectors(self) -> bool:
+        # 압축 코덱이면 원본 float32를 별도 보관 (재정렬/재학습용)
+        return self.codec != "float32"
+
+    def effective_layout(self, n: int) -> Tuple[str, str]:
+        # 작은 코퍼스는 brute force가 더 빠르고 정확 (학습할 벡터가 모자라도 flat 유지)
+        min_train = 2 ** self.pq_nbits if self.codec == "pq" else 1
+        if n < max(self.exact_threshold, min_train):
+            return "flat", "float32"
+        return self.kind, self.codec
+
+    def nlist_for(self, n: int) -> int:
+        nlist = self.nlist or int(4 * math.sqrt(max(n, 1)))
+        # 센트로이드당 학습 벡터 최소 39개 정도는 있어야 k-means가 안정적
+        return max(1, min(nlist, max(1, n // 39)))
+
+
+def factory_string(cfg: IndexConfig, kind: str, codec: str, dim: int, n: int) -> str:
+    if codec == "pq" and dim % cfg.pq_m != 0:
+        raise ValueError(f"PQ_M({cfg.pq_m})이 차원({dim})의 약수가 아님")
+    pq = f"PQ{cfg.pq_m}x{cfg.pq_nbits}"
+    if kind == "flat":
+        return "IDMap2," + (pq if codec == "pq" else _FLAT_CODEC[codec])
+    if kind == "hnsw":
+        return f"IDMap2,HNSW{cfg.hnsw_m}" + (f"_{pq}" if codec == "pq" else _HNSW_CODEC[codec])
+    if kind == "ivf":
+        return f"IVF{cfg.nlist_for(n)}," + (pq if codec == "pq" else _FLAT_CODEC[codec])
+    raise ValueError(f"지원하지 않는 index kind: {kind}")
+
+
+def build_index(cfg: IndexConfig, dim: int, train_vecs: Optional[np.ndarray] = None) -> faiss.Index:
+    """설정에 맞는 빈 인덱스 생성 (학습이 필요한 종류는 train_vecs로 학습까지)"""
+    n = 0 if train_vecs is None else int(train_vecs.shape[0])
+    kind, codec = cfg.effective_layout(n)
+    index = faiss.index_factory(dim, factory_string(cfg, kind, codec, dim, n), faiss.METRIC_INNER_PRODUCT)
+    if kind == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = cfg.ef_construction
+    if not index.is_trained:
+        index.train(train_vecs)
+    apply_search_params(index, cfg)
+    return index
+
+
+def _base(index: faiss.Index) -> faiss.Index:
+    return faiss.downcast_index(index.index) if hasattr(index, "id_map") else faiss.downcast_index(index)
+
+
+def index_kind(index: faiss.Index) -> str:
+    """현재 인덱스 구조 (flat / ivf / hnsw)"""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf"
+    if isinstance(_base(index), faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+
+def index_codec(index: faiss.Index) -> str:
+    """현재 인덱스의 벡터 저장 방식 (float32 / fp16 / sq8 / pq)"""
+    base = _base(index)
+    if isinstance(base, faiss.IndexHNSW):
+        base = faiss.downcast_index(base.storage)
+    if isinstance(base, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "fp16" if base.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(base, (faiss.IndexPQ, faiss.IndexIVFPQ, faiss.IndexHNSWPQ)):
+        return "pq"
+    return "float32"
+
+
+def index_layout(index: faiss.Index) -> Tuple[str, str]:
+    return index_kind(index), index_codec(index)
+
+
+def apply_search_params(index: faiss.Index, cfg: IndexConfig) -> None:
+    # 검색 파라미터는 인덱스 객체에 들어 있으므로 로드/복사 후 다시 적용
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = max(1, min(cfg.nprobe, ivf.nlist))
+        return
+    if index_kind(index) == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = cfg.ef_search
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    """검색 파라미터(ID 선택자)를 받는 인덱스인지 (PQ brute force(IndexPQ)는 params를 넘기면 예외)"""
+    return not isinstance(_base(index), faiss.IndexPQ)
+
+
+def search_parameters(index: faiss.Index, cfg: IndexConfig, sel: faiss.IDSelector) -> faiss.SearchParameters:
+    """ID 선택자를 넣은 검색 파라미터 (params를 넘기면 인덱스에 설정된 nprobe/efSearch 대신 이 값을 씀)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=sel, nprobe=max(1, min(cfg.nprobe, ivf.nlist)))
+    if index_kind(index) == "hnsw":
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=cfg.ef_search)
+    return faiss.SearchParameters(sel=sel)
+
+
+def export_vectors(index: faiss.Index) -> Tuple[np.ndarray, np.ndarray]:
+    """인덱스에 들어 있는 (ids, 벡터) 전부 꺼내기 (재학습/재구성용, PQ는 근사 복원값)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        il = ivf.invlists
+        parts = [faiss.rev_swig_ptr(il.get_ids(l), il.list_size(l)).copy()
+                 for l in range(ivf.nlist) if il.list_size(l) > 0]
+        ids = np.concatenate(parts).astype(np.int64) if parts else np.empty(0, dtype=np.int64)
+        if len(ids) == 0:
+            return ids, np.empty((0, index.d), dtype=np.float32)
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)  # id → 위치 조회용 (삭제와 호환)
+        try:
+            vecs = ivf.reconstruct_batch(ids)
+        finally:
+            ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+        return ids, vecs
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    vecs = index.index.reconstruct_n(0, index.ntotal) if index.ntotal else np.empty((0, index.d), dtype=np.float32)
+    return ids, vecs
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    # HNSW는 그래프 구조라 개별 삭제 미지원 → 재구성 필요
+    return index_kind(index) != "hnsw"
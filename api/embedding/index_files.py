@@ -0,0 +1,176 @@
+# 인덱스 파일 게시(publish)/로드 유틸
+# - 저장: 버전별 파일(<index>.v{N})에 임시파일 → fsync → rename으로 원자적 기록, 마지막에 manifest 교체
+#   → 저장 도중 크래시가 나거나 다른 워커가 동시에 읽어도 반쯤 쓰인 파일을 보지 않음
+# - manifest(<index>.manifest.json): 현재 버전과 그 버전의 파일 목록 (읽는 쪽은 항상 manifest 기준)
+#   델타 세그먼트를 쓰면 기준 세그먼트 파일은 이전 버전 것을 그대로 가리키고 segments에 델타 파일 목록
+# - 로드: IO_FLAG_MMAP_IFC로 flat 코드(Flat/SQ/PQ/HNSW 저장소)를 mmap → 워커끼리 페이지 캐시 공유, 시작 시간 단축
+#   (IVF 역색인은 이 플래그와 무관하게 메모리로 읽음)
+# - 정리: 직전 manifest를 읽은 워커가 아직 파일을 여는 중일 수 있으므로, manifest에서 빠진 파일은
+#   retired(파일 이름 → 빠진 시각)에 기록해 두고 INDEX_FILE_GRACE_SECONDS가 지난 뒤에만 삭제
+# - 쓰기 락(<index>.lock, flock): 여러 워커 프로세스의 쓰기 트랜잭션을 직렬화 (최신 버전 확인 ~ manifest 게시)
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, Optional
+
+import faiss
+
+try:
+    import fcntl
+except ImportError:  # Windows - 프로세스 간 락 없음 (단일 워커로 실행)
+    fcntl = None
+
+MANIFEST_SUFFIX = ".manifest.json"
+LOCK_SUFFIX = ".lock"
+TMP_SUFFIX = ".tmp"
+KEEP_VERSIONS = 2  # 현재 + 직전 버전 파일만 남김 (직전 버전은 교체 중인 워커용)
+# manifest에서 빠지거나 새로 쓴 지 이 시간(초)이 안 된 파일은 버전이 오래돼도 남김 (로드 중인 워커용)
+INDEX_FILE_GRACE_SECONDS = float(os.getenv("INDEX_FILE_GRACE_SECONDS", "300"))
+
+
+def manifest_path(index_path: str) -> str:
+    return index_path + MANIFEST_SUFFIX
+
+
+def versioned_path(index_path: str, version: int) -> str:
+    return f"{index_path}.v{version}"
+
+
+def read_manifest(index_path: str) -> Optional[Dict[str, Any]]:
+    path = manifest_path(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fsync_dir(d: str) -> None:
+    try:
+        fd = os.open(d, os.O_RDONLY)
+    except OSError:
+        return  # 디렉터리 fsync 미지원 플랫폼
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, write_fn: Callable[[str], None]) -> None:
+    """write_fn(임시경로)로 쓰고 fsync 후 path로 rename (같은 디렉터리 안에서만 원자적)"""
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=TMP_SUFFIX, dir=d)
+    os.close(fd)
+    try:
+        write_fn(tmp)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(d)
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    path 파일에 배타 flock (프로세스가 죽으면 OS가 자동 해제)
+    - 반환값: 락을 잡았는지 (blocking=False면 다른 프로세스가 잡고 있을 때 기다리지 않고 False)
+    - 같은 프로세스 안의 스레드 직렬화는 호출하는 쪽 threading.Lock 몫
+    """
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def index_lock(index_path: str) -> ContextManager[bool]:
+    # 인덱스 쓰기 락 - 최신 버전 확인부터 manifest 게시까지 잡아야 워커끼리 같은 다음 버전을 덮어쓰지 않음
+    return file_lock(index_path + LOCK_SUFFIX)
+
+
+def write_index_atomic(index: faiss.Index, path: str) -> None:
+    atomic_write(path, lambda tmp: faiss.write_index(index, tmp))
+
+
+def _referenced(manifest: Dict[str, Any]) -> set:
+    # manifest가 가리키는 파일 이름 (기준 세그먼트 파일 + 델타 세그먼트)
+    return set(manifest.get("files", {}).values()) | set(manifest.get("segments", []))
+
+
+def publish_manifest(index_path: str, version: int, files: Dict[str, str], **extra: Any) -> Dict[str, Any]:
+    manifest = {
+        "version": version,
+        "files": {k: os.path.basename(v) for k, v in files.items()},
+        "saved_at": datetime.now(timezone.utc).isoformat(),
+        **extra,
+    }
+    # 직전 manifest에서 빠지는 파일은 빠진 시각을 기록 (유예 시간 동안 cleanup_old_versions가 남김)
+    previous = read_manifest(index_path)
+    if previous is not None:
+        now = time.time()
+        retired = {n: t for n, t in previous.get("retired", {}).items() if now - t < INDEX_FILE_GRACE_SECONDS}
+        for name in _referenced(previous) - _referenced(manifest):
+            retired.setdefault(name, now)
+        if retired:
+            manifest["retired"] = retired
+
+    def _write(tmp: str) -> None:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    atomic_write(manifest_path(index_path), _write)
+    return manifest
+
+
+def manifest_file(index_path: str, manifest: Dict[str, Any], key: str) -> Optional[str]:
+    name = manifest.get("files", {}).get(key)
+    return os.path.join(os.path.dirname(index_path) or ".", name) if name else None
+
+
+def cleanup_old_versions(index_path: str, current_version: int, keep: Iterable[str] = ()) -> None:
+    # 오래된 버전 파일 삭제 (이미 mmap 중인 워커는 inode가 살아 있어 영향 없음)
+    # keep: 현재 manifest가 가리키는 파일 이름 (기준/델타 세그먼트는 버전이 오래돼도 남김)
+    # 유예 시간 안에 manifest에서 빠졌거나 새로 쓴 파일도 남김 → 직전 manifest를 읽고 아직 열기 전인 워커 보호
+    d = os.path.dirname(index_path) or "."
+    prefix = os.path.basename(index_path) + ".v"
+    keep = set(keep)
+    manifest = read_manifest(index_path) or {}
+    now = time.time()
+    cutoff = now - INDEX_FILE_GRACE_SECONDS
+    recent = {n for n, t in manifest.get("retired", {}).items() if now - t < INDEX_FILE_GRACE_SECONDS}
+    for name in os.listdir(d):
+        if not name.startswith(prefix) or name in keep or name in recent or name.endswith(TMP_SUFFIX):
+            continue  # .tmp: 다른 워커가 쓰는 중인 파일 (rename 전)
+        ver = name[len(prefix):].split(".", 1)[0]
+        if not ver.isdigit() or int(ver) > current_version - KEEP_VERSIONS:
+            continue
+        path = os.path.join(d, name)
+        try:
+            if os.path.getmtime(path) <= cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def read_index(path: str, mmap: bool) -> faiss.Index:
+    return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC) if mmap else faiss.read_index(path)
@@ -1,20 +1,24 @@
 # 프로세스 전체에서 하나의 FaissStore만 쓰기 위해 싱글톤 패턴으로 생성
+# - 실제 인스턴스는 StoreManager가 버전 단위로 관리 (동기화 결과를 재시작 없이 반영)
 from threading import Lock
 from api.embedding.faiss_store import FaissStore
-from api.embedding.vectorizer import embedding_dimension
+from api.embedding.store_manager import StoreManager
+from api.embedding.vectorizer import MODEL_ID, embedding_dimension
 import os
 
 INDEX_PATH = os.getenv("INDEX_PATH", "data/supports.faiss")
 
-_store = None
+_manager = None
 _lock = Lock()
 
-def get_store() -> FaissStore:
-    global _store
-    if _store is None: # 최조 1회만 생성, 이후 같은 객체 반환(싱글톤 패턴)
+def get_store_manager() -> StoreManager:
+    global _manager
+    if _manager is None: # 최조 1회만 생성, 이후 같은 객체 반환(싱글톤 패턴)
         with _lock: # 멀티스레드 환경에서 동시에 접근해도 안전하도록 lock 설정
-            if _store is None:
-                s = FaissStore(index_path=INDEX_PATH, dim=embedding_dimension())
-                s.load()
-                _store = s
-    return _store
+            if _manager is None:
+                _manager = StoreManager(index_path=INDEX_PATH, dim_fn=embedding_dimension, model=MODEL_ID)
+    return _manager
+
+def get_store() -> FaissStore:
+    # 현재 서빙 중인 스냅샷 (검색 전용)
+    return get_store_manager().current()
@@ -0,0 +1,279 @@
+# 검색 필터용 공고 메타데이터 컬럼 (FAISS ID 옆에 배열로 보관)
+# - 컬럼: 지역 코드(uint16, 문자열 사전), 나이 하한/상한(uint8), 모집 중 여부(int8), 마감일(int32, epoch 일수)
+# - 필터는 검색 "전"에 제외할 ID 비트맵을 만들어 FAISS IDSelector로 넘김 → 검색 안에서 걸러져 top-k가 채워짐
+# - 값을 모르는 항목(이전 버전 인덱스, 빈 필드)은 해당 조건을 통과 (필터 도입 전과 같은 결과)
+# - 수정(upsert/remove)은 항상 새 배열을 만들어 교체 → 복사본끼리 배열을 공유해도 안전
+# - 마감일이 지난 공고는 스위퍼가 지우기 전까지 검색 때 날짜 필터로 제외 (EXPIRY_FILTER)
+#   선택자는 (필터 → 선택자) 캐시로 재사용, 컬럼이 바뀌면 비움 → 검색마다 비트맵을 다시 만들지 않음
+
+import io
+import os
+import re
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from api.embedding.index_files import atomic_write
+
+AGE_MAX = 200
+NO_END = np.iinfo(np.int32).max  # 마감일 없음
+UNKNOWN = -1  # 모집 여부 모름
+_EPOCH = date(1970, 1, 1)
+_BITMAP_MAX_ID = 1 << 27  # 이보다 큰 ID가 있으면 비트맵 대신 해시 기반 선택자 (16MB 상한)
+_SELECTOR_CACHE_MAX = 64
+
+EXPIRY_FILTER = os.getenv("EXPIRY_FILTER", "1") not in ("0", "false", "False")  # 검색 때 마감 공고 제외
+EXPIRY_GRACE_DAYS = int(os.getenv("EXPIRY_GRACE_DAYS", "0"))  # 마감일 + N일까지는 유지
+
+# (지역, 나이 하한, 나이 상한, 모집 중 여부, 마감일)
+MetadataRow = Tuple[str, int, int, int, int]
+
+
+def meta_path(index_path: str) -> str:
+    return f"{index_path}.meta.npz"
+
+
+def _age_range(target_age: Optional[str]) -> Tuple[int, int]:
+    # startup_fetch_service._normalize_target_age 결과 형식 기준, 못 읽으면 제한 없음
+    if not target_age or target_age == "제한 없음":
+        return 0, AGE_MAX
+    m = re.fullmatch(r"만 (\d+)세 이상 ~ 만 (\d+)세 이하", target_age)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    m = re.fullmatch(r"만 (\d+)세 이하", target_age)
+    if m:
+        return 0, int(m.group(1))
+    m = re.fullmatch(r"만 (\d+)세 이상", target_age)
+    if m:
+        return int(m.group(1)), AGE_MAX
+    return 0, AGE_MAX
+
+
+def _days(d: Optional[date]) -> int:
+    return (d - _EPOCH).days if d else NO_END
+
+
+def expiry_cutoff(today: Optional[date] = None) -> date:
+    """마감일이 이 날짜보다 이전이면 만료 (마감 당일은 유지)"""
+    return (today or date.today()) - timedelta(days=EXPIRY_GRACE_DAYS)
+
+
+def is_expired(end_date: Optional[date], today: Optional[date] = None) -> bool:
+    return end_date is not None and end_date < expiry_cutoff(today)
+
+
+def metadata_row(dto: Any) -> MetadataRow:
+    """CreateStartupResponseDTO → 메타데이터 행"""
+    lo, hi = _age_range(getattr(dto, "target_age", None))
+    recruiting = getattr(dto, "is_recruiting", None)
+    return (
+        (getattr(dto, "region", None) or "").strip(),
+        min(lo, AGE_MAX),
+        min(hi, AGE_MAX),
+        UNKNOWN if recruiting is None else int(bool(recruiting)),
+        _days(getattr(dto, "end_date", None)),
+    )
+
+
+@dataclass(frozen=True)
+class SearchFilter:
+    region: Optional[str] = None  # 지역명 (공고 지역에 포함되거나 "전국"이면 통과)
+    age: Optional[int] = None  # 만 나이 (공고 나이 범위 안이면 통과)
+    recruiting_only: bool = False  # 모집 중인 공고만
+    open_on: Optional[date] = None  # 이 날짜까지 마감되지 않은 공고만
+
+    def is_empty(self) -> bool:
+        return not (self.region or self.age is not None or self.recruiting_only or self.open_on)
+
+    def cache_key(self) -> str:
+        return f"r={self.region or ''}|a={'' if self.age is None else self.age}|o={int(self.recruiting_only)}|d={self.open_on or ''}"
+
+    def open_from(self, cutoff: date) -> "SearchFilter":
+        # 마감일 조건을 cutoff 이후로 좁힘 (이미 더 늦은 날짜면 그대로)
+        if self.open_on is not None and self.open_on >= cutoff:
+            return self
+        return replace(self, open_on=cutoff)
+
+
+def with_expiry(flt: Optional[SearchFilter], today: Optional[date] = None) -> Optional[SearchFilter]:
+    """EXPIRY_FILTER가 켜져 있으면 마감 공고 제외 조건 추가"""
+    if not EXPIRY_FILTER:
+        return flt
+    return (flt or SearchFilter()).open_from(expiry_cutoff(today))
+
+
+class MetadataColumns:
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)  # 정렬 유지 (searchsorted 조회)
+        self.region = np.empty(0, dtype=np.uint16)
+        self.age_min = np.empty(0, dtype=np.uint8)
+        self.age_max = np.empty(0, dtype=np.uint8)
+        self.recruiting = np.empty(0, dtype=np.int8)
+        self.end_day = np.empty(0, dtype=np.int32)
+        self.regions: List[str] = [""]  # 코드 → 지역 문자열 (0 = 모름)
+        self._selectors: dict = {}  # SearchFilter → Exclusion(걸리는 ID가 없으면 None), 컬럼이 바뀌면 비움
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def _columns(self):
+        return ("region", "age_min", "age_max", "recruiting", "end_day")
+
+    def copy(self) -> "MetadataColumns":
+        other = MetadataColumns()
+        other.ids = self.ids
+        for c in self._columns():
+            setattr(other, c, getattr(self, c))
+        other.regions = list(self.regions)
+        return other
+
+    # ---------- 파일 ----------
+    def save(self, path: str) -> None:
+        buf = io.BytesIO()
+        np.savez(buf, ids=self.ids, regions=np.asarray(self.regions, dtype=object).astype(str),
+                 **{c: getattr(self, c) for c in self._columns()})
+
+        def _write(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                f.write(buf.getvalue())
+
+        atomic_write(path, _write)
+
+    def load(self, path: str) -> bool:
+        try:
+            data = np.load(path, allow_pickle=False)
+        except FileNotFoundError:
+            return False
+        with data:
+            self.ids = data["ids"]
+            for c in self._columns():
+                setattr(self, c, data[c])
+            self.regions = [str(r) for r in data["regions"]] or [""]
+        self._selectors = {}
+        return True
+
+    # ---------- 수정 ----------
+    def _region_codes(self, names: Iterable[str]) -> np.ndarray:
+        lookup = {r: i for i, r in enumerate(self.regions)}
+        codes = []
+        for name in names:
+            if name not in lookup:
+                lookup[name] = len(self.regions)
+                self.regions.append(name)
+            codes.append(lookup[name])
+        return np.asarray(codes, dtype=np.uint16)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0 or len(self) == 0:
+            return
+        keep = ~np.isin(self.ids, ids)
+        if keep.all():
+            return
+        self._selectors = {}
+        self.ids = self.ids[keep]
+        for c in self._columns():
+            setattr(self, c, getattr(self, c)[keep])
+
+    def upsert(self, ids: np.ndarray, rows: List[MetadataRow]) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        self.remove(ids)
+        self._selectors = {}
+        new = {
+            "region": self._region_codes(r[0] for r in rows),
+            "age_min": np.asarray([r[1] for r in rows], dtype=np.uint8),
+            "age_max": np.asarray([r[2] for r in rows], dtype=np.uint8),
+            "recruiting": np.asarray([r[3] for r in rows], dtype=np.int8),
+            "end_day": np.asarray([r[4] for r in rows], dtype=np.int32),
+        }
+        all_ids = np.concatenate([self.ids, ids])
+        order = np.argsort(all_ids, kind="stable")
+        self.ids = all_ids[order]
+        for c in self._columns():
+            setattr(self, c, np.concatenate([getattr(self, c), new[c]])[order])
+
+    def get(self, ids: np.ndarray) -> List[Optional[MetadataRow]]:
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self) == 0:
+            return [None] * len(ids)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self) - 1)
+        found = self.ids[pos] == ids
+        return [
+            (self.regions[self.region[p]], int(self.age_min[p]), int(self.age_max[p]),
+             int(self.recruiting[p]), int(self.end_day[p])) if f else None
+            for p, f in zip(pos, found)
+        ]
+
+    def changed(self, ids: np.ndarray, rows: List[MetadataRow]) -> List[bool]:
+        """저장된 행과 다른지 (없는 ID는 True)"""
+        return [old != new for old, new in zip(self.get(ids), rows)]
+
+    # ---------- 필터 ----------
+    def excluded_ids(self, flt: SearchFilter) -> np.ndarray:
+        """필터 조건에 걸리는(제외할) ID"""
+        fail = np.zeros(len(self), dtype=bool)
+        if flt.region:
+            want = flt.region.strip()
+            ok = np.asarray([not r or want in r or "전국" in r for r in self.regions], dtype=bool)
+            fail |= ~ok[self.region]
+        if flt.age is not None:
+            fail |= (self.age_min > flt.age) | (self.age_max < flt.age)
+        if flt.recruiting_only:
+            fail |= self.recruiting == 0
+        if flt.open_on is not None:
+            fail |= self.end_day < _days(flt.open_on)
+        return self.ids[fail]
+
+    def exclusion(self, flt: Optional[SearchFilter]) -> Optional["Exclusion"]:
+        """
+        필터에 걸리는 ID와 선택자 - 필터가 없거나 걸리는 ID가 없으면 None
+        - 제외할 ID 비트맵 + IDSelectorNot → 메타데이터가 없는 ID는 통과
+        - 같은 필터는 컬럼이 바뀔 때까지 캐시된 값 재사용 (검색은 선택자를 읽기만 함)
+        """
+        if flt is None or flt.is_empty():
+            return None
+        # 서빙 스냅샷을 여러 검색 스레드가 같이 씀 → 다른 스레드가 캐시를 비워도 되도록 만든 값을 그대로 반환
+        cache = self._selectors
+        if flt in cache:
+            try:
+                return cache[flt]
+            except KeyError:
+                pass  # 확인 직후 다른 스레드가 비움
+        excl = self._build_exclusion(flt)
+        if len(cache) >= _SELECTOR_CACHE_MAX:
+            cache = self._selectors = {}
+        cache[flt] = excl
+        return excl
+
+    def _build_exclusion(self, flt: SearchFilter) -> Optional["Exclusion"]:
+        excluded = self.excluded_ids(flt)
+        if len(excluded) == 0:
+            return None
+        max_id = int(excluded.max())
+        if 0 <= int(excluded.min()) and max_id < _BITMAP_MAX_ID:
+            bits = np.zeros(max_id + 1, dtype=bool)
+            bits[excluded] = True
+            keep = np.packbits(bits, bitorder="little")  # faiss 비트맵: id >> 3 바이트의 id & 7 비트
+            inner = faiss.IDSelectorBitmap(len(keep), faiss.swig_ptr(keep))  # 길이는 바이트 수
+        else:
+            keep = np.ascontiguousarray(excluded)
+            inner = faiss.IDSelectorBatch(len(keep), faiss.swig_ptr(keep))
+        return Exclusion(sel=faiss.IDSelectorNot(inner), ids=excluded, keep=(keep, inner))
+
+
+@dataclass
+class Exclusion:
+    sel: Any  # 제외 대상이 아닌 ID만 통과하는 IDSelector
+    ids: np.ndarray  # 제외할 ID (정렬됨)
+    keep: Any  # 선택자가 가리키는 배열/객체 (검색 끝까지 살아 있어야 함)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0])
+
+    def excludes(self, ids: np.ndarray) -> np.ndarray:
+        return np.isin(ids, self.ids)
@@ -0,0 +1,146 @@
+# 원본(float32) 벡터 보관소
+# - 압축 코덱(fp16/sq8/pq) 인덱스 옆에 두고 상위 후보 재정렬(exact re-rank)과 재학습에 사용
+# - 기준(base): 저장된 파일을 mmap으로 열어서 후보 행만 페이지 단위로 읽음 (워커끼리 페이지 캐시 공유)
+#   지운 행은 dead 표시만 (벡터 배열은 복사/이동하지 않음)
+# - 추가분(tail): 마지막 저장 이후 넣은 벡터만 메모리에 보관 → 쓰기 비용은 바뀐 공고 수에 비례
+# - 저장(= 인덱스 기준 세그먼트 저장) 때 살아 있는 행만 새 파일에 청크 단위로 기록하고 그 파일을 다시 mmap (압축)
+# - 수정(upsert/remove)은 항상 새 배열을 만들어 교체 → 복사본끼리 배열을 공유해도 안전
+
+import os
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from api.embedding.index_files import atomic_write
+
+_SAVE_CHUNK_ROWS = 65536  # 저장 시 한 번에 옮기는 행 수 (전체를 메모리로 올리지 않음)
+
+
+def raw_paths(index_path: str) -> Tuple[str, str]:
+    return f"{index_path}.raw_ids.npy", f"{index_path}.raw_vecs.npy"
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    # 파일 객체로 넘겨야 np.save가 확장자(.npy)를 덧붙이지 않음
+    with open(path, "wb") as f:
+        np.save(f, arr)
+
+
+def _lookup(sorted_ids: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(위치, 존재 여부 마스크) - sorted_ids에서 ids 찾기"""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return pos, sorted_ids[pos] == ids
+
+
+class RawVectorStore:
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids = np.empty(0, dtype=np.int64)  # 기준 행 ID (정렬된 상태 유지, searchsorted 조회)
+        self.vecs = np.empty((0, dim), dtype=np.float32)  # 기준 행 벡터 (로드 후엔 mmap)
+        self.dead = np.zeros(0, dtype=bool)  # 기준 행별 삭제 여부
+        self.n_dead = 0
+        self.tail_ids = np.empty(0, dtype=np.int64)  # 마지막 저장 이후 추가된 행 (정렬)
+        self.tail_vecs = np.empty((0, dim), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return int(self.ids.shape[0]) - self.n_dead + int(self.tail_ids.shape[0])
+
+    def copy(self) -> "RawVectorStore":
+        other = RawVectorStore(self.dim)
+        other.ids, other.vecs, other.dead, other.n_dead = self.ids, self.vecs, self.dead, self.n_dead
+        other.tail_ids, other.tail_vecs = self.tail_ids, self.tail_vecs
+        return other
+
+    # ---------- 파일 ----------
+    def load(self, index_path: str) -> bool:
+        ids_path, vecs_path = raw_paths(index_path)
+        if not (os.path.exists(ids_path) and os.path.exists(vecs_path)):
+            return False
+        self._open(ids_path, vecs_path)
+        return True
+
+    def _open(self, ids_path: str, vecs_path: str) -> None:
+        self.ids = np.load(ids_path)
+        self.vecs = np.load(vecs_path, mmap_mode="r")
+        self.dead, self.n_dead = np.zeros(len(self.ids), dtype=bool), 0
+        self.tail_ids = np.empty(0, dtype=np.int64)
+        self.tail_vecs = np.empty((0, self.dim), dtype=np.float32)
+
+    def save(self, index_path: str) -> None:
+        # 살아 있는 기준 행 + 추가분을 ID 순서로 합쳐 새 파일에 기록 → 그 파일을 기준으로 다시 mmap
+        ids_path, vecs_path = raw_paths(index_path)
+        base_pos = np.flatnonzero(~self.dead)
+        all_ids = np.concatenate([self.ids[base_pos], self.tail_ids])
+        order = np.argsort(all_ids, kind="stable")
+        n_base = len(base_pos)
+
+        def _write_vecs(tmp: str) -> None:
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(len(order), self.dim))
+            for start in range(0, len(order), _SAVE_CHUNK_ROWS):
+                src = order[start:start + _SAVE_CHUNK_ROWS]
+                from_base = src < n_base
+                chunk = np.empty((len(src), self.dim), dtype=np.float32)
+                chunk[from_base] = self.vecs[base_pos[src[from_base]]]
+                chunk[~from_base] = self.tail_vecs[src[~from_base] - n_base]
+                out[start:start + len(src)] = chunk
+            out.flush()
+            del out
+
+        atomic_write(ids_path, lambda tmp: _save_npy(tmp, all_ids[order]))
+        atomic_write(vecs_path, _write_vecs)
+        self._open(ids_path, vecs_path)
+
+    # ---------- 수정 ----------
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if len(ids) == 0 or len(self) == 0:
+            return
+        pos, found = _lookup(self.ids, ids)
+        pos = pos[found]
+        pos = pos[~self.dead[pos]]
+        if len(pos):
+            dead = self.dead.copy()
+            dead[pos] = True
+            self.dead, self.n_dead = dead, int(dead.sum())
+        if len(self.tail_ids):
+            keep = ~np.isin(self.tail_ids, ids)
+            if not keep.all():
+                self.tail_ids, self.tail_vecs = self.tail_ids[keep], self.tail_vecs[keep]
+
+    def upsert(self, ids: np.ndarray, vecs: np.ndarray) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        self.remove(ids)
+        all_ids = np.concatenate([self.tail_ids, ids])
+        all_vecs = np.concatenate([self.tail_vecs, np.asarray(vecs, dtype=np.float32).reshape(-1, self.dim)])
+        order = np.argsort(all_ids, kind="stable")
+        self.tail_ids = all_ids[order]
+        self.tail_vecs = all_vecs[order]
+
+    # ---------- 조회 ----------
+    def get(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(벡터, 존재 여부 마스크) - 없는 ID 행은 0벡터"""
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.zeros((len(ids), self.dim), dtype=np.float32)
+        if len(self) == 0 or len(ids) == 0:
+            return out, np.zeros(len(ids), dtype=bool)
+        pos, found = _lookup(self.ids, ids)
+        if len(self.ids):
+            found &= ~self.dead[pos]
+        if found.any():
+            out[found] = self.vecs[pos[found]]
+        t_pos, t_found = _lookup(self.tail_ids, ids)
+        if t_found.any():
+            out[t_found] = self.tail_vecs[t_pos[t_found]]
+        return out, found | t_found
+
+    def all(self) -> Tuple[np.ndarray, np.ndarray]:
+        # 재학습/재구성용 전체 (ID 순서), 지운 행/추가분이 없으면 mmap을 그대로 돌려줌
+        if self.n_dead == 0 and len(self.tail_ids) == 0:
+            return self.ids, self.vecs
+        live = ~self.dead
+        ids = np.concatenate([self.ids[live], self.tail_ids])
+        vecs = np.concatenate([np.asarray(self.vecs[live]), self.tail_vecs])
+        order = np.argsort(ids, kind="stable")
+        return ids[order], vecs[order]
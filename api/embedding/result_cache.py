@@ -0,0 +1,75 @@
+# 유사도 검색 결과(top-k) 캐시
+# - 키: (정규화된 쿼리 해시, 인덱스 generation) → 가장 큰 k로 검색한 결과만 보관
+# - 더 작은 k 요청은 저장된 결과를 잘라서 응답 (같은 인덱스에서 top-k는 top-K의 앞부분)
+# - 인덱스가 바뀌면(generation 증가) 이전 세대 항목은 전부 버림
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+Hits = List[Dict[str, Any]]
+
+
+class ResultCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max(0, int(max_entries))
+        self._data: "OrderedDict[str, Tuple[int, Hits]]" = OrderedDict()
+        self._generation = 0
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _sync_generation(self, generation: int) -> bool:
+        """현재 세대 기준으로 맞추기, 이미 지난 세대면 False"""
+        if generation < self._generation:
+            return False
+        if generation > self._generation:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._generation = generation
+        return True
+
+    def get(self, qhash: str, generation: int, k: int) -> Optional[Hits]:
+        with self._lock:
+            entry = self._data.get(qhash) if self._sync_generation(generation) else None
+            if entry is not None:
+                cached_k, hits = entry
+                # 더 큰 k로 검색했거나, 결과가 k보다 적게 나왔던 경우(전체를 이미 다 본 것)만 재사용
+                if cached_k >= k or len(hits) < cached_k:
+                    self._data.move_to_end(qhash)
+                    self.hits += 1
+                    return hits[:k]
+            self.misses += 1
+            return None
+
+    def put(self, qhash: str, generation: int, k: int, hits: Hits) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if not self._sync_generation(generation):
+                return  # 교체 전 스냅샷으로 검색한 결과는 저장하지 않음
+            prev = self._data.get(qhash)
+            if prev is not None and prev[0] >= k:
+                return  # 이미 더 큰 k 결과가 있음
+            self._data[qhash] = (k, list(hits))
+            self._data.move_to_end(qhash)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits / total) if total else 0.0,
+            }
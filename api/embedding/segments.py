@@ -0,0 +1,84 @@
+# 델타 세그먼트 - 저장할 때마다 인덱스 전체를 다시 쓰지 않기 위한 변경분 파일
+# - 기준(base) 세그먼트: 한 번 저장(게시)되면 더 이상 수정하지 않는 인덱스 + 원본/해시/메타데이터/삭제 표시 파일
+# - 그 뒤의 변경은 저장 1회당 델타 파일 하나(<index>.v{N}.seg.npz)에 추가만 함
+#   drop(지운/다시 넣은 ID) → ids/vecs(새 벡터) → 해시/메타데이터 갱신 순서로 적용하면 저장 시점 상태와 같음
+#   → 쓰기 I/O는 바뀐 공고 수에 비례 (코퍼스 크기와 무관)
+# - 로드: 기준 세그먼트(mmap) 위에 manifest의 델타 파일을 순서대로 재생
+#   새 벡터는 메모리의 작은 flat 인덱스(FaissStore.delta)에, 기준 세그먼트 삭제는 tombstone 표시로
+# - 델타가 SEGMENT_MAX_DELTAS개를 넘거나 벡터 수가 기준의 SEGMENT_FOLD_RATIO를 넘으면
+#   StoreManager가 백그라운드에서 합쳐서 새 기준 세그먼트로 게시
+# - IDMap2(flat/HNSW) + tombstone 삭제일 때만 사용 (IVF는 기존처럼 저장마다 전체 기록)
+
+import io
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+import faiss
+import numpy as np
+
+from api.embedding.index_files import atomic_write, versioned_path
+from api.embedding.metadata import MetadataRow
+
+SEGMENT_DELTAS = os.getenv("SEGMENT_DELTAS", "1") not in ("0", "false", "False")
+SEGMENT_MAX_DELTAS = int(os.getenv("SEGMENT_MAX_DELTAS", "32"))
+SEGMENT_FOLD_RATIO = float(os.getenv("SEGMENT_FOLD_RATIO", "0.1"))
+SEGMENT_FOLD_MIN = int(os.getenv("SEGMENT_FOLD_MIN", "1024"))  # 델타 벡터가 이보다 적으면 비율과 무관하게 안 합침
+
+
+def segment_path(index_path: str, version: int) -> str:
+    return f"{versioned_path(index_path, version)}.seg.npz"
+
+
+def new_delta_index(dim: int) -> faiss.Index:
+    # 델타는 작으므로 항상 정확 검색 (삭제도 remove_ids로 바로)
+    return faiss.index_factory(dim, "IDMap2,Flat", faiss.METRIC_INNER_PRODUCT)
+
+
+def needs_fold(n_deltas: int, delta_rows: int, base_rows: int) -> bool:
+    if n_deltas == 0:
+        return False
+    return n_deltas >= SEGMENT_MAX_DELTAS or delta_rows >= max(SEGMENT_FOLD_MIN, SEGMENT_FOLD_RATIO * base_rows)
+
+
+@dataclass
+class SegmentDelta:
+    dim: int
+    drop: np.ndarray  # 먼저 지울 ID (삭제/다시 넣은 공고)
+    ids: np.ndarray  # 새로 넣을 ID
+    vecs: np.ndarray  # (len(ids), dim) 정규화된 벡터
+    hash_refs: List[str] = field(default_factory=list)
+    hash_values: List[str] = field(default_factory=list)
+    meta_ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    meta_rows: List[MetadataRow] = field(default_factory=list)
+
+    def is_empty(self) -> bool:
+        return not (len(self.drop) or len(self.ids) or self.hash_refs or len(self.meta_ids))
+
+    # ---------- 파일 ----------
+    def save(self, path: str) -> None:
+        rows = self.meta_rows
+        buf = io.BytesIO()
+        np.savez(
+            buf, drop=self.drop, ids=self.ids, vecs=np.asarray(self.vecs, dtype=np.float32).reshape(-1, self.dim),
+            hash_refs=np.asarray(self.hash_refs, dtype=str), hash_values=np.asarray(self.hash_values, dtype=str),
+            meta_ids=self.meta_ids,
+            meta_region=np.asarray([r[0] for r in rows], dtype=str),
+            meta_ints=np.asarray([r[1:] for r in rows], dtype=np.int64).reshape(-1, 4),
+        )
+
+        def _write(tmp: str) -> None:
+            with open(tmp, "wb") as f:
+                f.write(buf.getvalue())
+
+        atomic_write(path, _write)
+
+    @classmethod
+    def load(cls, path: str, dim: int) -> "SegmentDelta":
+        # 델타가 하나라도 빠지면 저장 시점 상태를 재현할 수 없으므로 없는 파일은 그대로 예외
+        with np.load(path, allow_pickle=False) as data:
+            rows = [(str(region), *map(int, ints)) for region, ints in zip(data["meta_region"], data["meta_ints"])]
+            return cls(dim=dim, drop=data["drop"], ids=data["ids"], vecs=data["vecs"],
+                       hash_refs=[str(r) for r in data["hash_refs"]],
+                       hash_values=[str(h) for h in data["hash_values"]],
+                       meta_ids=data["meta_ids"], meta_rows=rows)
@@ -0,0 +1,314 @@
+# 샤드로 나눈 FaissStore (INDEX_SHARDS > 1일 때 StoreManager가 사용)
+# - ID를 N개의 FaissStore(<index>.shard{i})에 나눠 보관: ID 해시(ID % N) 또는 메타데이터 필드(지역/마감 연도)
+#   필드 기준이면 처음 넣을 때(업서트) 위치를 정하고, 메타데이터만 바뀌면 그대로 둠
+#   (검색은 항상 모든 샤드에 보내므로 위치는 결과에 영향 없음, 필드 값이 없으면 ID 해시로)
+# - 검색: 샤드별 top-k를 스레드 풀에서 동시에 실행 (FAISS 검색은 GIL을 놓음) → 점수 순 힙 병합
+#   필터/마감 제외/재정렬은 샤드 안에서 그대로 적용됨 (샤드마다 top-k를 채우므로 합친 결과도 k개)
+# - 공개 API는 FaissStore와 같음 (search/search_one/upsert_with_external_ids/remove_by_external_ids ...)
+#   hashes/meta는 전체 샤드를 합쳐 보는 읽기 전용 뷰 (동기화 비교, 마감 스위퍼용)
+# - 저장: 바뀐 샤드만 각자 버전/세그먼트로 게시 → 마지막에 <index>.manifest.json에 샤드 구성과 버전 게시
+#   (다른 워커는 이 manifest의 version으로 새 버전을 알아챔, 차원/모델 정보도 여기서 읽음)
+# - 저장된 구성(단일 인덱스, 샤드 수/기준)이 설정과 다르면 로드할 때 메모리에서 다시 나누고 다음 쓰기 때 저장
+
+import heapq
+import itertools
+import logging
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from api.embedding.faiss_store import INDEX_NOT_READY_MSG, FaissStore
+from api.embedding.index_factory import IndexConfig
+from api.embedding.index_files import cleanup_old_versions, publish_manifest, read_manifest
+from api.embedding.metadata import NO_END, MetadataRow, SearchFilter
+
+logger = logging.getLogger("startup_service")
+
+INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))  # 1 이하면 단일 FaissStore
+INDEX_SHARD_BY = os.getenv("INDEX_SHARD_BY", "hash")  # hash | region | year
+INDEX_SHARD_THREADS = int(os.getenv("INDEX_SHARD_THREADS", "0"))  # 검색 스레드 풀 크기, 0이면 min(샤드 수, vCPU)
+SHARD_KEYS = ("hash", "region", "year")
+
+_EPOCH = date(1970, 1, 1)
+
+_pools: Dict[int, ThreadPoolExecutor] = {}  # 스레드 수 → 풀 (서빙 중에는 닫지 않음)
+_pools_lock = threading.Lock()
+
+
+def shard_path(index_path: str, i: int) -> str:
+    return f"{index_path}.shard{i}"
+
+
+def _executor(shards: int) -> ThreadPoolExecutor:
+    # 스레드 수별로 프로세스 전체에서 하나 (스냅샷이 바뀔 때마다 스레드를 새로 만들지 않음)
+    # 샤드 수가 바뀌어도 이전 풀을 닫지 않음 → 이전 스냅샷으로 진행 중인 검색이 이미 가져간 풀에 계속 제출 가능
+    size = INDEX_SHARD_THREADS or min(shards, os.cpu_count() or 1)
+    pool = _pools.get(size)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(size)
+            if pool is None:
+                pool = _pools[size] = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"shard-search{size}")
+    return pool
+
+
+class _ShardedHashes:
+    # 샤드별 내용 해시 테이블을 합쳐 보는 뷰 (ref는 한 샤드에만 있음)
+    def __init__(self, shards: List[FaissStore]):
+        self._shards = shards
+
+    def __len__(self) -> int:
+        return sum(len(s.hashes) for s in self._shards)
+
+    def get(self, ref: str) -> Optional[str]:
+        for s in self._shards:
+            h = s.hashes.get(ref)
+            if h is not None:
+                return h
+        return None
+
+    def unchanged(self, refs: List[str], hashes: List[str]) -> List[bool]:
+        per_shard = [s.hashes.unchanged(refs, hashes) for s in self._shards]
+        return [any(col) for col in zip(*per_shard)]
+
+
+class _ShardedMeta:
+    # 샤드별 메타데이터 컬럼을 합쳐 보는 뷰
+    def __init__(self, shards: List[FaissStore]):
+        self._shards = shards
+
+    def __len__(self) -> int:
+        return sum(len(s.meta) for s in self._shards)
+
+    def get(self, ids: np.ndarray) -> List[Optional[MetadataRow]]:
+        out: List[Optional[MetadataRow]] = [None] * len(ids)
+        for s in self._shards:
+            for i, row in enumerate(s.meta.get(ids)):
+                if row is not None:
+                    out[i] = row
+        return out
+
+    def changed(self, ids: np.ndarray, rows: List[MetadataRow]) -> List[bool]:
+        """저장된 행과 다른지 (없는 ID는 True)"""
+        return [old != new for old, new in zip(self.get(ids), rows)]
+
+    def excluded_ids(self, flt: SearchFilter) -> np.ndarray:
+        """필터 조건에 걸리는(제외할) ID"""
+        return np.sort(np.concatenate([s.meta.excluded_ids(flt) for s in self._shards]))
+
+
+class ShardedFaissStore:
+    def __init__(self, index_path: str, dim: int, shards: int = INDEX_SHARDS, shard_by: str = INDEX_SHARD_BY,
+                 config: Optional[IndexConfig] = None, model: str = ""):
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"INDEX_SHARD_BY는 {SHARD_KEYS} 중 하나: {shard_by!r}")
+        self.index_path = index_path
+        self.dim = dim
+        self.model = model
+        self.config = config or IndexConfig.from_env()
+        self.shard_by = shard_by
+        self.shards: List[FaissStore] = [self._new_shard(i) for i in range(max(1, shards))]
+        self.version = 0  # 샤드 구성 manifest 버전
+
+    def _new_shard(self, i: int) -> FaissStore:
+        return FaissStore(index_path=shard_path(self.index_path, i), dim=self.dim, config=self.config, model=self.model)
+
+    # ---------- 기본 ----------
+    @property
+    def ntotal(self) -> int:
+        return sum(s.ntotal for s in self.shards)
+
+    @property
+    def generation(self) -> int:
+        # 샤드 세대는 전역 카운터 값 → 어느 샤드든 바뀌면 최댓값이 커짐 (결과 캐시 무효화)
+        return max(s.generation for s in self.shards)
+
+    @property
+    def hashes(self) -> _ShardedHashes:
+        return _ShardedHashes(self.shards)
+
+    @property
+    def meta(self) -> _ShardedMeta:
+        return _ShardedMeta(self.shards)
+
+    def _to_ids(self, refs: Iterable[str]) -> np.ndarray:
+        return np.asarray([np.int64(int(r)) for r in refs], dtype=np.int64)
+
+    def _hash_shard(self, ids: np.ndarray) -> np.ndarray:
+        return ids % len(self.shards)
+
+    def _field_shard(self, row: MetadataRow) -> Optional[int]:
+        if self.shard_by == "region":
+            return zlib.crc32(row[0].encode("utf-8")) % len(self.shards) if row[0] else None
+        if self.shard_by == "year":
+            return (_EPOCH + timedelta(days=int(row[4]))).year % len(self.shards) if row[4] != NO_END else None
+        return None
+
+    def _place(self, ids: np.ndarray, metadata: Optional[List[MetadataRow]]) -> np.ndarray:
+        # 새로 넣을 샤드 (필드 기준이면 메타데이터 값, 없으면 ID 해시)
+        dest = self._hash_shard(ids)
+        if self.shard_by != "hash" and metadata is not None:
+            for i, row in enumerate(metadata):
+                shard = self._field_shard(row)
+                if shard is not None:
+                    dest[i] = shard
+        return dest
+
+    def _locate(self, ids: np.ndarray) -> np.ndarray:
+        # 지금 들어 있는 샤드 (필드 기준이면 메타데이터가 있는 샤드, 없으면 ID 해시 샤드)
+        where = self._hash_shard(ids)
+        if self.shard_by != "hash":
+            for i, s in enumerate(self.shards):
+                where[np.isin(ids, s.meta.ids)] = i
+        return where
+
+    def _groups(self, where: np.ndarray):
+        for i, s in enumerate(self.shards):
+            idx = np.flatnonzero(where == i)
+            if len(idx):
+                yield s, idx
+
+    def _fan_out(self, fn: Callable[[FaissStore], Any], shards: Optional[List[FaissStore]] = None) -> List[Any]:
+        shards = self.shards if shards is None else shards
+        if len(shards) == 1:
+            return [fn(shards[0])]
+        return list(_executor(len(shards)).map(fn, shards))
+
+    # ---------- 로드/저장 ----------
+    def load(self) -> None:
+        manifest = read_manifest(self.index_path)
+        layout = (manifest.get("shards"), manifest.get("shard_by")) if manifest is not None else None
+        if manifest is not None:
+            self.version = int(manifest["version"])
+            self.model = self.model or manifest.get("model", "")
+        if layout == (len(self.shards), self.shard_by):
+            self._fan_out(lambda s: s.load())
+        elif manifest is not None or os.path.exists(self.index_path):
+            self._reshard(manifest)
+        else:
+            for s in self.shards:
+                s.load()  # 빈 인덱스
+
+    def _reshard(self, manifest: Optional[Dict[str, Any]]) -> None:
+        # 저장된 구성(단일 인덱스 또는 다른 샤드 수/기준)을 읽어서 지금 설정대로 다시 나눔 (저장은 다음 쓰기 때)
+        n_old = int(manifest.get("shards") or 0) if manifest is not None else 0
+        paths = [shard_path(self.index_path, i) for i in range(n_old)] if n_old else [self.index_path]
+        self.shards = [self._new_shard(i) for i in range(len(self.shards))]
+        self.clear()
+        for path in paths:
+            src = FaissStore(index_path=path, dim=self.dim, config=self.config, model=self.model)
+            src.load()
+            ids, vecs = src.live_vectors()
+            if not len(ids):
+                continue
+            refs = [str(i) for i in ids]
+            rows = src.meta.get(ids)
+            dest = self._place(ids, [r or ("", 0, 0, 0, NO_END) for r in rows])
+            for shard, idx in self._groups(dest):
+                part = [refs[i] for i in idx]
+                shard.add_with_external_ids(vecs[idx], part)
+                hashed = [r for r in part if src.hashes.get(r) is not None]
+                shard.hashes.update(hashed, [src.hashes.get(r) for r in hashed])
+                with_meta = [i for i in idx if rows[i] is not None]
+                shard.update_metadata([refs[i] for i in with_meta], [rows[i] for i in with_meta])
+        logger.info("[인덱스] 저장된 구성 %s → 샤드 %d개(%s)로 다시 나눔, ntotal=%d (다음 동기화 때 저장)",
+                    f"샤드 {n_old}개" if n_old else "단일 인덱스", len(self.shards), self.shard_by, self.ntotal)
+
+    def save(self) -> None:
+        """바뀐 샤드만 각자 게시한 뒤 샤드 구성 manifest를 새 버전으로 게시"""
+        for s in self.shards:
+            if s.has_unsaved_changes():
+                s.save()
+        on_disk = read_manifest(self.index_path)
+        version = max(self.version, int(on_disk["version"]) if on_disk else 0) + 1
+        publish_manifest(self.index_path, version, {}, shards=len(self.shards), shard_by=self.shard_by,
+                         shard_versions=[s.version for s in self.shards],
+                         ntotal=self.ntotal, dim=self.dim, model=self.model)
+        cleanup_old_versions(self.index_path, version)  # 샤드로 옮기기 전 단일 인덱스 파일 정리
+        self.version = version
+
+    def clear(self) -> None:
+        for s in self.shards:
+            s.clear()
+
+    def copy(self) -> "ShardedFaissStore":
+        assert all(s.index is not None for s in self.shards), INDEX_NOT_READY_MSG
+        other = ShardedFaissStore(index_path=self.index_path, dim=self.dim, shards=len(self.shards),
+                                  shard_by=self.shard_by, config=self.config, model=self.model)
+        other.shards = [s.copy() for s in self.shards]
+        other.version = self.version
+        return other
+
+    # ---------- 추가/업서트/삭제 ----------
+    def add_with_external_ids(self, vectors: np.ndarray, external_refs: List[str]) -> None:
+        refs = [str(r) for r in external_refs]
+        for shard, idx in self._groups(self._place(self._to_ids(refs), None)):
+            shard.add_with_external_ids(vectors[idx], [refs[i] for i in idx])
+
+    def upsert_with_external_ids(self, vectors: np.ndarray, external_refs: List[str],
+                                 content_hashes: Optional[List[str]] = None,
+                                 metadata: Optional[List[MetadataRow]] = None) -> None:
+        # 들어 있던 샤드에서 지우고 새 위치(필드 기준이면 바뀐 필드 값)에 추가
+        refs = [str(r) for r in external_refs]
+        self.remove_by_external_ids(refs)
+        for shard, idx in self._groups(self._place(self._to_ids(refs), metadata)):
+            part = [refs[i] for i in idx]
+            shard.add_with_external_ids(vectors[idx], part)
+            if content_hashes is not None:
+                shard.hashes.update(part, [content_hashes[i] for i in idx])
+            if metadata is not None:
+                shard.update_metadata(part, [metadata[i] for i in idx])
+
+    def update_metadata(self, external_refs: List[str], rows: List[MetadataRow]) -> None:
+        if not external_refs:
+            return
+        refs = [str(r) for r in external_refs]
+        for shard, idx in self._groups(self._locate(self._to_ids(refs))):
+            shard.update_metadata([refs[i] for i in idx], [rows[i] for i in idx])
+
+    def remove_by_external_ids(self, external_refs: Iterable[str]) -> int:
+        refs = [str(r) for r in external_refs]
+        return sum(shard.remove_by_external_ids([refs[i] for i in idx])
+                   for shard, idx in self._groups(self._locate(self._to_ids(refs))))
+
+    # ---------- 검색 ----------
+    def search(self, query_vectors: np.ndarray, top_k: int = 10,
+               flt: Optional[SearchFilter] = None) -> List[List[Dict[str, Any]]]:
+        """FaissStore.search와 같은 형식 - 샤드별 상위 top_k를 동시에 구해서 점수 순으로 병합"""
+        q = np.ascontiguousarray(query_vectors, dtype=np.float32)  # 샤드마다 다시 변환하지 않게 한 번만
+        live = [s for s in self.shards if s.ntotal]
+        if not live:
+            return [[] for _ in range(q.shape[0])]
+        parts = self._fan_out(lambda s: s.search(q, top_k=top_k, flt=flt), live)
+        return [list(itertools.islice(heapq.merge(*rows, key=lambda r: -r["score"]), top_k))
+                for rows in zip(*parts)]
+
+    def search_one(self, query_vector: np.ndarray, top_k: int = 10,
+                   flt: Optional[SearchFilter] = None) -> List[Dict[str, Any]]:
+        q = query_vector.reshape(1, -1)
+        return self.search(q, top_k=top_k, flt=flt)[0]
+
+    # ---------- 압축 ----------
+    def needs_purge(self) -> bool:
+        return any(s.needs_purge() for s in self.shards)
+
+    def needs_compaction(self) -> bool:
+        return any(s.needs_compaction() for s in self.shards)
+
+    def can_compact(self, purge: bool = True) -> bool:
+        return any(s.can_compact(purge) for s in self.shards)
+
+    def compact(self, purge: bool = True) -> int:
+        return sum(s.compact(purge=purge) for s in self.shards)
+
+    # ---------- 편의 ----------
+    def count(self) -> int:
+        return self.ntotal
+
+    def is_empty(self) -> bool:
+        return self.ntotal == 0
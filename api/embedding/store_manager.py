@@ -0,0 +1,162 @@
+# 서빙 중인 FaissStore를 버전 단위로 교체(hot-swap)하는 관리자
+# - 읽기(검색): 락 없이 현재 스냅샷 참조만 가져가서 사용 → 검색 중에 인덱스가 바뀌어도 영향 없음
+# - 쓰기(동기화): 쓰기 락으로 직렬화, 현재 스냅샷의 복사본에 삭제/업서트를 한 번에 적용 → 저장 1회 → 원자적 교체
+#   (스레드끼리는 threading.Lock, 워커 프로세스끼리는 <index>.lock flock)
+# - 교체된 이전 스냅샷은 더 이상 수정하지 않음(진행 중인 검색이 끝나면 GC가 정리)
+# - 다른 워커가 게시한 새 버전(manifest)은 주기적으로 확인해서 mmap 로드 후 교체
+# - 삭제 표시(tombstone) 비율이 임계값을 넘거나 델타 세그먼트가 쌓이면 쓰기 직후 백그라운드 스레드에서 압축 트랜잭션 실행
+# - INDEX_SHARDS > 1이면 ShardedFaissStore (같은 API, 샤드 동시 검색), 저장된 인덱스가 샤드 구성이면 설정이 1이어도 샤드로 열기
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Iterator, Optional, Union
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+from api.embedding.index_files import index_lock, read_manifest
+from api.embedding.sharded_store import INDEX_SHARD_BY, INDEX_SHARDS, ShardedFaissStore
+
+logger = logging.getLogger("startup_service")
+
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "5"))  # 초, 0이면 확인 안 함
+
+Store = Union[FaissStore, ShardedFaissStore]
+
+
+class StoreManager:
+    def __init__(self, index_path: str, dim_fn: Callable[[], int], reload_interval: float = INDEX_RELOAD_INTERVAL,
+                 model: str = "", shards: int = INDEX_SHARDS, shard_by: str = INDEX_SHARD_BY):
+        self.index_path = index_path
+        self._dim_fn = dim_fn  # 차원은 최초 로드 시점에만 필요(모델 로드 지연), manifest에 있으면 호출 안 함
+        self.model = model  # 임베딩 모델 이름 (manifest에 기록된 것과 다르면 재색인 필요)
+        self.shards = shards
+        self.shard_by = shard_by
+        self._current: Optional[Store] = None
+        self._version = 0
+        self._load_lock = Lock()
+        self._write_lock = Lock()
+        self._reload_interval = reload_interval
+        self._next_check = 0.0
+        self._compact_lock = Lock()
+        self._compacting = False
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def current(self) -> Store:
+        """현재 서빙 스냅샷 (읽기 전용으로만 사용할 것)"""
+        store = self._current  # 참조 1회 읽기 → 이후 교체와 무관하게 같은 객체 사용
+        if store is None:
+            with self._load_lock:  # 최초 1회만 디스크에서 로드 (더블체크락킹)
+                if self._current is None:
+                    s = self._new_store(self._dim())
+                    s.load()
+                    self._current = s
+                store = self._current
+        elif self._reload_interval > 0 and time.monotonic() >= self._next_check:
+            store = self._maybe_reload(store)
+        return store
+
+    def _dim(self) -> int:
+        # 같은 모델로 만든 인덱스면 manifest의 차원 사용 → 인덱스를 여는 데 모델 로드가 필요 없음
+        manifest = read_manifest(self.index_path)
+        if manifest is not None and manifest.get("dim"):
+            stored = manifest.get("model", "")
+            if not stored or not self.model or stored == self.model:
+                return int(manifest["dim"])
+            logger.warning("[인덱스] 다른 모델로 만든 인덱스: 저장=%s, 현재=%s → 재색인 필요", stored, self.model)
+        return self._dim_fn()
+
+    def _new_store(self, dim: int, config: Optional[IndexConfig] = None) -> Store:
+        shards, shard_by = self.shards, self.shard_by
+        if shards <= 1:
+            manifest = read_manifest(self.index_path) or {}
+            shards, shard_by = int(manifest.get("shards") or 0), manifest.get("shard_by", shard_by)
+            if shards > 1:
+                logger.warning("[인덱스] 저장된 인덱스가 샤드 %d개 구성 → INDEX_SHARDS와 관계없이 샤드로 사용", shards)
+        if shards > 1:
+            return ShardedFaissStore(index_path=self.index_path, dim=dim, shards=shards, shard_by=shard_by,
+                                     config=config, model=self.model)
+        return FaissStore(index_path=self.index_path, dim=dim, config=config, model=self.model)
+
+    def _newer_on_disk(self, store: Store) -> bool:
+        manifest = read_manifest(self.index_path)
+        return manifest is not None and int(manifest["version"]) > store.version
+
+    def _swap_in_fresh(self, store: Store) -> Store:
+        fresh = self._new_store(store.dim, config=store.config)
+        fresh.load()
+        self._current = fresh
+        self._version += 1
+        logger.info("[인덱스교체] 디스크 버전 %d 반영 (다른 워커 게시), ntotal=%d", fresh.version, fresh.ntotal)
+        return fresh
+
+    def _maybe_reload(self, store: Store) -> Store:
+        # 확인은 한 스레드만, 나머지 검색은 기다리지 않고 지금 스냅샷 사용
+        if self._write_lock.locked() or not self._load_lock.acquire(blocking=False):
+            return store
+        try:
+            self._next_check = time.monotonic() + self._reload_interval
+            current = self._current
+            return self._swap_in_fresh(current) if self._newer_on_disk(current) else current
+        except Exception as e:
+            logger.warning("[인덱스교체] 새 버전 로드 실패: %s", e)
+            return store
+        finally:
+            self._load_lock.release()
+
+    @contextmanager
+    def transaction(self) -> Iterator[Store]:
+        """
+        쓰기 트랜잭션
+        - with 블록 안에서 받은 복사본에 remove/upsert 등을 적용
+        - 블록이 정상 종료되면 저장 1회 후 서빙 스냅샷 교체, 예외가 나면 복사본은 버려짐
+        """
+        # 쓰기끼리만 직렬화 (검색은 막지 않음), 파일 락은 최신 버전 확인부터 게시까지 → 다른 워커 쓰기를 덮어쓰지 않음
+        with self._write_lock, index_lock(self.index_path):
+            base = self.current()
+            if self._newer_on_disk(base):
+                base = self._swap_in_fresh(base)  # 다른 워커 변경분 위에 쌓기 (덮어쓰기 방지)
+            work = base.copy()
+            yield work
+            work.save()
+            self._current = work  # 참조 대입 한 번으로 교체 (원자적)
+            self._version += 1
+            logger.info("[인덱스교체] version=%d, ntotal %d -> %d", self._version, base.ntotal, work.ntotal)
+        if work.needs_compaction():
+            self._compact_in_background(purge=work.needs_purge())
+
+    def compact(self, purge: bool = True) -> int:
+        """
+        새 기준 세그먼트로 게시, 정리한 삭제 표시 수 반환
+        - purge=False면 델타 세그먼트만 합침 (삭제 표시가 임계값 아래일 때 재구성 생략)
+        """
+        current = self.current()
+        if not current.can_compact(purge):
+            return 0
+        with self.transaction() as store:
+            dropped = store.compact(purge=purge)
+        logger.info("[인덱스압축] 삭제 표시 %d건 정리, 델타 세그먼트 합침, ntotal=%d", dropped, store.ntotal)
+        return dropped
+
+    def _compact_in_background(self, purge: bool) -> None:
+        # 압축은 한 번에 하나만 (검색/다른 쓰기는 막지 않음, 쓰기 락은 압축 트랜잭션 동안만)
+        with self._compact_lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def run() -> None:
+            try:
+                self.compact(purge=purge)
+            except Exception as e:
+                logger.warning("[인덱스압축] 실패 (다음 쓰기 때 재시도): %s", e)
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, name="index-compact", daemon=True).start()
@@ -0,0 +1,127 @@
+# 삭제 표시(tombstone) 비트맵 - IDMap2(flat/HNSW) 인덱스용
+# - 삭제할 때 벡터를 실제로 빼지 않고 내부 위치(position)에 표시만 함
+#   → remove_ids의 벡터 배열 이동/ID 맵 재구성(코퍼스 크기 비례)이 없음, HNSW도 재구성 없이 삭제
+# - ID가 아니라 위치 기준: 같은 ID를 다시 넣으면(업서트) 새 위치에 추가되고 예전 위치만 표시된 채 남음
+# - 검색은 "표시 안 된 위치" 선택자로 걸러서 실행 → 지워진 결과 때문에 top-k가 줄지 않음
+# - 표시 비율이 TOMBSTONE_COMPACT_RATIO를 넘으면 StoreManager가 백그라운드에서 압축(살아 있는 벡터로 재구성)
+# - 삭제할 ID의 위치는 ID 순으로 정렬한 (ID, 위치) 배열에서 searchsorted로 찾음 (삭제 건수 × log n)
+#   처음 삭제할 때 한 번 만들고, 이후엔 인덱스 끝에 새로 추가된 위치만 끼워 넣음
+# - 수정(mark)은 항상 새 배열을 만들어 교체 → 복사본끼리 배열을 공유해도 안전
+
+import os
+from typing import Iterable
+
+import faiss
+import numpy as np
+
+from api.embedding.index_files import atomic_write
+
+TOMBSTONE_DELETES = os.getenv("TOMBSTONE_DELETES", "1") not in ("0", "false", "False")
+TOMBSTONE_COMPACT_RATIO = float(os.getenv("TOMBSTONE_COMPACT_RATIO", "0.2"))
+TOMBSTONE_COMPACT_MIN = int(os.getenv("TOMBSTONE_COMPACT_MIN", "256"))  # 이보다 적으면 비율과 무관하게 압축 안 함
+
+
+def tombstones_path(index_path: str) -> str:
+    return f"{index_path}.tomb.npy"
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    with open(path, "wb") as f:
+        np.save(f, arr)
+
+
+class Tombstones:
+    def __init__(self):
+        self.dead = np.zeros(0, dtype=bool)  # 위치별 삭제 여부 (길이 = 인덱스 물리 ntotal)
+        self.count = 0
+        self._selector = None  # (선택자, 참조 유지용) 캐시, 표시가 바뀌면 비움
+        self._sorted_ids = np.empty(0, dtype=np.int64)  # 위치 조회용: ID 오름차순 (같은 ID는 예전 위치 포함)
+        self._sorted_pos = np.empty(0, dtype=np.int64)  # 위 ID의 내부 위치
+        self._indexed = 0  # 조회 배열에 들어간 위치 수 (앞에서부터)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def copy(self) -> "Tombstones":
+        other = Tombstones()
+        other.dead, other.count = self.dead, self.count
+        other._sorted_ids, other._sorted_pos, other._indexed = self._sorted_ids, self._sorted_pos, self._indexed
+        return other
+
+    # ---------- 파일 ----------
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        self.dead = np.load(path).astype(bool)
+        self.count = int(self.dead.sum())
+        self._selector = None
+        return True
+
+    def save(self, path: str) -> None:
+        atomic_write(path, lambda tmp: _save_npy(tmp, self.dead))
+
+    # ---------- 수정 ----------
+    def grow(self, n_total: int) -> None:
+        # 인덱스에 새로 추가된 위치만큼 늘림 (표시 안 된 상태)
+        if n_total > len(self.dead):
+            self.dead = np.concatenate([self.dead, np.zeros(n_total - len(self.dead), dtype=bool)])
+
+    def mark(self, positions: Iterable[int]) -> None:
+        positions = np.asarray(list(positions), dtype=np.int64)
+        if len(positions) == 0:
+            return
+        dead = self.dead.copy()
+        dead[positions] = True
+        self.dead, self.count = dead, int(dead.sum())
+        self._selector = None
+
+    def live_positions(self, id_map: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        """ids가 살아 있는 위치 (id_map: 위치 → 외부 ID)"""
+        self._index_positions(id_map)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0 or self._indexed == 0:
+            return np.empty(0, dtype=np.int64)
+        lo = np.searchsorted(self._sorted_ids, ids, side="left")
+        hi = np.searchsorted(self._sorted_ids, ids, side="right")
+        counts = hi - lo
+        if not counts.any():
+            return np.empty(0, dtype=np.int64)
+        # 같은 ID의 위치가 여러 개일 수 있음 (업서트로 예전 위치가 표시된 채 남음) → 범위를 펼친 뒤 살아 있는 것만
+        starts = np.repeat(lo, counts)
+        offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        pos = self._sorted_pos[starts + offsets]
+        return np.unique(pos[~self.dead[pos]])
+
+    def _index_positions(self, id_map: np.ndarray) -> None:
+        # 조회 배열을 인덱스의 현재 위치까지 맞춤 (추가는 항상 끝 위치라 새 부분만 끼워 넣음)
+        n = len(id_map)
+        if n < self._indexed:  # 인덱스가 통째로 바뀜 → 처음부터
+            self._sorted_ids = self._sorted_pos = np.empty(0, dtype=np.int64)
+            self._indexed = 0
+        if n == self._indexed:
+            return
+        new_pos = np.arange(self._indexed, n, dtype=np.int64)
+        new_ids = np.asarray(id_map[self._indexed:n], dtype=np.int64)
+        order = np.argsort(new_ids, kind="stable")
+        new_ids, new_pos = new_ids[order], new_pos[order]
+        at = np.searchsorted(self._sorted_ids, new_ids, side="right")
+        self._sorted_ids = np.insert(self._sorted_ids, at, new_ids)
+        self._sorted_pos = np.insert(self._sorted_pos, at, new_pos)
+        self._indexed = n
+
+    def ratio(self, n_total: int) -> float:
+        return self.count / n_total if n_total else 0.0
+
+    def needs_compaction(self, n_total: int) -> bool:
+        return self.count >= TOMBSTONE_COMPACT_MIN and self.ratio(n_total) >= TOMBSTONE_COMPACT_RATIO
+
+    # ---------- 검색 ----------
+    def selector(self):
+        """(살아 있는 위치만 통과하는 선택자, 참조 유지용) - 표시가 없으면 (None, None)"""
+        if self.count == 0:
+            return None, None
+        if self._selector is None:
+            bits = np.packbits(self.dead, bitorder="little")
+            inner = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))  # 길이는 바이트 수
+            self._selector = (faiss.IDSelectorNot(inner), (bits, inner))
+        return self._selector
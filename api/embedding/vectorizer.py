@@ -1,33 +1,125 @@
 """
 지원 사업 공고 속 텍스트 → SBERT 임베딩 변환 관련 파일
-- 모델은 싱글턴으로 사용
+- 모델은 싱글턴으로 사용 (EMBED_BACKEND로 PyTorch fp32 / ONNX Runtime fp32 / ONNX 동적 양자화 int8 중 선택)
 - 코사인 유사도 계산을 위해서 L2 정규화된 벡터로 반환
+- 사용자 쿼리 임베딩은 LRU 캐시를 거쳐서 반복 요청 시 인코딩 생략
+- EMBED_SERVER_SOCKET을 설정하면 모델을 직접 올리지 않고 공유 임베딩 서버(embed_server)에 맡김
+- 색인용 대량 임베딩은 토큰 길이별로 묶고 토큰 예산으로 배치 크기를 정해 패딩 낭비를 줄임
 """
 
 from __future__ import annotations
 
 import html
+import os
 import re
 from threading import Lock
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+from api.core.cpu_tuning import apply_runtime_threads
+from api.embedding.embedding_cache import EmbeddingCache, normalize_query, query_key
 
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-_model: Optional[SentenceTransformer] = None
+# 인코더 백엔드: torch(기본) | onnx | onnx-int8 (onnx 계열은 pip install "sentence-transformers[onnx]" 필요)
+# - 모델은 EMBED_MODEL_DIR(로컬 모델 디렉터리, 허브 스냅샷 그대로)에서 로드, 비우면 허브의 MODEL_NAME
+# - int8은 모델 디렉터리의 양자화 ONNX 파일 사용 (허브 스냅샷에 onnx/model_qint8_*.onnx 포함)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_MODEL_DIR = os.getenv("EMBED_MODEL_DIR", "")
+EMBED_ONNX_INT8_FILE = os.getenv("EMBED_ONNX_INT8_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def model_identity(source: str = "", backend: str = "") -> str:
+    """
+    벡터를 만든 모델 식별자 (manifest의 model, 내용 해시/쿼리 캐시 키에 사용)
+    - 모델 출처(EMBED_MODEL_DIR 또는 허브 이름) + 백엔드 → 로컬 모델/ONNX int8로 바꾸면 인덱스 재색인
+    - 기본 구성(허브 MODEL_NAME + torch)은 MODEL_NAME 그대로 (기존 인덱스 호환)
+    """
+    source = source or EMBED_MODEL_DIR or MODEL_NAME
+    backend = backend or EMBED_BACKEND
+    if source != MODEL_NAME:
+        source = os.path.normpath(source)
+    return source if backend == "torch" else f"{source}|{backend}"
+
+
+MODEL_ID = model_identity()
+
+# 공유 임베딩 서버 Unix 소켓 경로 (APP_WORKERS>1일 때 워커들이 모델 1개를 같이 씀), 비우면 프로세스마다 모델 로드
+EMBED_SERVER_SOCKET = os.getenv("EMBED_SERVER_SOCKET", "")
+
+# 쿼리 임베딩 캐시 설정 (0이면 캐시 사용 안 함)
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "0"))
+
+# 색인용 임베딩 배치 설정: 배치 1개의 (문장 수 × 패딩된 길이) 상한과 문장 수 상한
+# 기본값 16384 = 이전 고정 배치(64) × 모델 최대 길이(256) → 가장 긴 배치의 메모리는 그대로, 짧은 글은 더 크게 묶음
+EMBED_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "16384"))
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "256"))
+
+_models: Dict[str, SentenceTransformer] = {}  # 백엔드별 1개 (서빙은 EMBED_BACKEND 하나만 사용)
 _model_lock = Lock()
+_client = None  # EmbedClient (EMBED_SERVER_SOCKET 사용 시)
+
+_query_cache = EmbeddingCache(max_bytes=QUERY_CACHE_MAX_BYTES, ttl_seconds=QUERY_CACHE_TTL)
+
+
+def _onnx_threads() -> Optional[int]:
+    # ONNX Runtime은 OMP_NUM_THREADS를 읽지 않으므로 cpu_tuning이 정한 값을 세션 옵션으로 전달
+    val = os.getenv("TORCH_NUM_THREADS") or os.getenv("OMP_NUM_THREADS")
+    return int(val) if val else None
+
+
+def _load(backend: str) -> SentenceTransformer:
+    # torch/sentence-transformers는 모델을 실제로 올릴 때만 import (임베딩 서버를 쓰는 워커는 torch 없이 동작)
+    from sentence_transformers import SentenceTransformer
+
+    apply_runtime_threads()  # torch가 여기서 처음 import될 수 있으므로 스레드 수는 로드 시점에 지정
+    source = EMBED_MODEL_DIR or MODEL_NAME
+    if backend == "torch":
+        return SentenceTransformer(source)
+    if backend not in ("onnx", "onnx-int8"):
+        raise ValueError(f"알 수 없는 EMBED_BACKEND: {backend} (가능: {', '.join(BACKENDS)})")
+    import onnxruntime as ort  # 선택 의존성: sentence-transformers[onnx]
+
+    options = ort.SessionOptions()
+    threads = _onnx_threads()
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    model_kwargs: Dict[str, Any] = {"provider": "CPUExecutionProvider", "session_options": options}
+    if backend == "onnx-int8":
+        model_kwargs["file_name"] = EMBED_ONNX_INT8_FILE
+    return SentenceTransformer(source, backend="onnx", model_kwargs=model_kwargs)
+
+
+def _remote():
+    """공유 임베딩 서버 클라이언트 (설정 안 했으면 None)"""
+    global _client
+    if not EMBED_SERVER_SOCKET:
+        return None
+    if _client is None:
+        with _model_lock:
+            if _client is None:
+                from api.embedding.embed_server import EmbedClient  # 순환 import 방지
+                _client = EmbedClient(EMBED_SERVER_SOCKET)
+    return _client
 
 
-def load_model() -> SentenceTransformer:
-    """ SBERT 모델을 한번만 로드해서 재사용하기 위해(전역변수로 사용)"""
-    global _model
-    if _model is None: # 아직 모델이 로드되지 않았다면
+def load_model(backend: Optional[str] = None) -> SentenceTransformer:
+    """ SBERT 모델을 한번만 로드해서 재사용하기 위해(전역변수로 사용), backend 미지정 시 EMBED_BACKEND"""
+    backend = backend or EMBED_BACKEND
+    model = _models.get(backend)
+    if model is None: # 아직 모델이 로드되지 않았다면
         with _model_lock: # lock 사용해 여러 스레드가 모델 초기화하지 못하게 방지(멀티 스레드 환경)
-            if _model is None: # lock 잡는 사이에 다른 스레드가 모델 로드했을 수도 있음 -> 더블체크락킹 사용
-                _model = SentenceTransformer(MODEL_NAME) # 모델 불러오기
-    return _model
+            model = _models.get(backend) # lock 잡는 사이에 다른 스레드가 모델 로드했을 수도 있음 -> 더블체크락킹 사용
+            if model is None:
+                model = _models[backend] = _load(backend) # 모델 불러오기
+    return model
 
 
 def _norm_text(x: Optional[str]) -> str:
@@ -39,12 +131,16 @@ def _norm_text(x: Optional[str]) -> str:
     return x
 
 
-def embed_texts(texts: List[str], batch_size: int = 64) -> np.ndarray:
+def embed_texts(texts: List[str], batch_size: int = 64, backend: Optional[str] = None) -> np.ndarray:
     """
     텍스트 리스트 → 임베딩 벡터(float32, L2 정규화)
     임베딩 벡터를 L2 정규화하면 두 벡터의 내적이 코사인 유사도와 같아져서 유사도를 구할 수 있게 됨
+    - 백엔드와 관계없이 출력 형식은 같음 (backend는 비교/벤치용, 미지정 시 EMBED_BACKEND)
     """
-    model = load_model() # 이전에 만들어둔 모델 사용
+    remote = _remote() if backend is None else None
+    if remote is not None:
+        return remote.embed(texts, batch_size)
+    model = load_model(backend) # 이전에 만들어둔 모델 사용
     """ 
     1. 텍스트 토큰화
     2. SBERT 모델 사용해 임베딩 벡터 생성
@@ -60,6 +156,73 @@ def embed_texts(texts: List[str], batch_size: int = 64) -> np.ndarray:
     return vecs.astype("float32") # FAISS 벡터 검색 라이브러리 사용 위해
 
 
+def count_tokens(texts: List[str]) -> np.ndarray:
+    """텍스트별 토큰 수 (특수 토큰 포함, 모델 최대 길이에서 잘림) - 인코딩 배치 구성용"""
+    remote = _remote()
+    if remote is not None:
+        return remote.count_tokens(texts)
+    model = load_model()
+    enc = model.tokenizer(
+        texts,
+        truncation=True,
+        max_length=model.max_seq_length,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return np.fromiter((len(ids) for ids in enc["input_ids"]), dtype=np.int64, count=len(texts))
+
+
+def plan_token_batches(lengths, token_budget: int = EMBED_TOKEN_BUDGET,
+                       max_batch: int = EMBED_MAX_BATCH) -> List[np.ndarray]:
+    """
+    토큰 길이 → 인코딩 배치 목록 (각 배치는 원래 위치 인덱스 배열)
+    - 긴 것부터 정렬해서 비슷한 길이끼리 묶음 (배치는 그 안에서 가장 긴 문장 길이로 패딩되므로)
+    - 배치 크기 = 토큰 예산 // 배치의 첫(가장 긴) 문장 길이, 1 ~ max_batch
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(1, int(lengths[order[start]]))
+        size = max(1, min(max_batch, token_budget // longest))
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def embed_corpus(
+        texts: List[str],
+        encode: Optional[Callable[..., Any]] = None,
+        lengths=None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        token_budget: int = EMBED_TOKEN_BUDGET,
+        max_batch: int = EMBED_MAX_BATCH,
+) -> np.ndarray:
+    """
+    공고 본문처럼 길이가 제각각인 텍스트 대량 임베딩 (색인용)
+    - 토큰 길이순으로 묶어서 배치마다 encode(texts, batch_size=배치 크기) 1회, 결과는 입력 순서대로 되돌림
+    - encode 미지정 시 embed_texts, lengths 미지정 시 count_tokens
+    - progress(완료 수, 전체 수): 배치마다 호출 (선택)
+    """
+    encode = encode or embed_texts
+    if lengths is None:
+        lengths = count_tokens(texts)
+    out: Optional[np.ndarray] = None
+    done = 0
+    for idx in plan_token_batches(lengths, token_budget, max_batch):
+        vecs = np.asarray(encode([texts[i] for i in idx], batch_size=len(idx)), dtype=np.float32)
+        if out is None:
+            out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        out[idx] = vecs
+        done += len(idx)
+        if progress is not None:
+            progress(done, len(texts))
+    if out is None:
+        return np.empty((0, 0), dtype=np.float32)
+    return out
+
+
 def embed_text(text: str) -> np.ndarray:
     """
     단일 텍스트 -> 임베딩 벡터 변환 메서드
@@ -68,10 +231,50 @@ def embed_text(text: str) -> np.ndarray:
     return embed_texts([text])[0]
 
 
+def embed_queries(texts: List[str], encode: Optional[Callable[[List[str]], Any]] = None) -> np.ndarray:
+    """
+    사용자 쿼리 리스트 → 임베딩 벡터 (캐시 사용)
+    - 공백 정규화한 텍스트 + 모델 이름으로 캐시 조회
+    - 캐시에 없는 것만 모아서 한 번에 인코딩 (encode 미지정 시 embed_texts)
+    """
+    encode = encode or embed_texts
+    norm = [normalize_query(t) for t in texts]
+    if QUERY_CACHE_MAX_BYTES <= 0:
+        return np.asarray(encode(norm), dtype=np.float32)
+
+    keys = [query_key(t, MODEL_ID) for t in norm]
+    found: Dict[int, np.ndarray] = {}
+    miss_pos: Dict[str, List[int]] = {}  # 같은 쿼리가 여러 번 와도 인코딩은 1회
+    for i, key in enumerate(keys):
+        vec = _query_cache.get(key)
+        if vec is not None:
+            found[i] = vec
+        else:
+            miss_pos.setdefault(key, []).append(i)
+
+    if miss_pos:
+        miss_keys = list(miss_pos)
+        vecs = np.asarray(encode([norm[miss_pos[k][0]] for k in miss_keys]), dtype=np.float32)
+        for key, vec in zip(miss_keys, vecs):
+            _query_cache.put(key, vec)
+            for i in miss_pos[key]:
+                found[i] = vec
+
+    return np.stack([found[i] for i in range(len(texts))]).astype(np.float32, copy=False)
+
+
+def query_cache_stats() -> Dict[str, Any]:
+    """쿼리 임베딩 캐시 적중/미스/제거 카운터"""
+    return _query_cache.stats()
+
+
 def embedding_dimension() -> int:
     """
     임베딩 차원 알려주는 메서드
     현재) all-MiniLM-L6-v2 모델 : 384차원
     참고) 일반적인 BERT 모델: 768차원
     """
+    remote = _remote()
+    if remote is not None:
+        return remote.dimension()
     return load_model().get_sentence_embedding_dimension()
@@ -1,10 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Query
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from api.dto.startup_dto import CreateStartupResponseDTO, StartupSupportSyncRequest
 from api.services.startup_fetch_service import fetch_startup_supports_async
-from api.dto.recommended_dto import StartupRequestDTO, SimilarSupportDTO
-from api.services.recommend_service import similar_top_k
+from api.services.ingest_jobs import get_ingest_job, get_ingest_runner, submit_ingest_job
+from api.services.announcement_store import get_announcement_store
+from api.dto.recommended_dto import StartupRequestDTO, SimilarSupportDTO, StartupBatchRequestDTO
+from api.embedding.metadata import SearchFilter
+from api.core.query_batcher import Overloaded
+from api.services.recommend_service import similar_top_k, similar_top_k_batch, result_cache_stats, inference_stats
+from api.embedding.vectorizer import query_cache_stats
 
 # ===== 디버깅용 로거 =====
 import logging, json, time
@@ -34,32 +40,59 @@ def _preview_list(items, n=3):
         # 로깅 실패해도 API는 절대 죽지 않게
         return f"<preview serialization failed: {e}>"
 
+def _to_score01(result: List[SimilarSupportDTO]) -> List[SimilarSupportDTO]:
+    """점수 0~1로 보정"""
+    for r in result:
+        s = float(r.score)
+        if s < 0.0 or s > 1.0:
+            s = (s + 1.0) / 2.0
+        # 수치 오차 보정 (완전히 -1 ~ 1이 아니기 때문)
+        if s < 0.0: s = 0.0
+        if s > 1.0: s = 1.0
+        r.score = s
+    return result
+
 router = APIRouter()
 
 # 창업 지원 사업 수집
+# - 수집/DTO 변환 결과는 바로 반환, 임베딩/색인은 백그라운드 job (헤더 X-Ingest-Job-Id로 job id 전달)
+# - 다른 job이 없으면 스트리밍 job으로 수집 중에 임베딩을 같이 진행, 있으면 수집 후 대기 job에 합침
 @router.post("/ai/startup-supports", response_model=List[CreateStartupResponseDTO])
 async def get_startup_supports(
         req: StartupSupportSyncRequest,
+        response: Response,
         hard_max_pages: int = Query(100, ge=1, le=300)  # 기본값 100
 ) -> List[CreateStartupResponseDTO]:
     #  요청 파라미터 찍기
     logger.info(
         "[지원사업수집] afterExternalRef=%s expiredExternalRefs.len=%s hard_max_pages=%s",
         req.after_external_ref,
-         len(req.expired_external_refs),
+        len(req.expired_external_refs or []),
         hard_max_pages,
     )
 
     t0 = time.perf_counter()
-    result = await fetch_startup_supports_async(
-        after_external_ref=req.after_external_ref,
-        expired_external_refs=req.expired_external_refs,
-        hard_max_pages=hard_max_pages
-    )
+    stream = get_ingest_runner().open_stream(expired_refs=req.expired_external_refs)
+    try:
+        result = await fetch_startup_supports_async(
+            after_external_ref=req.after_external_ref,
+            expired_external_refs=req.expired_external_refs,
+            hard_max_pages=hard_max_pages,
+            on_batch=stream.feed if stream else None,
+            raw_store=get_announcement_store(),  # 원본 저장소가 있으면 원본 저장 + 변경 집계
+            changed_only=req.changed_only,  # 요청한 경우만 신규/변경분 반환
+        )
+    finally:
+        if stream is not None:
+            await stream.close()  # 남은 묶음 임베딩 + 마지막 반영은 백그라운드에서 계속
     dt = (time.perf_counter() - t0) * 1000
 
+    # 임베딩/색인 job (스트리밍이 아니면 지금 등록, 실행 중인 job이 있으면 대기 중인 job에 합쳐짐)
+    job = stream.job if stream else submit_ingest_job(result, expired_refs=req.expired_external_refs)
+    response.headers["X-Ingest-Job-Id"] = job.id
+
     # 반환 직전 프리뷰 보기
-    logger.info("[지원사업수집] fetched=%d, elapsed=%.1fms", len(result), dt)
+    logger.info("[지원사업수집] fetched=%d, elapsed=%.1fms, job=%s", len(result), dt, job.id)
     try:
         logger.debug("[지원사업수집] preview(3)=%s", _preview_list(result, n=3))
     except Exception as e:
@@ -68,31 +101,82 @@ async def get_startup_supports(
     return result
 
 # 창업 지원 사업 유사도 검색 상위 k개 반환 API
+# 검색 필터 (지정한 조건만 적용, 공고에 해당 정보가 없으면 통과)
+def _search_filter(
+        region: Optional[str] = Query(None, description="지역명 (공고 지역에 포함되거나 전국이면 통과)"),
+        age: Optional[int] = Query(None, ge=0, le=200, description="만 나이"),
+        recruiting_only: bool = Query(False, description="모집 중인 공고만"),
+        open_on: Optional[date] = Query(None, description="이 날짜까지 마감되지 않은 공고만 (YYYY-MM-DD)"),
+) -> SearchFilter:
+    return SearchFilter(region=region or None, age=age, recruiting_only=recruiting_only, open_on=open_on)
+
+def _overloaded(e: Overloaded, tag: str) -> HTTPException:
+    # 추론 대기열 초과(429) / 기한 초과(503) → 바로 응답, 클라이언트는 Retry-After초 뒤 재시도
+    logger.warning("%s 과부하로 거절: status=%d, reason=%s, retry_after=%ds", tag, e.status_code, e.reason, e.retry_after)
+    return HTTPException(status_code=e.status_code, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+
 @router.post("/ai/similar", response_model=List[SimilarSupportDTO])
-def get_similar_supports(payload: StartupRequestDTO, k: int = Query(30, ge=1, le=100)):
+def get_similar_supports(payload: StartupRequestDTO, k: int = Query(30, ge=1, le=100),
+                         flt: SearchFilter = Depends(_search_filter)):
     """
     아이디어(제목+설명)를 입력 받아 코사인 유사도 상위 k개의 지원사업을 반환(디폴트 30개)
     """
     # 요청 페이로드 찍기
     try:
-        logger.info("[유사도] k=%d, title='%s'", k, getattr(payload, "idea_title", None))
+        logger.info("[유사도] k=%d, title='%s', filter=%s", k, getattr(payload, "idea_title", None), flt.cache_key())
     except Exception as e:
         logger.warning("[유사도] payload log failed: %s", e)
 
     t0 = time.perf_counter()
-    result = similar_top_k(payload, k=k)
+    try:
+        result = similar_top_k(payload, k=k, flt=flt)
+    except Overloaded as e:
+        raise _overloaded(e, "[유사도]")
     dt = (time.perf_counter() - t0) * 1000
 
     # 점수 0~1로 보정
-    for r in result:
-        s = float(r.score)
-        if s < 0.0 or s > 1.0:
-            s = (s + 1.0) / 2.0
-        # 수치 오차 보정 (완전히 -1 ~ 1이 아니기 때문)
-        if s < 0.0: s = 0.0
-        if s > 1.0: s = 1.0
-        r.score = s
+    _to_score01(result)
 
     # 반환 직전 보기
     logger.info("[유사도] result_count=%d, elapsed=%.1fms", len(result), dt)
     return result
+
+# 아이디어 여러 개 유사도 검색 (아이디어별 상위 k개, 요청 순서대로 반환)
+@router.post("/ai/similar/batch", response_model=List[List[SimilarSupportDTO]])
+def get_similar_supports_batch(payload: StartupBatchRequestDTO, k: int = Query(30, ge=1, le=100),
+                               flt: SearchFilter = Depends(_search_filter)):
+    """
+    아이디어 리스트를 한 번에 받아 임베딩 1회 + 검색 1회로 처리
+    """
+    logger.info("[유사도-배치] k=%d, ideas=%d, filter=%s", k, len(payload.ideas), flt.cache_key())
+
+    t0 = time.perf_counter()
+    try:
+        results = similar_top_k_batch(payload.ideas, k=k, flt=flt)
+    except Overloaded as e:
+        raise _overloaded(e, "[유사도-배치]")
+    dt = (time.perf_counter() - t0) * 1000
+
+    for result in results:
+        _to_score01(result)
+
+    logger.info("[유사도-배치] ideas=%d, elapsed=%.1fms", len(results), dt)
+    return results
+
+# 캐시 상태 (쿼리 임베딩 / top-k 결과 적중·미스·제거 카운터)
+@router.get("/ai/cache/stats")
+def get_cache_stats():
+    return {"query_embedding": query_cache_stats(), "topk_result": result_cache_stats()}
+
+# 추론 대기열 상태 (대기열 깊이, 대기 시간 p50/p99, 묶음 크기, 429/503 거절 수)
+@router.get("/ai/inference/stats")
+def get_inference_stats():
+    return inference_stats()
+
+# 수집 job 상태/진행률 (queued → running → succeeded/failed)
+@router.get("/ai/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_ingest_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job을 찾을 수 없음")
+    return job.to_dict()
@@ -0,0 +1,235 @@
+# K-Startup 원본 공고 로컬 저장소 (SQLite)
+# - pbanc_sn별 원본 JSON + 내용 지문(fingerprint) + 처음/마지막으로 본 시각
+# - 동기화: 새로 온 항목을 저장소와 비교해 신규/변경/변경없음 분류 (요청 시 신규/변경분만 돌려주고 연속 미변경이면 수집 중단)
+# - 지문은 두 단계: record는 pending_fp에만 기록, 색인 job 트랜잭션이 끝난 뒤 mark_indexed로 fingerprint 확정
+#   → 변환/임베딩/색인이 실패한 항목은 다음 동기화 때 다시 변경분으로 나옴
+# - 오프라인 재구성: 네트워크 없이 저장소만으로 DTO 목록/인덱스를 다시 만들 수 있음
+#   python -m api.services.announcement_store rebuild [--full]
+# - 여러 스레드(이벤트 루프 + to_thread)에서 쓰므로 연결 하나를 Lock으로 보호, WAL 모드
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("startup_service")
+
+RAW_STORE_PATH = os.getenv("RAW_STORE_PATH", "data/announcements.sqlite3")  # 빈 값이면 사용 안 함
+
+NEW, CHANGED, UNCHANGED = "new", "changed", "unchanged"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS announcements (
+    pbanc_sn    TEXT PRIMARY KEY,
+    raw_json    TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_seen  REAL NOT NULL,
+    last_seen   REAL NOT NULL,
+    changed_at  REAL NOT NULL,
+    pending_fp  TEXT
+);
+CREATE TABLE IF NOT EXISTS crawl_state (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def fingerprint(item: Dict[str, Any]) -> str:
+    # 키 순서와 무관하게 같은 내용이면 같은 값
+    return hashlib.sha1(json.dumps(item, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class AnnouncementStore:
+    def __init__(self, path: str):
+        self.path = path
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        cols = {row[1] for row in self._conn.execute("PRAGMA table_info(announcements)")}
+        if "pending_fp" not in cols:  # 이전 형식 저장소
+            self._conn.execute("ALTER TABLE announcements ADD COLUMN pending_fp TEXT")
+        self._lock = Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 동기화 ----------
+    def record(self, items: List[Dict[str, Any]], seen_at: Optional[float] = None) -> List[str]:
+        """
+        항목 저장 후 항목별 상태(new/changed/unchanged) 반환
+        - 비교 기준은 색인까지 끝난 지문(fingerprint), 새 지문은 pending_fp에 두고 mark_indexed 때 확정
+        - 변경 없는 항목은 last_seen만 갱신 (색인 전 지문이 남아 있으면 색인된 내용으로 되돌아온 것 → 비움)
+        """
+        now = seen_at or time.time()
+        keyed = [(str(it.get("pbanc_sn")), it) for it in items]
+        with self._lock, self._conn:
+            known = self._fingerprints([k for k, _ in keyed])
+            batch: Dict[str, str] = {}  # 같은 묶음 안 중복 대비
+            statuses = []
+            for key, it in keyed:
+                fp = fingerprint(it)
+                old = known.get(key)
+                if batch.get(key) == fp:
+                    statuses.append(UNCHANGED)
+                elif old is None:
+                    statuses.append(NEW)
+                    self._conn.execute(
+                        "INSERT INTO announcements VALUES (?, ?, '', ?, ?, ?, ?)",
+                        (key, json.dumps(it, ensure_ascii=False), now, now, now, fp))
+                elif old != fp:
+                    statuses.append(NEW if old == "" else CHANGED)  # "": 한 번도 색인되지 않음
+                    self._conn.execute(
+                        "UPDATE announcements SET raw_json=?, pending_fp=?, last_seen=?, changed_at=? WHERE pbanc_sn=?",
+                        (json.dumps(it, ensure_ascii=False), fp, now, now, key))
+                else:
+                    statuses.append(UNCHANGED)
+                    self._conn.execute(
+                        "UPDATE announcements SET raw_json=CASE WHEN pending_fp IS NULL THEN raw_json ELSE ? END, "
+                        "pending_fp=NULL, last_seen=? WHERE pbanc_sn=?", (json.dumps(it, ensure_ascii=False), now, key))
+                batch[key] = fp
+                known.setdefault(key, "")
+        return statuses
+
+    def mark_indexed(self, refs: Iterable[str], recorded_before: Optional[float] = None) -> int:
+        """
+        색인 트랜잭션이 반영한 항목의 지문 확정 (다음 동기화부터 변경 없음으로 분류)
+        - recorded_before: 이 시각 이후에 다시 바뀐 항목은 확정하지 않음 (반영한 내용과 다를 수 있음)
+        """
+        refs = [str(r) for r in refs]
+        if not refs:
+            return 0
+        before = time.time() if recorded_before is None else recorded_before
+        with self._lock, self._conn:
+            cur = self._conn.executemany(
+                "UPDATE announcements SET fingerprint=pending_fp, pending_fp=NULL "
+                "WHERE pbanc_sn=? AND pending_fp IS NOT NULL AND changed_at<=?", [(r, before) for r in refs])
+            return cur.rowcount
+
+    def _fingerprints(self, keys: List[str]) -> Dict[str, str]:
+        out: Dict[str, str] = {}
+        for start in range(0, len(keys), 500):  # SQLite 바인딩 변수 개수 제한
+            chunk = keys[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT pbanc_sn, fingerprint FROM announcements WHERE pbanc_sn IN ({','.join('?' * len(chunk))})",
+                chunk).fetchall()
+            out.update(rows)
+        return out
+
+    def remove(self, refs: Iterable[str]) -> int:
+        refs = [str(r) for r in refs]
+        if not refs:
+            return 0
+        with self._lock, self._conn:
+            cur = self._conn.executemany("DELETE FROM announcements WHERE pbanc_sn=?", [(r,) for r in refs])
+            return cur.rowcount
+
+    def set_state(self, **values: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO crawl_state VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in values.items()])
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            return {k: json.loads(v) for k, v in self._conn.execute("SELECT key, value FROM crawl_state")}
+
+    # ---------- 조회 ----------
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM announcements").fetchone()[0])
+
+    def iter_items(self, batch: int = 1000) -> Iterator[Dict[str, Any]]:
+        """저장된 원본 전부 (최신 pbanc_sn 먼저), batch개씩 읽어 메모리 사용 제한"""
+        last: Optional[Tuple[int, str]] = None
+        while True:
+            with self._lock:
+                if last is None:
+                    rows = self._conn.execute(
+                        "SELECT pbanc_sn, raw_json FROM announcements "
+                        "ORDER BY CAST(pbanc_sn AS INTEGER) DESC, pbanc_sn DESC LIMIT ?", (batch,)).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT pbanc_sn, raw_json FROM announcements "
+                        "WHERE (CAST(pbanc_sn AS INTEGER), pbanc_sn) < (?, ?) "
+                        "ORDER BY CAST(pbanc_sn AS INTEGER) DESC, pbanc_sn DESC LIMIT ?", (*last, batch)).fetchall()
+            if not rows:
+                return
+            for _, raw in rows:
+                yield json.loads(raw)
+            key = rows[-1][0]
+            last = (int(key) if key.lstrip("-").isdigit() else 0, key)
+
+
+_store: Optional[AnnouncementStore] = None
+_store_lock = Lock()
+
+
+def get_announcement_store() -> Optional[AnnouncementStore]:
+    """RAW_STORE_PATH가 비어 있으면 None (저장소 없이 예전처럼 동작)"""
+    global _store
+    if not RAW_STORE_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AnnouncementStore(RAW_STORE_PATH)
+    return _store
+
+
+def rebuild_from_store(store: AnnouncementStore, full: bool = False) -> int:
+    """
+    저장소 원본만으로 DTO 재생성 → 인덱스 반영 (네트워크 없음)
+    - full=False: 내용 해시가 같은 공고는 임베딩 생략 (바뀐 것/빠진 것만)
+    - full=True: 전부 다시 임베딩한 뒤 인덱스를 한 트랜잭션으로 통째로 교체 (그 전까지 기존 인덱스 서빙)
+    - 반영이 끝나면 저장소 항목의 지문 확정
+    """
+    from api.services.startup_fetch_service import _filter_and_dedupe, to_create_startup_response
+    from api.services.vectorize_hook import replace_index_from_dtos, vectorize_and_upsert_from_dtos
+
+    started = time.time()
+    dtos = []
+    for it in _filter_and_dedupe(store.iter_items(), set()):
+        try:
+            dtos.append(to_create_startup_response(it))
+        except Exception as e:
+            logger.warning("[재구성] DTO 변환 실패 (pbanc_sn=%s): %s", it.get("pbanc_sn"), e)
+    if full:
+        replace_index_from_dtos(dtos)
+    else:
+        vectorize_and_upsert_from_dtos(dtos)
+    store.mark_indexed([d.external_ref for d in dtos], recorded_before=started)
+    logger.info("[재구성] 저장소 공고=%d → DTO=%d (full=%s)", store.count(), len(dtos), full)
+    return len(dtos)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="원본 공고 저장소 도구")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rb = sub.add_parser("rebuild", help="저장소만으로 인덱스 재구성")
+    rb.add_argument("--full", action="store_true", help="인덱스를 비우고 전부 다시 임베딩")
+    sub.add_parser("stats", help="저장소 항목 수/수집 상태")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = get_announcement_store()
+    if store is None:
+        raise SystemExit("RAW_STORE_PATH가 비어 있음")
+    if args.cmd == "rebuild":
+        rebuild_from_store(store, full=args.full)
+    else:
+        print(json.dumps({"count": store.count(), **store.state()}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# 마감 공고 자동 정리 (인덱스에 저장된 마감일 기준)
+# - 호출 측이 expiredExternalRefs를 안 줘도 마감일이 지난 공고를 주기적으로 모아서 삭제
+# - 삭제는 수집 job 러너로 넘김 → 다른 동기화와 직렬화되고, 대기 중인 job이 있으면 합쳐져 인덱스 저장 1회
+# - 다음 정리 전까지는 검색 때 날짜 필터로 제외 (FaissStore.search, EXPIRY_FILTER)
+# - 워커가 여러 개여도 정리는 한 프로세스만: <INDEX_PATH>.sweeper.lock을 non-blocking flock으로 먼저 잡은 워커가 담당
+#   (담당 워커가 죽으면 OS가 락을 풀고, 다른 워커가 다음 주기에 이어받음)
+
+import logging
+import os
+import threading
+from contextlib import ExitStack
+from datetime import date
+from typing import Optional
+
+from api.embedding.index_files import file_lock
+from api.embedding.index_singleton import INDEX_PATH, get_store
+from api.embedding.metadata import SearchFilter, expiry_cutoff
+from api.services.ingest_jobs import IngestJob, IngestJobRunner, get_ingest_runner
+
+logger = logging.getLogger("startup_service")
+
+EXPIRY_SWEEP_INTERVAL = float(os.getenv("EXPIRY_SWEEP_INTERVAL", "3600"))  # 초, 0이면 자동 정리 안 함
+
+
+def sweep_expired(today: Optional[date] = None, runner: Optional[IngestJobRunner] = None) -> Optional[IngestJob]:
+    """서빙 중인 스냅샷에서 마감일이 지난 ID를 모아 삭제 job 등록 (없으면 None)"""
+    cutoff = expiry_cutoff(today)
+    expired = get_store().meta.excluded_ids(SearchFilter(open_on=cutoff))
+    if len(expired) == 0:
+        return None
+    job = (runner or get_ingest_runner()).submit([], expired_refs=[str(i) for i in expired])
+    logger.info("[마감정리] 마감일 < %s 공고 %d건 삭제 요청 (job=%s)", cutoff, len(expired), job.id)
+    return job
+
+
+class ExpirySweeper:
+    def __init__(self, interval: float = EXPIRY_SWEEP_INTERVAL, lock_path: str = INDEX_PATH + ".sweeper.lock"):
+        self.interval = interval
+        self.lock_path = lock_path
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._leader: Optional[ExitStack] = None  # 정리 담당 락 (잡은 동안 프로세스 종료까지 유지)
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="expiry-sweeper", daemon=True)
+        self._thread.start()
+        logger.info("[마감정리] %.0f초마다 실행", self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._leader is not None:
+            self._leader.close()
+            self._leader = None
+
+    def is_leader(self) -> bool:
+        """이 프로세스가 정리 담당인지 (아니면 락을 한 번 시도)"""
+        if self._leader is None:
+            stack = ExitStack()
+            if stack.enter_context(file_lock(self.lock_path, blocking=False)):
+                self._leader = stack
+                logger.info("[마감정리] 이 워커(pid=%d)가 정리 담당", os.getpid())
+            else:
+                stack.close()
+        return self._leader is not None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if self.is_leader():
+                    sweep_expired()
+            except Exception as e:
+                logger.warning("[마감정리] 실패 (다음 주기에 재시도): %s", e)
+
+
+_sweeper = ExpirySweeper()
+
+
+def get_expiry_sweeper() -> ExpirySweeper:
+    return _sweeper
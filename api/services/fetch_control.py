@@ -0,0 +1,161 @@
+# K-Startup 페이지 수집 제어 (동시성/속도/재시도)
+# - AIMD 동시성: 성공이 이어지면 한 칸씩 늘리고(+1), 429/503/타임아웃이면 절반으로 줄임(×0.5)
+# - 토큰 버킷: 초당 요청 수 상한 (버스트 허용), 동시성과 별개로 API 호출량 자체를 제한
+# - 재시도: 지수 백오프 + full jitter (Retry-After 헤더가 있으면 그 값 우선)
+#   → 일시 장애로 실패한 페이지를 "빈 페이지"로 착각해 수집을 일찍 끝내지 않도록 구분
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger("startup_service")
+
+FETCH_RATE = float(os.getenv("FETCH_RATE", "20"))  # 초당 요청 수 (0이면 제한 없음)
+FETCH_BURST = int(os.getenv("FETCH_BURST", "10"))
+FETCH_MIN_CONCURRENCY = int(os.getenv("FETCH_MIN_CONCURRENCY", "1"))
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "16"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "4"))  # 첫 시도 제외 재시도 횟수
+FETCH_BACKOFF_BASE = float(os.getenv("FETCH_BACKOFF_BASE", "0.2"))
+FETCH_BACKOFF_CAP = float(os.getenv("FETCH_BACKOFF_CAP", "5"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+
+# 서버 과부하/일시 장애로 보고 재시도 + 동시성 감소
+_OVERLOAD_STATUS = {429, 502, 503, 504}
+
+
+class PageFetchError(Exception):
+    """재시도까지 실패한 페이지 (빈 페이지와 구분)"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:  # 순서대로 토큰 배분
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AimdLimiter:
+    def __init__(self, initial: int, min_limit: int = 1, max_limit: int = 16):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self) -> "AimdLimiter":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        # 현재 한도만큼 성공하면 +1 (창 단위 가산 증가)
+        self.limit = min(self.max_limit, self.limit + 1.0 / max(1.0, self.limit))
+
+    def on_overload(self) -> None:
+        self.limit = max(self.min_limit, self.limit / 2)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str], base: float, cap: float) -> float:
+    if retry_after:
+        try:
+            return min(cap, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date 형식은 무시하고 백오프 사용
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    retries: int = 0
+    failed_pages: int = 0
+    overloads: int = 0
+    max_concurrency: float = 0.0
+
+
+class FetchController:
+    """페이지 요청 1건 = 토큰 1개 + 동시성 슬롯 1개, 실패 유형에 따라 재시도/동시성 조절"""
+
+    def __init__(self, initial_concurrency: int = 5, rate: Optional[float] = None, retries: Optional[int] = None):
+        # 나머지 값은 생성 시점의 모듈 설정값 사용
+        self.limiter = AimdLimiter(initial_concurrency, FETCH_MIN_CONCURRENCY, FETCH_MAX_CONCURRENCY)
+        self.bucket = TokenBucket(FETCH_RATE if rate is None else rate, FETCH_BURST)
+        self.retries = FETCH_RETRIES if retries is None else retries
+        self.timeout = FETCH_TIMEOUT
+        self.backoff_base = FETCH_BACKOFF_BASE
+        self.backoff_cap = FETCH_BACKOFF_CAP
+        self.stats = FetchStats(max_concurrency=self.limiter.limit)
+
+    async def get_json(self, client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """성공하면 JSON, 재시도까지 실패하면 PageFetchError (4xx 등 영구 오류는 바로 실패)"""
+        last_error = ""
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self.limiter:
+                await self.bucket.acquire()
+                self.stats.requests += 1
+                try:
+                    r = await client.get(url, params=params, timeout=self.timeout)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    last_error = f"{type(e).__name__}: {e}"
+                    self._overload()
+                else:
+                    if r.status_code in _OVERLOAD_STATUS:
+                        last_error = f"HTTP {r.status_code}"
+                        retry_after = r.headers.get("Retry-After")
+                        self._overload()
+                    elif r.status_code >= 500:
+                        last_error = f"HTTP {r.status_code}"  # 서버 오류: 재시도만 (동시성은 유지)
+                    elif r.status_code >= 400:
+                        raise PageFetchError(f"HTTP {r.status_code} (page={params.get('page')})")
+                    elif "application/json" not in r.headers.get("content-type", "").lower():
+                        # 게이트웨이 HTML/XML 오류 페이지 등 → 일시 장애로 보고 재시도
+                        last_error = f"Non-JSON content-type={r.headers.get('content-type', '')}"
+                    else:
+                        try:
+                            data = r.json()
+                        except ValueError as e:
+                            last_error = f"JSON 파싱 실패: {e}"
+                        else:
+                            self.limiter.on_success()
+                            self.stats.max_concurrency = max(self.stats.max_concurrency, self.limiter.limit)
+                            return data
+            if attempt < self.retries:
+                self.stats.retries += 1
+                delay = backoff_delay(attempt, retry_after, self.backoff_base, self.backoff_cap)
+                logger.debug("[HTTP] page=%s 재시도 %d/%d (%.2fs 후): %s",
+                             params.get("page"), attempt + 1, self.retries, delay, last_error)
+                await asyncio.sleep(delay)
+        self.stats.failed_pages += 1
+        raise PageFetchError(f"{last_error} (page={params.get('page')}, 시도 {self.retries + 1}회)")
+
+    def _overload(self) -> None:
+        self.stats.overloads += 1
+        self.limiter.on_overload()
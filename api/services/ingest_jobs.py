@@ -0,0 +1,269 @@
+# 수집 결과 임베딩/색인 작업(job) 관리
+# - 동기화 요청은 수집(DTO 변환)까지만 하고 임베딩/인덱스 쓰기는 job으로 넘김 → 이벤트 루프를 막지 않음
+# - 전용 워커 스레드 1개에서 순서대로 실행 (인덱스 쓰기는 어차피 직렬화, torch/faiss는 GIL을 풀고 계산)
+# - 실행 중에 다른 동기화가 오면 새 job을 병렬로 만들지 않고 대기 중인 job 1개에 합침(coalesce)
+# - 최근 INGEST_JOB_HISTORY개 job 상태만 메모리에 보관 (GET /ai/jobs/{id})
+# - 스트리밍 job: 수집이 끝나기 전부터 DTO 묶음을 받아 임베딩, INGEST_FLUSH_ROWS개마다 인덱스에 반영
+# - 인덱스 반영(트랜잭션)이 끝난 공고만 원본 저장소 지문 확정 → 실패한 job의 공고는 다음 동기화 때 다시 변경분
+
+import asyncio
+import logging
+import os
+import queue
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.dto.startup_dto import CreateStartupResponseDTO
+from api.services.announcement_store import get_announcement_store
+from api.services.vectorize_hook import (
+    UpsertPlan,
+    apply_upserts,
+    embed_upserts,
+    prepare_upserts,
+    vectorize_and_upsert_from_dtos,
+)
+
+logger = logging.getLogger("startup_service")
+
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "2048"))  # 스트리밍 job에서 인덱스 저장 단위 (벡터 수)
+INGEST_STREAM_QUEUE = int(os.getenv("INGEST_STREAM_QUEUE", "8"))  # 임베딩 대기 묶음 수 (넘치면 수집 쪽이 대기)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+@dataclass
+class IngestJob:
+    id: str
+    dtos: List[CreateStartupResponseDTO] = field(default_factory=list, repr=False)
+    expired_refs: List[str] = field(default_factory=list, repr=False)
+    status: str = QUEUED
+    stage: Optional[str] = None  # embedding / indexing
+    done: int = 0
+    total: int = 0
+    requests: int = 1  # 합쳐진 동기화 요청 수
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def merge(self, dtos: List[CreateStartupResponseDTO], expired_refs: List[str]) -> None:
+        # 나중 요청 기준으로 합치기: 나중에 마감된 ref는 앞 요청의 업서트에서 빼고, 다시 올라온 ref는 업서트가 이김
+        expired = set(expired_refs)
+        if expired:
+            self.dtos = [d for d in self.dtos if str(d.external_ref) not in expired]
+        self.dtos.extend(dtos)
+        self.expired_refs = sorted(set(self.expired_refs) | expired)
+        self.requests += 1
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        self.stage, self.done, self.total = stage, done, total
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "announcements": len(self.dtos),
+            "expired": len(self.expired_refs),
+            "coalesced_requests": self.requests,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class IngestStream:
+    """
+    수집 파이프라인 → 수집 job 워커로 DTO 묶음을 넘기는 통로
+    - feed/close는 이벤트 루프에서 await (큐가 차면 스레드에서 기다리므로 루프는 막지 않음)
+    """
+    def __init__(self, job: IngestJob, maxsize: int = INGEST_STREAM_QUEUE):
+        self.job = job
+        self._q: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+
+    async def feed(self, dtos: List[CreateStartupResponseDTO]) -> None:
+        await asyncio.to_thread(self._q.put, list(dtos))
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self._q.put, None)
+
+    def get(self):
+        return self._q.get()
+
+
+def _mark_indexed(dtos: List[CreateStartupResponseDTO], recorded_before: float) -> None:
+    # 반영 직전까지 기록된 원본만 확정 (그 뒤에 다시 바뀐 공고는 다음 job 몫)
+    if not dtos:
+        return
+    raw_store = get_announcement_store()
+    if raw_store is None:
+        return
+    try:
+        raw_store.mark_indexed([str(d.external_ref) for d in dtos if d.external_ref], recorded_before=recorded_before)
+    except Exception as e:
+        logger.warning("[수집작업] 원본 저장소 지문 확정 실패 (다음 동기화 때 다시 변경분): %s", e)
+
+
+class IngestJobRunner:
+    def __init__(self, history: int = INGEST_JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._pending: Optional[IngestJob] = None  # 아직 시작 안 한 job (새 요청은 여기에 합침)
+        self._active = 0  # 등록됐지만 끝나지 않은 job 수
+        self._history = max(1, history)
+        self._lock = Lock()
+
+    def submit(self, dtos: List[CreateStartupResponseDTO], expired_refs: Optional[List[str]] = None) -> IngestJob:
+        expired = [str(r) for r in (expired_refs or []) if str(r).isdigit()]
+        with self._lock:
+            if self._pending is not None:
+                self._pending.merge(list(dtos), expired)
+                logger.info("[수집작업] job=%s에 합침 (요청 %d건)", self._pending.id, self._pending.requests)
+                return self._pending
+            job = IngestJob(id=uuid.uuid4().hex, dtos=list(dtos), expired_refs=expired)
+            self._pending = job
+            self._active += 1
+            self._remember(job)
+        self._executor.submit(self._run, job)
+        logger.info("[수집작업] job=%s 등록 (공고=%d, 마감=%d)", job.id, len(job.dtos), len(job.expired_refs))
+        return job
+
+    def open_stream(self, expired_refs: Optional[List[str]] = None) -> Optional[IngestStream]:
+        """
+        스트리밍 job 시작 (수집과 임베딩을 겹쳐 실행)
+        - 다른 job이 대기/실행 중이면 None → 호출 측은 수집 후 submit()으로 합치기
+        """
+        expired = [str(r) for r in (expired_refs or []) if str(r).isdigit()]
+        with self._lock:
+            if self._active:
+                return None
+            job = IngestJob(id=uuid.uuid4().hex, expired_refs=expired)
+            self._active += 1
+            self._remember(job)
+        stream = IngestStream(job)
+        self._executor.submit(self._run_stream, stream)
+        logger.info("[수집작업] job=%s 스트리밍 시작 (마감=%d)", job.id, len(expired))
+        return stream
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _remember(self, job: IngestJob) -> None:
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in (QUEUED, RUNNING):
+                break  # 끝나지 않은 job은 지우지 않음
+            self._jobs.pop(oldest_id)
+
+    def _run(self, job: IngestJob) -> None:
+        with self._lock:
+            if self._pending is job:
+                self._pending = None  # 이 시점 이후 요청은 다음 job으로
+            job.status, job.started_at = RUNNING, time.time()
+        try:
+            vectorize_and_upsert_from_dtos(job.dtos, expired_refs=job.expired_refs, progress=job.progress)
+            _mark_indexed(job.dtos, recorded_before=job.started_at)  # 합치기는 시작 전까지만 → 전부 그 전에 기록됨
+            job.status = SUCCEEDED
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            logger.error("[수집작업][ERROR] job=%s 실패: %s", job.id, e)
+        finally:
+            self._finish(job)
+
+    def _finish(self, job: IngestJob) -> None:
+        job.finished_at = time.time()
+        with self._lock:
+            self._active -= 1
+        logger.info("[수집작업] job=%s %s (%.1fs, 요청 %d건)",
+                    job.id, job.status, job.finished_at - job.started_at, job.requests)
+
+    def _run_stream(self, stream: IngestStream) -> None:
+        job = stream.job
+        job.status, job.started_at = RUNNING, time.time()
+        expired = list(job.expired_refs)  # 첫 반영 때 삭제 (같은 ref가 다시 오면 업서트가 이김)
+        vecs, pending = [], UpsertPlan()
+        embedded = skipped = flushed = 0
+        failed = False
+
+        def flush() -> None:
+            nonlocal expired, vecs, pending, flushed
+            job.progress("indexing", embedded, embedded)
+            started, applied = time.time(), len(job.dtos)
+            apply_upserts(np.concatenate(vecs) if vecs else None, pending, expired)
+            _mark_indexed(job.dtos[flushed:applied], recorded_before=started)
+            expired, vecs, pending, flushed = [], [], UpsertPlan(), applied
+
+        while True:
+            batch = stream.get()
+            if batch is None:
+                break
+            job.dtos.extend(batch)
+            if failed:
+                continue  # 실패 후에도 수집 쪽이 막히지 않도록 계속 비움
+            try:
+                plan = prepare_upserts(batch, expired)
+                skipped += plan.skipped
+                if plan.refs:
+                    job.progress("embedding", embedded, embedded + len(plan.refs))
+                    vecs.append(embed_upserts(plan.texts))
+                    embedded += len(plan.refs)
+                    job.progress("embedding", embedded, embedded)
+                plan.texts = []  # 임베딩 끝난 본문은 반영 때까지 들고 있을 필요 없음
+                pending.extend(plan)
+                if len(pending.refs) >= INGEST_FLUSH_ROWS:
+                    flush()
+            except Exception as e:
+                failed = True
+                job.status, job.error = FAILED, str(e)
+                logger.error("[수집작업][ERROR] job=%s 실패: %s", job.id, e)
+        try:
+            if not failed:
+                if not pending.is_empty() or expired:
+                    flush()
+                else:
+                    _mark_indexed(job.dtos[flushed:], recorded_before=time.time())  # 남은 공고는 전부 변경 없음
+                job.status = SUCCEEDED
+                logger.info("[벡터화] re-embedded=%d, skipped=%d, expired=%d",
+                            embedded, skipped, len(job.expired_refs))
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            logger.error("[수집작업][ERROR] job=%s 실패: %s", job.id, e)
+        finally:
+            self._finish(job)
+
+
+_runner: Optional[IngestJobRunner] = None
+_runner_lock = Lock()
+
+
+def get_ingest_runner() -> IngestJobRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = IngestJobRunner()
+    return _runner
+
+
+def submit_ingest_job(dtos: List[CreateStartupResponseDTO], expired_refs: Optional[List[str]] = None) -> IngestJob:
+    return get_ingest_runner().submit(dtos, expired_refs)
+
+
+def get_ingest_job(job_id: str) -> Optional[IngestJob]:
+    return get_ingest_runner().get(job_id)
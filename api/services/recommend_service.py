@@ -1,45 +1,178 @@
 # 창업 지원사업 추천 로직
 import os
 import logging
-from typing import List
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 from api.dto.recommended_dto import StartupRequestDTO, SimilarSupportDTO
-from api.embedding.vectorizer import embed_texts
-from api.embedding.index_singleton import get_store 
+from api.embedding.vectorizer import MODEL_ID, embed_texts, embed_queries
+from api.embedding.embedding_cache import query_key
+from api.embedding.index_singleton import get_store
+from api.embedding.metadata import EXPIRY_FILTER, SearchFilter, expiry_cutoff
+from api.embedding.result_cache import ResultCache
+from api.core.query_batcher import SIMILAR_BATCHING, QueryBatcher
 
 logger = logging.getLogger("startup_recommender")
 
 INDEX_PATH = os.getenv("INDEX_PATH", "data/supports.faiss")
 
-def similar_top_k(req: StartupRequestDTO, k: int = 30) -> List[SimilarSupportDTO]:
+# top-k 결과 캐시 (0이면 사용 안 함), 인덱스 generation이 바뀌면 자동 무효화
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+_result_cache = ResultCache(max_entries=RESULT_CACHE_MAX_ENTRIES)
+
+def _build_query(req: StartupRequestDTO) -> str:
+    # 아이디어 제목+설명 합치기
+    title = (req.idea_title or "").strip()
+    desc  = (req.idea_description or "").strip()
+    return (title + " " + desc).strip()
+
+def _to_dtos(hits: List[Dict[str, Any]]) -> List[SimilarSupportDTO]:
+    # DTO 변환
+    out: List[SimilarSupportDTO] = []
+    for h in hits:
+        ref = str(h.get("ref"))
+        # score01(0~1)이 있으면 우선 사용, 없으면 score(-1~1)
+        score = float(h["score01"]) if "score01" in h else float(h.get("score", 0.0))
+        out.append(SimilarSupportDTO(external_ref=ref, score=score))
+    return out
+
+def _active(flt: Optional[SearchFilter]) -> Optional[SearchFilter]:
+    return None if flt is None or flt.is_empty() else flt
+
+def _search_kwargs(flt: Optional[SearchFilter]) -> Dict[str, Any]:
+    # 필터가 있을 때만 넘김 (필터 없는 검색은 이전과 같은 호출)
+    return {} if flt is None else {"flt": flt}
+
+def _result_key(query: str, flt: Optional[SearchFilter]) -> str:
+    # 같은 쿼리라도 필터가 다르면 다른 결과, 날짜가 바뀌면 마감 제외 대상도 바뀜
+    key = query_key(query, MODEL_ID)
+    if EXPIRY_FILTER:
+        key = f"{key}|x={expiry_cutoff()}"
+    return key if flt is None else f"{key}|{flt.cache_key()}"
+
+def _cached_hits(store, query: str, k: int, flt: Optional[SearchFilter] = None):
+    # (쿼리 해시 + 필터, generation) 캐시 조회, generation이 없는 스토어는 캐시하지 않음
+    generation = getattr(store, "generation", None)
+    if generation is None:
+        return None
+    return _result_cache.get(_result_key(query, flt), generation, k)
+
+def _remember_hits(store, query: str, k: int, hits, flt: Optional[SearchFilter] = None) -> None:
+    generation = getattr(store, "generation", None)
+    if generation is not None:
+        _result_cache.put(_result_key(query, flt), generation, k, hits)
+
+def result_cache_stats():
+    """top-k 결과 캐시 적중/미스/무효화 카운터"""
+    return _result_cache.stats()
+
+def _search_coalesced(items: List[tuple]) -> List[List[Dict[str, Any]]]:
+    """
+    동시에 들어온 단건 요청 묶음 처리: (store, query, k, flt) 리스트 → 요청별 hits
+    - 임베딩 1회(배치), 같은 스냅샷·필터끼리 FAISS 검색 1회 (k는 가장 큰 값으로 검색 후 요청별로 자름)
+    - 1건이면 기존 단건 경로 그대로
+    """
+    qv = np.asarray(embed_queries([query for _, query, _, _ in items], encode=embed_texts), dtype=np.float32)
+    if len(items) == 1:
+        store, _, k, flt = items[0]
+        return [store.search_one(qv[0], top_k=k, **_search_kwargs(flt))]
+
+    groups: Dict[tuple, List[int]] = {}
+    for i, (store, _, _, flt) in enumerate(items):
+        groups.setdefault((id(store), flt), []).append(i)
+    out: List[List[Dict[str, Any]]] = [[] for _ in items]
+    for idx in groups.values():
+        store, _, _, flt = items[idx[0]]
+        rows = store.search(qv[idx], top_k=max(items[i][2] for i in idx), **_search_kwargs(flt))
+        for i, row in zip(idx, rows):
+            out[i] = row[:items[i][2]]
+    return out
+
+_batcher = QueryBatcher(_search_coalesced)
+
+def inference_stats():
+    """추론 대기열 깊이/대기 시간/묶음 크기/거절 수"""
+    return _batcher.stats()
+
+def similar_top_k(req: StartupRequestDTO, k: int = 30, flt: Optional[SearchFilter] = None) -> List[SimilarSupportDTO]:
     """
     아이디어 제목+설명을 합쳐 임베딩 → FAISS에서 상위 k개 검색
+    - 같은 인덱스 버전에서 같은 쿼리(+필터)가 다시 오면 임베딩/검색 모두 생략
+    - flt: 지역/나이/모집 여부/마감일 필터 (검색 중에 걸러서 조건에 맞는 상위 k개)
+    - 동시에 들어온 단건 요청은 묶어서 임베딩 1회 + 검색 1회 (SIMILAR_BATCHING=0이면 요청마다 따로)
+    - 추론 대기열이 가득 찼거나 기한 안에 처리할 수 없으면 Overloaded (라우터에서 429/503)
     """
-    title = (req.idea_title or "").strip()
-    desc  = (req.idea_description or "").strip()
-    query = (title + " " + desc).strip()
+    query = _build_query(req)
+    flt = _active(flt)
 
     if not query:
         logger.warning("[유사도] 요청 텍스트가 비어 있어 유사도 계산을 건너뜁니다.")
         return []
 
-    # 쿼리 임베딩 (1, d) - L2 정규화된 float32
-    qv = embed_texts([query])
-
-    # 싱글톤 인덱스 로드
+    # 싱글톤 인덱스 로드 (검색 끝날 때까지 같은 스냅샷 사용)
     store = get_store()
     if store.is_empty():
         logger.warning("[유사도] 색인된 데이터가 없음")
         return []
-    # 벡터 검색 → 상위 k개 결과 반환
-    # 결과 형식 {"ref": , "score": , "score01": }
-    hits = store.search_one(qv[0], top_k=k)
 
-    # DTO 변환
-    out: List[SimilarSupportDTO] = []
-    for h in hits:
-        ref = str(h.get("ref"))
-        # score01(0~1)이 있으면 우선 사용, 없으면 score(-1~1)
-        score = float(h["score01"]) if "score01" in h else float(h.get("score", 0.0))
-        out.append(SimilarSupportDTO(external_ref=ref, score=score))
-    return out
+    hits = _cached_hits(store, query, k, flt)
+    if hits is None and SIMILAR_BATCHING:
+        # 동시에 들어온 다른 요청과 묶어서 임베딩/검색 (혼자면 바로 실행)
+        hits = _batcher.submit((store, query, k, flt))
+        _remember_hits(store, query, k, hits, flt)
+    elif hits is None:
+        # 쿼리 임베딩 (1, d) - L2 정규화된 float32 (캐시 적중 시 인코딩 생략)
+        qv = embed_queries([query], encode=embed_texts)
+        # 벡터 검색 → 상위 k개 결과 반환
+        # 결과 형식 {"ref": , "score": , "score01": }
+        hits = store.search_one(qv[0], top_k=k, **_search_kwargs(flt))
+        _remember_hits(store, query, k, hits, flt)
+    return _to_dtos(hits)
+
+def similar_top_k_batch(reqs: List[StartupRequestDTO], k: int = 30,
+                        flt: Optional[SearchFilter] = None) -> List[List[SimilarSupportDTO]]:
+    """
+    아이디어 여러 개를 한 번에 처리
+    - 임베딩 1회(배치) + FAISS 검색 1회(다중 행)
+    - 반환 순서 = 요청 순서, 텍스트가 빈 아이디어는 빈 리스트
+    - flt: 모든 아이디어에 같은 필터 적용
+    - 단건 요청과 같은 추론 대기열을 거침 (들어갈 자리가 없으면 Overloaded)
+    """
+    flt = _active(flt)
+    results: List[List[SimilarSupportDTO]] = [[] for _ in reqs]
+
+    queries = [_build_query(r) for r in reqs]
+    pos = [i for i, q in enumerate(queries) if q]
+    if not pos:
+        logger.warning("[유사도-배치] 요청 텍스트가 모두 비어 있어 유사도 계산을 건너뜁니다.")
+        return results
+
+    store = get_store()
+    if store.is_empty():
+        logger.warning("[유사도-배치] 색인된 데이터가 없음")
+        return results
+
+    # 결과 캐시에 있는 아이디어는 바로 채우고 나머지만 임베딩/검색
+    todo = []
+    for i in pos:
+        hits = _cached_hits(store, queries[i], k, flt)
+        if hits is None:
+            todo.append(i)
+        else:
+            results[i] = _to_dtos(hits)
+    if not todo:
+        return results
+
+    if SIMILAR_BATCHING:
+        # 캐시에 없는 것만 추론 대기열로 (동시에 들어온 단건 요청과 같이 묶일 수 있음)
+        rows = _batcher.submit_many([(store, queries[i], k, flt) for i in todo])
+    else:
+        # 쿼리 임베딩 (n, d) - L2 정규화된 float32 (캐시에 없는 것만 배치 인코딩)
+        qv = embed_queries([queries[i] for i in todo], encode=embed_texts)
+        # 다중 행 검색 → 요청 위치에 맞게 돌려놓기
+        rows = store.search(qv, top_k=k, **_search_kwargs(flt))
+    for i, hits in zip(todo, rows):
+        _remember_hits(store, queries[i], k, hits, flt)
+        results[i] = _to_dtos(hits)
+    return results
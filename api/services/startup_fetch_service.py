@@ -4,16 +4,15 @@ import base64
 import os
 import re
 import asyncio
+import time
 import logging
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import httpx
 from dotenv import load_dotenv
 from api.dto.startup_dto import CreateStartupResponseDTO
-
-from api.services.vectorize_hook import vectorize_and_upsert_from_dtos
-from api.embedding.faiss_store import FaissStore
-from api.embedding.vectorizer import embedding_dimension
+from api.services.fetch_control import FetchController, PageFetchError
+from api.services.announcement_store import UNCHANGED, AnnouncementStore
 
 load_dotenv()
 SERVICE_KEY = os.getenv("SERVICE_KEY")
@@ -155,38 +154,54 @@ def _normalize_target_age(value: Optional[str]) -> Optional[str]:
     return value
 
 # ================================================[[ 내부 메서드 ]]================================================
-async def _safe_fetch_json(client: httpx.AsyncClient, params: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        log_params = {k: v for k, v in params.items() if k != "serviceKey"}
-        # 요청 정보 찍기
-        # logger.debug("[HTTP] GET 요청 보냄 → URL=%s, 요청 params=%s", BASE_URL, log_params)
-        r = await client.get(BASE_URL, params=params, timeout=10.0)
-        # 응답 정보 찍기
-        # logger.debug("[HTTP] 응답 받음 → page=%s, status=%s, bytes=%s", params.get("pageNo"), r.status_code, len(r.content))
-
-        r.raise_for_status()
-        ctype = r.headers.get("content-type", "")
-        if "application/json" not in ctype.lower():
-            # HTML/빈 응답 등 있는 경우 → 빈 데이터로 처리
-            logger.warning("[HTTP] Non-JSON content-type=%s (page=%s)", ctype, params.get("pageNo"))
-            return {}
-        return r.json()
-    except Exception as e:
-        # 네트워크/JSON 파싱/HTTP 오류 → 빈 데이터로 처리
-        logger.error("[ERROR] page=%s 요청 실패(네트워크, JSON 파싱, HTTP 오류: %s", params.get("pageNo"), e)
-        return {}
-
-async def _fetch_page_items(client: httpx.AsyncClient, page_no: int, num_rows: int) -> List[Dict[str, Any]]:
-    params = {
+# 페이지 크기: num_rows를 안 주면 PAGE_SIZE_MAX부터 시도해서 왕복 횟수를 줄임
+# - 큰 페이지가 계속 실패하면 절반씩 줄이고, 서버가 perPage 상한으로 잘라 주면 그 크기로 맞춤
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "100"))
+PAGE_SIZE_MIN = int(os.getenv("PAGE_SIZE_MIN", "10"))
+
+
+def _page_params(page_no: int, per_page: int) -> Dict[str, Any]:
+    return {
         "serviceKey": SERVICE_KEY,
         "page": page_no, # pageNo -> page
-        "perPage": num_rows, # numOfRows -> perPage
+        "perPage": per_page, # numOfRows -> perPage
         "returnType": "json",
     }
-    data = await _safe_fetch_json(client, params)
-    items = data.get("data", []) or []
-    # logger.debug("[시작] page=%s raw_items=%s", page_no, len(items))
-    return items
+
+async def _fetch_page(client: httpx.AsyncClient, ctl: FetchController, page_no: int, per_page: int) -> Optional[Dict[str, Any]]:
+    """페이지 JSON, 재시도까지 실패하면 None (빈 페이지 {"data": []}와 구분)"""
+    try:
+        return await ctl.get_json(client, BASE_URL, _page_params(page_no, per_page))
+    except PageFetchError as e:
+        logger.error("[ERROR] page=%s 요청 실패(재시도 소진): %s", page_no, e)
+        return None
+
+async def _fetch_page_items(client: httpx.AsyncClient, ctl: FetchController, page_no: int, per_page: int) -> Optional[List[Dict[str, Any]]]:
+    data = await _fetch_page(client, ctl, page_no, per_page)
+    return None if data is None else (data.get("data") or [])
+
+def _total_count(data: Dict[str, Any]) -> int:
+    try:
+        return int(data.get("totalCount") or data.get("total_count") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+async def _probe_first_page(client: httpx.AsyncClient, ctl: FetchController,
+                            num_rows: Optional[int]) -> tuple[int, Optional[Dict[str, Any]]]:
+    per_page = num_rows or PAGE_SIZE_MAX
+    while True:
+        first = await _fetch_page(client, ctl, 1, per_page)
+        if first is not None:
+            break
+        if num_rows or per_page <= PAGE_SIZE_MIN:
+            return per_page, None
+        per_page = max(PAGE_SIZE_MIN, per_page // 2)
+        logger.info("[데이터수집] 큰 페이지 요청 실패 → perPage=%d로 재시도", per_page)
+    got = len(first.get("data") or [])
+    if 0 < got < per_page and _total_count(first) > got:
+        # 서버가 perPage 상한으로 잘라 줌 → 실제 크기로 맞춰야 다음 페이지 번호가 어긋나지 않음
+        per_page = got
+    return per_page, first
 
 def _filter_and_dedupe(items, seen):
     out = []
@@ -209,16 +224,311 @@ def _filter_and_dedupe(items, seen):
     #              len(items), len(out), removed_private, removed_dup)
     return out
 
+# ================================================[[ 파이프라인 단계 ]]================================================
+# 수집(네트워크) → DTO 변환 → 임베딩 묶음 전달이 큐로 연결되어 동시에 진행
+# - 큐 크기가 제한돼 있어 뒷단이 느리면 앞단이 기다림 (원본 페이지를 전부 메모리에 쌓지 않음)
+# - 페이지 수집은 batch_concurrency개 동시 요청, 변환은 1개 태스크, 임베딩은 on_batch 쪽(수집 job 워커 스레드)
+PIPELINE_QUEUE_PAGES = int(os.getenv("PIPELINE_QUEUE_PAGES", "32"))  # 단계 사이 큐에 쌓아둘 최대 페이지 수
+PIPELINE_EMBED_BATCH = int(os.getenv("PIPELINE_EMBED_BATCH", "512"))  # on_batch로 넘길 DTO 묶음 크기
+
+BatchSink = Callable[[List[CreateStartupResponseDTO]], Awaitable[None]]
+_END = None  # 큐 종료 표시
+
+
+async def _convert_stage(page_q: asyncio.Queue, dto_q: Optional[asyncio.Queue],
+                         dtos: List[CreateStartupResponseDTO], stats: Dict[str, int]) -> None:
+    while True:
+        items = await page_q.get()
+        if items is _END:
+            break
+        page_dtos = []
+        for it in items:
+            try:
+                page_dtos.append(to_create_startup_response(it))
+            except Exception as e:
+                stats["dto_fail"] += 1
+                logger.warning("[DTO변환] DTO 변환 실패 (pbanc_sn=%s): %s", it.get("pbanc_sn"), e)
+        dtos.extend(page_dtos)
+        if dto_q is not None and page_dtos:
+            await dto_q.put(page_dtos)
+    if dto_q is not None:
+        await dto_q.put(_END)
+
+
+async def _embed_stage(dto_q: asyncio.Queue, on_batch: BatchSink, batch_size: int) -> None:
+    # 들어온 만큼 묶어서(최대 batch_size) 전달, 큐가 비면 모인 것만 바로 전달
+    sink_ok = True
+    done = False
+    while not done:
+        batch: List[CreateStartupResponseDTO] = []
+        page = await dto_q.get()
+        if page is _END:
+            break
+        batch.extend(page)
+        while len(batch) < batch_size and not dto_q.empty():
+            page = dto_q.get_nowait()
+            if page is _END:
+                done = True
+                break
+            batch.extend(page)
+        if not sink_ok:
+            continue  # 실패 후에도 앞단이 막히지 않도록 큐는 계속 비움
+        try:
+            await on_batch(batch)
+        except Exception as e:
+            sink_ok = False
+            logger.error("[벡터화][ERROR] 임베딩 단계 실패 → 이후 묶음 전달 중단: %s", e)
+
+
+# 증분 수집(after_external_ref) 스캔 방식
+# - SPECULATIVE_SCAN=1: 2페이지부터 창(window) 크기만큼 동시에 요청, 마커가 안 나오면 창을 2배씩 키움
+#   (최대 SPECULATIVE_MAX_WINDOW), 마커를 찾으면 남은 요청은 취소
+# - 결과는 항상 페이지 순서대로 처리 → 순차 스캔과 같은 항목/순서
+SPECULATIVE_SCAN = os.getenv("SPECULATIVE_SCAN", "1") not in ("0", "false", "False")
+SPECULATIVE_MAX_WINDOW = int(os.getenv("SPECULATIVE_MAX_WINDOW", "32"))
+# 마커가 사라진 경우(상류에서 삭제): 마커보다 작은 pbanc_sn이 처음 나온 뒤 이 페이지 수만큼 더 봐도 마커가 없으면 거기서 자름
+MARKER_FALLBACK_PAGES = int(os.getenv("MARKER_FALLBACK_PAGES", "2"))
+
+
+def _sn(item: Dict[str, Any]) -> Optional[int]:
+    ext = item.get("pbanc_sn")
+    try:
+        return int(ext) if ext is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _MarkerCutter:
+    """
+    페이지 순서대로 받아 마커 전까지만 내보냄 (최신부터 과거로 조회함 → 중복 방지)
+    - 마커보다 오래된(작은) pbanc_sn이 나오면 그 뒤 항목은 보류했다가
+      정확한 마커가 나오면 같이 내보내고(순차 스캔과 동일), 끝내 안 나오면 버림(마커 소실 대비)
+    """
+    def __init__(self, marker: str, fallback_pages: int = MARKER_FALLBACK_PAGES):
+        self.marker = marker
+        self.marker_sn = int(marker) if marker.isdigit() else None
+        self.fallback_pages = fallback_pages
+        self.found = False
+        self.vanished = False
+        self._held: List[Dict[str, Any]] = []
+        self._passed_page: Optional[int] = None
+
+    def feed(self, page: int, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for i, it in enumerate(items):
+            ext = it.get("pbanc_sn")
+            if ext is not None and f"{ext}" == self.marker:
+                self.found = True
+                out, self._held = self._held + items[:i], []
+                return out
+        if self._passed_page is not None:
+            self._held.extend(items)
+            if page - self._passed_page >= self.fallback_pages:
+                self.give_up()
+            return []
+        if self.marker_sn is not None:
+            for i, it in enumerate(items):
+                sn = _sn(it)
+                if sn is not None and sn < self.marker_sn:
+                    self._passed_page = page
+                    self._held = items[i:]
+                    return items[:i]
+        return items
+
+    def give_up(self) -> None:
+        # 마커를 지난 것이 확실한데 마커가 없음 → 보류분은 이미 색인된 공고로 보고 버림
+        if self._passed_page is not None and not self.found:
+            self.vanished = True
+            logger.warning("[데이터수집] 마커 externalRef=%s 없음(삭제 추정) → page=%s에서 자름 (보류 %d건 버림)",
+                           self.marker, self._passed_page, len(self._held))
+        self._held = []
+
+    @property
+    def done(self) -> bool:
+        return self.found or self.vanished
+
+
+# 원본 저장소가 있으면: 이미 알고 있는(변경 없는) 공고가 이만큼 연속으로 나오면 수집 중단 (0이면 끝까지)
+KNOWN_RUN_STOP = int(os.getenv("KNOWN_RUN_STOP", "100"))
+
+
+def _known_run_reached(stats: Dict[str, int]) -> bool:
+    return KNOWN_RUN_STOP > 0 and stats.get("known_run", 0) >= KNOWN_RUN_STOP
+
+
+async def _scan_to_marker(
+        client: httpx.AsyncClient,
+        ctl: FetchController,
+        push: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        cutter: _MarkerCutter,
+        seen: set,
+        stats: Dict[str, int],
+        *,
+        per_page: int,
+        last_page: int,
+        max_empty_batches: int,
+        speculative: bool,
+) -> None:
+    # 창 크기 1 = 순차 스캔, 투기 모드는 2부터 시작해서 창 하나를 다 소비할 때마다 2배
+    window = 2 if speculative else 1
+    consumed = 0
+    pending: Dict[int, asyncio.Task] = {}
+    next_emit = next_sched = 2
+    empty_batches = 0
+    try:
+        while not cutter.done:
+            # 안전 상한/빈 페이지 종료
+            if next_emit > last_page:
+                logger.info("[데이터수집] 마지막 페이지(%s) 도달 -> stop", last_page)
+                break
+            while next_sched <= last_page and next_sched - next_emit < window:
+                pending[next_sched] = asyncio.create_task(_fetch_page_items(client, ctl, next_sched, per_page))
+                next_sched += 1
+            page = next_emit
+            raw = await pending.pop(page)
+            next_emit += 1
+            stats["pages_scanned"] += 1
+            consumed += 1
+            if speculative and consumed >= window:
+                window, consumed = min(SPECULATIVE_MAX_WINDOW, window * 2), 0
+
+            if raw is None:
+                # 건너뛰면 마커 이전 공고가 빠짐 → 여기서 중단 (다음 동기화 때 다시 수집)
+                stats["failed_pages"] += 1
+                logger.error("[데이터수집] page=%s 실패로 중단 (마커 이전 공고 일부 미수집)", page)
+                break
+
+            # 응답(items)이 빈 경우 -> 끝 간주
+            if not raw:
+                empty_batches += 1
+                logger.debug("[LOOP-A] empty batch count=%s", empty_batches)
+                if empty_batches >= max_empty_batches:
+                    logger.info("[데이터수집] max_empty_batches(%s) 도달 -> stop", max_empty_batches)
+                    break
+            else:
+                empty_batches = 0  # 응답은 있었음(필터로 비었더라도 계속 진행)
+
+            await push(cutter.feed(page, _filter_and_dedupe(raw, seen)))
+            if cutter.found:
+                logger.info("[데이터수집] marker found externalRef=%s at page=%s", cutter.marker, page)
+            elif _known_run_reached(stats):
+                logger.info("[데이터수집] 변경 없는 공고 %d건 연속 → stop (page=%s)", stats["known_run"], page)
+                break
+    finally:
+        for t in pending.values():
+            t.cancel()  # 마커 뒤 페이지 요청은 필요 없음
+        stats["cancelled_pages"] = len(pending)
+    cutter.give_up()
+
+
+async def _crawl_pages(
+        client: httpx.AsyncClient,
+        ctl: FetchController,
+        emit: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        *,
+        after_external_ref: str | None,
+        num_rows: Optional[int],
+        max_empty_batches: int,
+        hard_max_pages: int,
+        speculative: bool = True,
+        raw_store: Optional[AnnouncementStore] = None,
+        changed_only: bool = False,
+) -> Dict[str, int]:
+    seen: set[str] = set()
+    stats = {"pages_scanned": 0, "collected": 0, "failed_pages": 0, "cancelled_pages": 0, "per_page": 0,
+             "new": 0, "changed": 0, "unchanged": 0, "known_run": 0}
+
+    async def push(items: List[Dict[str, Any]]) -> None:
+        if items and raw_store is not None:
+            # 원본 저장 (+ changed_only면 신규/변경만 남김, 페이지 순서대로 호출됨 → 연속 미변경 수로 수집 중단)
+            statuses = await asyncio.to_thread(raw_store.record, items)
+            for st in statuses:
+                stats[st] += 1
+                if changed_only:
+                    stats["known_run"] = stats["known_run"] + 1 if st == UNCHANGED else 0
+            if changed_only:
+                items = [it for it, st in zip(items, statuses) if st != UNCHANGED]
+        if items:
+            await emit(items)  # 변환 단계가 밀려 있으면 여기서 대기 (backpressure)
+            stats["collected"] += len(items)
+
+    # 0) 첫 페이지로 페이지 크기/총 페이지 수 결정
+    per_page, first = await _probe_first_page(client, ctl, num_rows)
+    stats["per_page"] = per_page
+    stats["pages_scanned"] += 1
+    if first is None:
+        stats["failed_pages"] += 1
+        logger.error("[데이터수집] 첫 페이지 수집 실패 → 중단")
+        return stats
+    total_count = _total_count(first)
+    total_pages = max(1, (total_count + per_page - 1) // per_page) if total_count > 0 else None
+    logger.info("[데이터수집] estimated total_pages=%s (total_count=%s, page_size=%s)",
+                total_pages, total_count or None, per_page)
+    last_page = min(hard_max_pages, total_pages) if total_pages else hard_max_pages
+
+    # 1) after_external_ref가 있는 경우: 마커까지 수집 (투기적 병렬 또는 순차)
+    if after_external_ref:
+        cutter = _MarkerCutter(after_external_ref)
+        await push(cutter.feed(1, _filter_and_dedupe(first.get("data") or [], seen)))
+        if cutter.found:
+            logger.info("[데이터수집] marker found externalRef=%s at page=1", after_external_ref)
+        elif not _known_run_reached(stats):
+            await _scan_to_marker(client, ctl, push, cutter, seen, stats,
+                                  per_page=per_page, last_page=last_page,
+                                  max_empty_batches=max_empty_batches, speculative=speculative)
+        return stats
+
+    # 2) after_external_ref가 없는 경우: 병렬 수집 (동시성/속도는 FetchController가 조절)
+    #    - 페이지 순서대로 내보내고, 앞으로 window 페이지까지만 미리 요청 (메모리 상한)
+    await push(_filter_and_dedupe(first.get("data") or [], seen))
+    window = max(2, ctl.limiter.max_limit * 2)
+    pending: Dict[int, asyncio.Task] = {}
+    next_emit = next_sched = 2
+    empty_batches = 0
+    try:
+        while next_emit <= last_page:
+            if _known_run_reached(stats):
+                logger.info("[데이터수집] 변경 없는 공고 %d건 연속 → stop (page=%s)", stats["known_run"], next_emit - 1)
+                break
+            while next_sched <= last_page and next_sched - next_emit < window:
+                pending[next_sched] = asyncio.create_task(_fetch_page_items(client, ctl, next_sched, per_page))
+                next_sched += 1
+            raw = await pending.pop(next_emit)
+            stats["pages_scanned"] += 1
+            next_emit += 1
+
+            if raw is None:
+                stats["failed_pages"] += 1  # 실패 페이지는 빈 페이지로 세지 않음
+                continue
+            if not raw:
+                empty_batches += 1
+                logger.debug("[LOOP-B] empty page count=%s", empty_batches)
+                if empty_batches >= max_empty_batches:
+                    logger.info("[데이터수집] max_empty_batches(%s) 도달 -> stop", max_empty_batches)
+                    break
+                continue
+            empty_batches = 0
+            await push(_filter_and_dedupe(raw, seen))
+        else:
+            logger.info("[데이터수집] reached end of pages (%s) -> stop", last_page)
+    finally:
+        for t in pending.values():
+            t.cancel()
+    return stats
+
 # ================================================[[ 공개 메서드 ]]================================================
 async def fetch_startup_supports_async(
         *,
         after_external_ref: str | None = None, # 가장 최신 공고 key
         expired_external_refs: list[str] | None = None,   # 삭제할 공고 key 리스트
-        num_rows: int = 10, # 한 번에 10개로
-        batch_concurrency: int = 5,
+        num_rows: Optional[int] = None, # 페이지 크기 (None이면 자동: PAGE_SIZE_MAX부터)
+        batch_concurrency: int = 5, # 시작 동시성 (이후 AIMD로 조절)
         max_empty_batches: int = 2,
-        sleep_between_batches: float = 0.05,
         hard_max_pages: int = 100, # 상한선
+        on_batch: Optional[BatchSink] = None,  # 변환된 DTO 묶음을 받아 임베딩/색인하는 쪽 (없으면 수집만)
+        embed_batch_size: int = PIPELINE_EMBED_BATCH,
+        speculative: Optional[bool] = None,  # 증분 수집 투기적 병렬 스캔 (None이면 SPECULATIVE_SCAN 설정)
+        raw_store: Optional[AnnouncementStore] = None,  # 있으면 원본 저장 (+ 신규/변경/변경없음 집계)
+        changed_only: bool = False,  # raw_store 기준 신규/변경분만 반환, 변경 없는 공고가 이어지면 수집 중단
 ) -> List[CreateStartupResponseDTO]:
     # 색 표시를 위해 임시로 warning 사용
     logger.warning(
@@ -226,163 +536,53 @@ async def fetch_startup_supports_async(
         after_external_ref, expired_external_refs, num_rows, batch_concurrency, hard_max_pages
     )
 
-    # 1. 먼저 마감된 데이터 삭제 --------------------------------------------------------
-    if expired_external_refs:
-        try:
-            # 숫자 문자열만
-            safe_refs = [str(r) for r in expired_external_refs if str(r).isdigit()]
-            if not safe_refs:
-                logger.info("[마감데이터삭제] 유효한 external_ref 없음 → 스킵")
-            else:
-                dim = embedding_dimension()
-                store = FaissStore(index_path=INDEX_PATH, dim=dim)
-                store.load()  # 파일 없으면 새로 만듦
-                deleted = store.remove_by_external_ids(safe_refs)
-                store.save()
-                logger.info("[마감데이터삭제] 삭제 완료: 요청=%d, 실제 삭제≈%d", len(safe_refs), deleted)
-        except Exception as e:
-            logger.warning("[마감데이터삭제] 삭제 중 오류: %s", e)
+    # 1. 마감된 데이터 (삭제는 수집 작업(job)에서 업서트와 한 트랜잭션으로 적용) ---------------------
+    if expired_external_refs and not any(str(r).isdigit() for r in expired_external_refs):
+        logger.info("[마감데이터삭제] 유효한 external_ref 없음 → 스킵")
+    elif expired_external_refs and raw_store is not None:
+        await asyncio.to_thread(raw_store.remove, [str(r) for r in expired_external_refs if str(r).isdigit()])
 
-    # 2. 신규 데이터 수집 시작 ------------------------------------------------------------------------------
-    all_items: List[Dict[str, Any]] = []
-    seen: set[str] = set()
-    empty_batches = 0
-    pages_scanned = 0
+    # 2~4. 수집 → DTO 변환 → 임베딩 묶음 전달 (단계별 태스크가 큐로 이어져 동시에 진행) ------------------
+    dtos: List[CreateStartupResponseDTO] = []
+    stats = {"dto_fail": 0}
+    page_q: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_PAGES)
+    dto_q: Optional[asyncio.Queue] = asyncio.Queue(maxsize=PIPELINE_QUEUE_PAGES) if on_batch else None
+
+    stages = [asyncio.create_task(_convert_stage(page_q, dto_q, dtos, stats))]
+    if on_batch is not None:
+        stages.append(asyncio.create_task(_embed_stage(dto_q, on_batch, embed_batch_size)))
 
     logger.info("[데이터수집] 데이터 수집 시작")
 
+    crawl = {"pages_scanned": 0, "collected": 0, "failed_pages": 0, "per_page": num_rows}
+    ctl = FetchController(initial_concurrency=batch_concurrency)
     limits = httpx.Limits(max_keepalive_connections=20, max_connections=50)
-    async with httpx.AsyncClient(headers={"Accept": "application/json"}, limits=limits) as client:
-
-        # 1) after_external_ref가 있는 경우: 마커까지 순차로 수집 
-        if after_external_ref:
-            page = 1
-            found_marker = False
-
-            while True:
-                # 안전 상한/빈 페이지 종료
-                if page > hard_max_pages:
-                    logger.info("[데이터수집] hard_max_pages(%s) 도달 -> stop", hard_max_pages)
-                    break
-
-                items = await _fetch_page_items(client, page, num_rows)
-                pages_scanned += 1
-                filt = _filter_and_dedupe(items, seen)
-
-                # 응답(items)이 빈 경우 -> 끝 간주
-                if not items:
-                    empty_batches += 1
-                    logger.debug("[LOOP-A] empty batch count=%s", empty_batches)
-                    if empty_batches >= max_empty_batches:
-                        logger.info("[데이터수집] max_empty_batches(%s) 도달 -> stop", max_empty_batches)
-                        break
-                else:
-                    empty_batches = 0  # 응답은 있었음(필터로 비었더라도 계속 진행)
-
-                # 최신부터 과거로 조회로 조회함
-                for it in filt:
-                    ext = it.get("pbanc_sn")
-                    ext_str = f"{ext}" if ext is not None else None
-                    if ext_str == after_external_ref:
-                        found_marker = True
-                        # 마커 전까지만 수집(중복 방지)
-                        logger.info("[데이터수집] marker found externalRef=%s at page=%s", after_external_ref, page)
-                        break
-                    all_items.append(it)
-
-                if found_marker:
-                    break
-
-                page += 1
-                if sleep_between_batches:
-                    await asyncio.sleep(sleep_between_batches)
-
-        # 2) after_external_ref가 없는 경우: 기존 배치 병렬 수집 
-        else:
-            # 1) 첫 페이지로 총 페이지 수 추정
-            first = await _safe_fetch_json(client, {
-                "serviceKey": SERVICE_KEY, "page": 1, "perPage": num_rows, "returnType": "json"
-            })
-            pages_scanned += 1
-            first_items = (first.get("data") or [])
-            all_items.extend(_filter_and_dedupe(first_items, seen))
-
-            total_pages: Optional[int] = None
-            try:
-                total_count = int(first.get("totalCount") or first.get("total_count") or 0)
-                if total_count > 0 and num_rows > 0:
-                    total_pages = max(1, (total_count + num_rows - 1) // num_rows)
-            except Exception:
-                total_pages = None
-            logger.info("[데이터수집] estimated total_pages=%s (total_count=%s, page_size=%s)",
-                        total_pages, first.get("totalCount") or first.get("total_count"), num_rows)
-
-            # 2) 나머지 페이지 수집 (배치)
-            page = 2
-            while True:
-                if total_pages is not None and page > total_pages:
-                    logger.info("[데이터수집] reached end of pages (%s) -> stop", total_pages)
-                    break
-                if page > hard_max_pages:
-                    logger.info("[데이터수집] hard_max_pages(%s) 도달 -> stop", hard_max_pages)
-                    break
-
-                pages = list(range(page, page + batch_concurrency))
-                if total_pages is not None:
-                    pages = [p for p in pages if p <= total_pages]
-                    if not pages:
-                        break
-
-                logger.debug("[LOOP-B] batch pages=%s", pages)
-                tasks = [asyncio.create_task(_fetch_page_items(client, p, num_rows)) for p in pages]
-                results = await asyncio.gather(*tasks)
-                pages_scanned += len(results)
-
-                raw_non_empty = 0
-                batch_added = 0
-                for items in results:
-                    if items:
-                        raw_non_empty += 1
-                    filt = _filter_and_dedupe(items, seen)
-                    all_items.extend(filt)
-                    batch_added += len(filt)
-
-                logger.debug("[LOOP-B] raw_non_empty=%s batch_added=%s total_collected=%s",
-                             raw_non_empty, batch_added, len(all_items))
-
-                if raw_non_empty == 0:
-                    empty_batches += 1
-                    logger.debug("[LOOP-B] empty batch count=%s", empty_batches)
-                    if empty_batches >= max_empty_batches:
-                        logger.info("[데이터수집] max_empty_batches(%s) 도달 -> stop", max_empty_batches)
-                        break
-                else:
-                    empty_batches = 0
-
-                page += batch_concurrency
-                if sleep_between_batches:
-                    await asyncio.sleep(sleep_between_batches)
-
-     
-    # 3. DTO 변환 -------------------------------------------------------------------------------------
-    dtos: List[CreateStartupResponseDTO] = []
-    dto_fail = 0
-    for it in all_items:
-        try:
-            dtos.append(to_create_startup_response(it))
-        except Exception as e:
-            dto_fail += 1
-            logger.warning("[DTO변환] DTO 변환 실패 (pbanc_sn=%s): %s", it.get("pbanc_sn"), e)
-
-
-    # 4. 임베딩/인덱스 업데이트 (제목+본문만, external_ref을 key로 관리) ---------------------------------
     try:
-        logger.info("[벡터화] 시작")
-        vectorize_and_upsert_from_dtos(dtos)  # ← 반환값 받기
-        logger.info("[벡터화] 완료")
-    except Exception as e:
-        logger.error("[벡터화][ERROR] 실패: %s", e)
-
-    logger.info("[최종] 처리한 페이지=%s 수집한 원본 데이터=%s DTO 변환 성공=%s DTO 변환 실패=%s",
-                pages_scanned, len(all_items), len(dtos), dto_fail)
+        async with httpx.AsyncClient(headers={"Accept": "application/json"}, limits=limits) as client:
+            crawl = await _crawl_pages(
+                client, ctl, page_q.put,
+                after_external_ref=after_external_ref,
+                num_rows=num_rows,
+                max_empty_batches=max_empty_batches,
+                hard_max_pages=hard_max_pages,
+                speculative=SPECULATIVE_SCAN if speculative is None else speculative,
+                raw_store=raw_store,
+                changed_only=changed_only and raw_store is not None,
+            )
+    finally:
+        # 수집이 실패해도 뒷단은 지금까지 받은 것까지 처리하고 종료
+        await page_q.put(_END)
+        await asyncio.gather(*stages)
+
+    logger.info("[최종] 처리한 페이지=%s(실패 %s, 취소 %s, perPage=%s) 수집한 원본 데이터=%s DTO 변환 성공=%s DTO 변환 실패=%s",
+                crawl["pages_scanned"], crawl["failed_pages"], crawl.get("cancelled_pages", 0), crawl["per_page"],
+                crawl["collected"], len(dtos), stats["dto_fail"])
+    if raw_store is not None:
+        delta = {k: crawl.get(k, 0) for k in ("new", "changed", "unchanged")}
+        logger.info("[원본저장소] 신규=%d 변경=%d 변경없음=%d (저장소 %d건)",
+                    delta["new"], delta["changed"], delta["unchanged"], raw_store.count())
+        raw_store.set_state(last_sync_at=time.time(), last_sync={**delta, "pages": crawl["pages_scanned"],
+                                                                 "after_external_ref": after_external_ref})
+    logger.info("[HTTP] 요청=%d 재시도=%d 과부하 응답=%d 최대 동시성=%.1f",
+                ctl.stats.requests, ctl.stats.retries, ctl.stats.overloads, ctl.stats.max_concurrency)
     return dtos
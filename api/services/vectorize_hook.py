@@ -2,16 +2,58 @@
 import os
 import re
 import logging
-from typing import List
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
 
-from api.embedding.vectorizer import embed_texts, embedding_dimension
-from api.embedding.faiss_store import FaissStore
+import numpy as np
+
+from api.embedding.vectorizer import MODEL_ID, count_tokens, embed_corpus, embed_texts
+from api.embedding.content_hashes import content_hash
+from api.embedding.metadata import MetadataRow, is_expired, metadata_row
+from api.embedding.index_singleton import get_store, get_store_manager
 from api.dto.startup_dto import CreateStartupResponseDTO
 
 logger = logging.getLogger("startup_service")
 
 INDEX_PATH = os.getenv("INDEX_PATH", "data/supports.faiss")
 
+ProgressFn = Callable[[str, int, int], None]  # (단계, 완료 수, 전체 수)
+
+
+@dataclass
+class UpsertPlan:
+    # 임베딩해서 업서트할 공고
+    texts: List[str] = field(default_factory=list)
+    refs: List[str] = field(default_factory=list)
+    hashes: List[str] = field(default_factory=list)
+    metas: List[MetadataRow] = field(default_factory=list)
+    # 본문은 같고 메타데이터(마감일/모집 여부 등)만 바뀐 공고 → 임베딩 없이 메타데이터만 갱신
+    meta_refs: List[str] = field(default_factory=list)
+    meta_rows: List[MetadataRow] = field(default_factory=list)
+    # 서빙 스냅샷 기준으로 변경 없다고 본 공고 (트랜잭션 복사본 기준으로 다시 확인, 그 사이 바뀌었으면 임베딩)
+    same_texts: List[str] = field(default_factory=list)
+    same_refs: List[str] = field(default_factory=list)
+    same_hashes: List[str] = field(default_factory=list)
+    same_metas: List[MetadataRow] = field(default_factory=list)
+    skipped: int = 0
+
+    def is_empty(self) -> bool:
+        return not self.refs and not self.meta_refs
+
+    def extend(self, other: "UpsertPlan") -> None:
+        self.texts += other.texts
+        self.refs += other.refs
+        self.hashes += other.hashes
+        self.metas += other.metas
+        self.meta_refs += other.meta_refs
+        self.meta_rows += other.meta_rows
+        self.same_texts += other.same_texts
+        self.same_refs += other.same_refs
+        self.same_hashes += other.same_hashes
+        self.same_metas += other.same_metas
+        self.skipped += other.skipped
+
+
 def _ensure_dir(path: str) -> None:
     d = os.path.dirname(path)
     if d and not os.path.exists(d):
@@ -26,12 +68,13 @@ def _build_text_from_dto(dto: CreateStartupResponseDTO) -> str:
     # 제목+본문만 사용
     return f"{_norm(dto.title)} {_norm(dto.support_details)}".strip()
 
-def vectorize_and_upsert_from_dtos(dtos: List[CreateStartupResponseDTO]) -> None:
-    # external_ref 있고 제목/본문 있는 것만
-    valid = [d for d in dtos if d.external_ref and (d.title or d.support_details)]
+def _collect_upserts(dtos: List[CreateStartupResponseDTO]) -> tuple[List[str], List[str], List[MetadataRow]]:
+    # external_ref 있고 제목/본문 있는 것만, 이미 마감된 공고는 색인하지 않음 (스위퍼가 지울 대상)
+    valid = [d for d in dtos if d.external_ref and (d.title or d.support_details)
+             and not is_expired(getattr(d, "end_date", None))]
     if not valid:
         logger.info("[벡터화] 유효한 데이터 없음")
-        return
+        return [], [], []
 
     texts = [_build_text_from_dto(d) for d in valid]
     refs = [str(d.external_ref) for d in valid]
@@ -40,26 +83,131 @@ def vectorize_and_upsert_from_dtos(dtos: List[CreateStartupResponseDTO]) -> None
     keep_idx = [i for i, r in enumerate(refs) if r.isdigit()]
     if not keep_idx:
         logger.info("[벡터화] 숫자 external_ref 없음")
-        return
-    texts = [texts[i] for i in keep_idx]
-    refs = [refs[i] for i in keep_idx]
+        return [], [], []
 
     # 같은 ref가 여러 번 오면 마지막 것만
     last = {}
-    for i, r in enumerate(refs):
-        last[r] = i
+    for i in keep_idx:
+        last[refs[i]] = i
     uniq_idx = sorted(last.values())
-    texts = [texts[i] for i in uniq_idx]
-    refs = [refs[i] for i in uniq_idx]
+    return ([texts[i] for i in uniq_idx], [refs[i] for i in uniq_idx],
+            [metadata_row(valid[i]) for i in uniq_idx])
+
+def _skip_unchanged(texts: List[str], refs: List[str], metas: List[MetadataRow], expired: List[str]) -> UpsertPlan:
+    # 서빙 중인 스냅샷의 해시와 같으면 제외 (이번에 삭제될 ref는 다시 넣어야 하므로 비교 안 함)
+    # 제외한 공고도 메타데이터가 바뀌었거나 없으면(이전 형식 인덱스) 메타데이터만 갱신
+    store = get_store()
+    hashes = [content_hash(t, MODEL_ID) for t in texts]
+    same = store.hashes.unchanged(refs, hashes)
+    expired_set = set(expired)
+    keep = [i for i, r in enumerate(refs) if not same[i] or r in expired_set]
+    kept = set(keep)
+    same = [i for i in range(len(refs)) if i not in kept]
+    meta_changed = store.meta.changed(np.asarray([int(refs[i]) for i in same], dtype=np.int64),
+                                      [metas[i] for i in same])
+    rest = [i for i, changed in zip(same, meta_changed) if changed]
+    return UpsertPlan(
+        texts=[texts[i] for i in keep], refs=[refs[i] for i in keep],
+        hashes=[hashes[i] for i in keep], metas=[metas[i] for i in keep],
+        meta_refs=[refs[i] for i in rest], meta_rows=[metas[i] for i in rest],
+        same_texts=[texts[i] for i in same], same_refs=[refs[i] for i in same],
+        same_hashes=[hashes[i] for i in same], same_metas=[metas[i] for i in same],
+        skipped=len(refs) - len(keep),
+    )
+
+def _recheck_skipped(store, plan: UpsertPlan) -> UpsertPlan:
+    # 건너뛴 공고를 트랜잭션 복사본(다른 워커 변경분 반영) 해시와 다시 비교 → 그 사이 지워졌거나 바뀐 것만
+    if not plan.same_refs:
+        return UpsertPlan()
+    same = store.hashes.unchanged(plan.same_refs, plan.same_hashes)
+    stale = [i for i, ok in enumerate(same) if not ok]
+    return UpsertPlan(
+        texts=[plan.same_texts[i] for i in stale], refs=[plan.same_refs[i] for i in stale],
+        hashes=[plan.same_hashes[i] for i in stale], metas=[plan.same_metas[i] for i in stale],
+    )
+
+def embed_upserts(texts: List[str], progress: Optional[ProgressFn] = None) -> np.ndarray:
+    # 토큰 길이별 배치(EMBED_TOKEN_BUDGET)로 임베딩, 결과는 texts 순서 그대로 (add 전에 정규화는 FaissStore가 처리)
+    report = None
+    if progress is not None:
+        report = lambda done, total: progress("embedding", done, total)
+    return embed_corpus(texts, encode=embed_texts, lengths=count_tokens(texts), progress=report)
 
-    dim = embedding_dimension()
-    vecs = embed_texts(texts, batch_size=64).astype("float32")  # add 전에 정규화는 FaissStore가 처리
+def prepare_upserts(dtos: List[CreateStartupResponseDTO], expired: List[str]) -> UpsertPlan:
+    """유효성 검사 + 해시/메타데이터 비교 → 임베딩할 공고와 메타데이터만 갱신할 공고"""
+    texts, refs, metas = _collect_upserts(dtos)
+    if not refs:
+        return UpsertPlan()
+    return _skip_unchanged(texts, refs, metas, expired)
 
+def apply_upserts(vecs, plan: UpsertPlan, expired: List[str]) -> int:
+    """
+    마감 삭제 → 업서트 → 메타데이터 갱신을 트랜잭션 1회(저장 1회)로 적용, 적용 후 ntotal 반환
+    - 건너뛴 공고는 트랜잭션 복사본 기준으로 다시 확인해서 그 사이 바뀐 것만 락 안에서 임베딩
+    """
     _ensure_dir(INDEX_PATH)
+    with get_store_manager().transaction() as store:
+        if expired:
+            deleted = store.remove_by_external_ids(expired)
+            logger.info("[마감데이터삭제] 삭제 완료: 요청=%d, 실제 삭제≈%d", len(expired), deleted)
+        if plan.refs:
+            # 중복은 삭제 후 재추가
+            store.upsert_with_external_ids(vecs, plan.refs, content_hashes=plan.hashes, metadata=plan.metas)
+        stale = _recheck_skipped(store, plan)
+        if stale.refs:
+            logger.info("[벡터화] 건너뛴 공고 중 %d건이 그 사이 바뀜 → 다시 임베딩", len(stale.refs))
+            store.upsert_with_external_ids(embed_upserts(stale.texts), stale.refs,
+                                           content_hashes=stale.hashes, metadata=stale.metas)
+        restaged = set(stale.refs)
+        rows = [(r, m) for r, m in zip(plan.meta_refs, plan.meta_rows) if r not in restaged]
+        store.update_metadata([r for r, _ in rows], [m for _, m in rows])
+    return store.ntotal
+
+def replace_index_from_dtos(dtos: List[CreateStartupResponseDTO], progress: Optional[ProgressFn] = None) -> int:
+    """
+    인덱스 전체 교체 (해시 비교 없이 전부 임베딩), 적용 후 ntotal 반환
+    - 임베딩을 모두 끝낸 뒤 비우기 + 업서트를 트랜잭션 1회로 게시 → 중간에 빈 인덱스가 서빙되지 않음
+    - 임베딩이 실패하면 기존 인덱스 그대로
+    """
+    texts, refs, metas = _collect_upserts(dtos)
+    vecs = embed_upserts(texts, progress) if refs else None
+    hashes = [content_hash(t, MODEL_ID) for t in texts]
+    _ensure_dir(INDEX_PATH)
+    with get_store_manager().transaction() as store:
+        store.clear()
+        if refs:
+            store.upsert_with_external_ids(vecs, refs, content_hashes=hashes, metadata=metas)
+    logger.info("[벡터화] 전체 교체: embedded=%d, ntotal=%d", len(refs), store.ntotal)
+    return store.ntotal
+
+def vectorize_and_upsert_from_dtos(
+        dtos: List[CreateStartupResponseDTO],
+        expired_refs: Optional[List[str]] = None,
+        progress: Optional[ProgressFn] = None,
+) -> None:
+    """
+    마감 공고 삭제 + 신규/변경 공고 업서트를 한 트랜잭션으로 적용
+    - 제목+본문 해시가 이미 색인된 것과 같은 공고는 임베딩/삭제/재추가 모두 생략 (메타데이터만 바뀌면 그것만 갱신)
+    - 임베딩은 락 밖에서 먼저 계산 (검색/다른 동기화를 오래 막지 않도록)
+      건너뛰기 판단은 트랜잭션 안에서 최신 복사본 기준으로 다시 확인 (다른 워커가 그 사이 지운/바꾼 공고)
+    - 서빙 중인 인덱스 복사본에 삭제→업서트 적용 후 저장 1회(해시 테이블 포함), 싱글톤 교체
+    - progress(단계, 완료, 전체): 백그라운드 job 진행률 보고용 (선택)
+    """
+    expired = [str(r) for r in (expired_refs or []) if str(r).isdigit()]
+    plan = prepare_upserts(dtos, expired)
+    if plan.is_empty() and not expired:
+        logger.info("[벡터화] 변경 없음: skipped=%d", plan.skipped)
+        return
 
-    store = FaissStore(index_path=INDEX_PATH, dim=dim)
-    store.load()
-    store.upsert_with_external_ids(vecs, refs)  # 중복은 삭제 후 재추가
-    store.save()
+    refs = plan.refs
+    if progress is not None:
+        progress("embedding", 0, len(refs))
+    vecs = embed_upserts(plan.texts, progress) if refs else None
 
-    logger.info("[벡터화] upsert=%d, ntotal=%d", len(refs), store.ntotal)
+    if progress is not None:
+        progress("indexing", 0, len(refs) + len(expired))
+    ntotal = apply_upserts(vecs, plan, expired)
+    if progress is not None:
+        progress("indexing", len(refs) + len(expired), len(refs) + len(expired))
+    logger.info("[벡터화] re-embedded=%d, skipped=%d, metadata-only=%d, expired=%d, ntotal=%d",
+                len(refs), plan.skipped, len(plan.meta_refs), len(expired), ntotal)
@@ -0,0 +1,115 @@
+# 시작 직후 워밍업 + 준비 상태(/ready)
+# - 인덱스는 manifest의 차원/모델 정보로 모델 없이 먼저 열고, 모델 로드 + 대표 쿼리 인코딩/검색을 미리 한 번 실행
+#   (첫 실제 /ai/similar가 모델 로드/그래프·커널 초기화/스레드 풀 생성 비용을 치르지 않도록)
+# - 백그라운드 스레드에서 실행: /health는 바로 ok, /ready는 인코딩과 검색이 모두 끝나야 200
+# - 실패하면(모델 다운로드/임베딩 서버 연결 등) 지수 백오프로 다시 시도 → 일시 장애 뒤에도 재시작 없이 준비 완료
+# - 쿼리 임베딩/결과 캐시는 거치지 않음 (워밍업 쿼리로 캐시를 채우지 않게)
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from api.embedding.index_singleton import get_store
+from api.embedding.metadata import SearchFilter
+from api.embedding.vectorizer import embed_texts
+
+logger = logging.getLogger("startup_service")
+
+WARMUP = os.getenv("WARMUP", "1") not in ("0", "false", "False")  # 끄면 인덱스만 열고 바로 준비 완료
+WARMUP_RETRY_BASE = float(os.getenv("WARMUP_RETRY_BASE", "5"))  # 초, 실패 후 첫 재시도 대기 (매번 2배)
+WARMUP_RETRY_MAX = float(os.getenv("WARMUP_RETRY_MAX", "300"))  # 초, 재시도 대기 상한
+
+WARMING, READY, FAILED = "warming", "ready", "failed"
+
+# 실제 요청과 비슷한 길이의 아이디어 문장 (배치 1건 + 여러 건 모두 실행해 두 경로 다 초기화)
+_QUERIES = [
+    "AI 기반 음식 사진 분류 및 칼로리 분석 서비스 모바일 앱 개발",
+    "해외 진출을 준비하는 핀테크 스타트업의 간편 송금 플랫폼",
+    "시니어 헬스케어 웨어러블 기기와 보호자 알림 서비스",
+    "친환경 포장재 개발 및 소상공인 대상 구독형 공급 서비스",
+]
+
+
+class Warmup:
+    def __init__(self, enabled: bool = WARMUP, retry_base: float = WARMUP_RETRY_BASE,
+                 retry_max: float = WARMUP_RETRY_MAX):
+        self.enabled = enabled
+        self.status = WARMING
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.timings: Dict[str, float] = {}  # 단계별 소요(ms)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._loop, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _loop(self) -> None:
+        # 성공할 때까지 재시도 (대기: retry_base, ×2, ... 최대 retry_max)
+        delay = self.retry_base
+        while not self.run() and not self._stop.wait(delay):
+            delay = min(self.retry_max, delay * 2)
+
+    def _step(self, name: str, fn):
+        t0 = time.perf_counter()
+        out = fn()
+        self.timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+        return out
+
+    def run(self) -> bool:
+        """워밍업 1회 시도, 성공 여부 반환 (실패 시 status=failed, 재시도는 _loop)"""
+        self.attempts += 1
+        try:
+            store = self._step("index_load_ms", get_store)
+            if self.enabled:
+                self._step("model_load_ms", lambda: embed_texts(_QUERIES[:1]))  # 모델 로드 + 첫 forward
+                qv = self._step("encode_ms", lambda: np.asarray(embed_texts(_QUERIES), dtype=np.float32))
+                if not store.is_empty() and qv.shape[1] == store.dim:
+                    self._step("search_ms", lambda: (store.search(qv[:1], top_k=30),
+                                                     store.search(qv, top_k=30),
+                                                     store.search(qv, top_k=30, flt=SearchFilter(recruiting_only=True))))
+            self.status, self.error = READY, None
+        except Exception as e:
+            self.status, self.error = FAILED, f"{type(e).__name__}: {e}"
+            logger.error("[워밍업][ERROR] 실패 (시도 %d회, 재시도 예정): %s", self.attempts, self.error)
+            return False
+        finally:
+            self.timings["total_ms"] = round((time.perf_counter() - self._started) * 1000, 1)
+        logger.info("[워밍업] 준비 완료: %s", self.timings)
+        return True
+
+    def state(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"status": self.status, "attempts": self.attempts, "timings_ms": dict(self.timings)}
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+_warmup = Warmup()
+
+
+def get_warmup() -> Warmup:
+    return _warmup
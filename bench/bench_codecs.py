@@ -0,0 +1,72 @@
+"""
+벡터 저장 코덱별 메모리/로드/검색 비교 (float32 / fp16 / sq8 / pq, 재정렬 on/off)
+- bytes/vector: 인덱스 파일 크기 ÷ 벡터 수 (워커 상주 메모리와 거의 같음)
+  원본 보관 파일(.raw_vecs.npy)은 mmap이라 후보 행만 페이지 캐시에 올라감 → 별도 표기
+- recall@k: float32 flat 결과 대비
+- 실행: python -m bench.bench_codecs --n 100000 --k 30
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig, build_index
+from api.embedding.raw_vectors import raw_paths
+from bench.bench_index_types import DIM, clustered_vectors, timed_search
+
+
+def build_and_save(cfg: IndexConfig, vecs: np.ndarray, path: str) -> None:
+    store = FaissStore(index_path=path, dim=vecs.shape[1], config=cfg)
+    store.index = build_index(cfg, vecs.shape[1], train_vecs=vecs)
+    store.add_with_external_ids(vecs, [str(i) for i in range(vecs.shape[0])])
+    store.save()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000)
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--rerank-factor", type=int, default=4)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_vectors(args.n, DIM, n_clusters=max(16, args.n // 500), rng=rng)
+    queries = corpus[rng.integers(0, args.n, size=args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    modes = [("float32", 0), ("fp16", 0), ("fp16", args.rerank_factor), ("sq8", 0),
+             ("sq8", args.rerank_factor), ("pq", 0), ("pq", args.rerank_factor)]
+    truth = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for codec, factor in modes:
+            path = os.path.join(tmp, f"{codec}.faiss")
+            cfg = IndexConfig(index_type="flat", codec=codec, exact_threshold=0, rerank_factor=factor)
+            if not os.path.exists(path):
+                build_and_save(cfg, corpus, path)
+
+            t0 = time.perf_counter()
+            store = FaissStore(index_path=path, dim=DIM, config=cfg)
+            store.load()
+            load_ms = (time.perf_counter() - t0) * 1000
+
+            found, lat = timed_search(store, queries, args.k)
+            if truth is None:
+                truth = found
+            recall = np.mean([len(f & g) / max(1, len(g)) for f, g in zip(found, truth)])
+            index_bpv = os.path.getsize(path) / args.n
+            raw_file = raw_paths(path)[1]
+            raw_bpv = os.path.getsize(raw_file) / args.n if os.path.exists(raw_file) else 0.0
+            label = f"{codec}+rerank{factor}" if factor else codec
+            print(f"{label:>14}: index={index_bpv:7.1f} B/vec raw(mmap)={raw_bpv:7.1f} B/vec "
+                  f"load={load_ms:7.1f}ms recall@{args.k}={recall:.3f} "
+                  f"p50={np.percentile(lat, 50):.2f}ms p99={np.percentile(lat, 99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+콜드 스타트 측정: 프로세스 시작 → 첫 번째 빠른 /ai/similar 응답까지
+- 합성 인덱스(기본 20000개, 384차원)를 manifest(차원/모델 기록)와 함께 만든 뒤, 모드마다 새 프로세스에서 앱 시작
+- lazy: WARMUP=0 (이전 방식) → 시작 직후 첫 요청이 모델 로드/초기화 비용을 치름
+- warm: WARMUP=1 → /ready가 200이 될 때까지 기다렸다가 요청 (로드밸런서 readiness probe와 같은 흐름)
+- 출력: 앱 시작(startup 이벤트 완료), ready, 첫 요청 지연, 이후 요청 지연(중앙값), 시작 → 첫 응답 완료 시간
+- 앱은 uvicorn 대신 TestClient(ASGI)로 띄움 (네트워크 비용 제외, 시작 경로는 같음)
+- 기본은 앱이 실제 SBERT 모델 로드, --embed-server 이면 무작위 가중치 MiniLM 임베딩 서버를 띄우고 앱은 소켓으로 사용
+
+실행: python -m bench.bench_cold_start
+      python -m bench.bench_cold_start --embed-server
+"""
+
+import time
+
+_T0 = time.perf_counter()  # 자식 프로세스 시작 시점 (무거운 import 전)
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+
+def _child(n_requests: int) -> None:
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    out = {"import_ms": (time.perf_counter() - _T0) * 1000}
+    with TestClient(app) as client:
+        out["startup_ms"] = (time.perf_counter() - _T0) * 1000
+        if os.getenv("WARMUP", "1") != "0":
+            while client.get("/ready").status_code != 200:
+                time.sleep(0.01)
+            out["ready_ms"] = (time.perf_counter() - _T0) * 1000
+        lat = []
+        for i in range(n_requests):
+            body = {"idea_title": f"콜드 스타트 아이디어 {i}", "idea_description": f"설명 {i} 기반 서비스 플랫폼"}
+            t0 = time.perf_counter()
+            resp = client.post("/ai/similar?k=30", json=body)
+            lat.append((time.perf_counter() - t0) * 1000)
+            assert resp.status_code == 200, resp.text
+            if i == 0:
+                out["first_done_ms"] = (time.perf_counter() - _T0) * 1000
+        out["first_ms"] = lat[0]
+        out["steady_ms"] = float(np.median(lat[1:])) if len(lat) > 1 else lat[0]
+    print(json.dumps(out))
+
+
+def _build_index(path: str, n: int, dim: int) -> None:
+    from api.embedding.store_manager import StoreManager
+    from api.embedding.vectorizer import MODEL_ID
+
+    vecs = np.random.default_rng(0).standard_normal((n, dim)).astype("float32")
+    mgr = StoreManager(index_path=path, dim_fn=lambda: dim, reload_interval=0, model=MODEL_ID)
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(vecs, [str(100000 + i) for i in range(n)])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", type=int, default=20000)
+    ap.add_argument("--requests", type=int, default=6)
+    ap.add_argument("--embed-server", action="store_true", help="무작위 가중치 MiniLM 임베딩 서버 사용 (모델 다운로드 불필요)")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        _child(args.requests)
+        return
+
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, INDEX_PATH=os.path.join(tmp, "supports.faiss"), EXPIRY_SWEEP_INTERVAL="0",
+               QUERY_CACHE_MAX_BYTES="0")
+    _build_index(env["INDEX_PATH"], args.corpus, 384)
+    server = None
+    if args.embed_server:
+        from bench.bench_embed_server import _serve
+        env["EMBED_SERVER_SOCKET"] = os.path.join(tmp, "embed.sock")
+        server = mp.get_context("spawn").Process(target=_serve, args=(env["EMBED_SERVER_SOCKET"], True, 1), daemon=True)
+        server.start()
+        while not os.path.exists(env["EMBED_SERVER_SOCKET"]):
+            time.sleep(0.05)
+
+    try:
+        for mode, warmup in (("lazy", "0"), ("warm", "1")):
+            proc = subprocess.run([sys.executable, "-m", "bench.bench_cold_start", "--child",
+                                   "--requests", str(args.requests)],
+                                  env=dict(env, WARMUP=warmup), capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"[{mode}] 실패:\n{proc.stderr[-2000:]}")
+                continue
+            r = json.loads(proc.stdout.strip().splitlines()[-1])
+            ready = f"{r['ready_ms']:8.0f}ms" if "ready_ms" in r else f"{'-':>10}"
+            print(f"[{mode}] startup={r['startup_ms']:7.0f}ms ready={ready} first={r['first_ms']:7.1f}ms "
+                  f"steady={r['steady_ms']:6.1f}ms 시작→첫 응답={r['first_done_ms']:7.0f}ms")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+색인용 임베딩 배치 구성 비교: 고정 64개 배치 vs 토큰 길이별 배치(토큰 예산)
+- 공고 본문 길이 분포를 흉내 낸 합성 텍스트 (한 줄짜리 30% + 로그정규 분포 본문, 최대 8000자)
+- chunked-64: 이전 수집 작업 경로 (수집 순서대로 512개씩 embed_texts(batch_size=64))
+- fixed-64  : 이전 일괄 경로 (전체를 embed_texts(batch_size=64) 한 번)
+- token     : embed_corpus (전체를 토큰 길이순으로 묶고 EMBED_TOKEN_BUDGET으로 배치 크기 결정)
+- 모드별 docs/sec, 패딩 효율(실제 토큰 / 패딩 포함 토큰), 결과 벡터가 fixed-64와 같은지 출력
+- 기본은 실제 SBERT 모델, --random-minilm 이면 같은 구조(6층, 384차원)의 무작위 가중치 BERT로 대체
+  (모델을 받을 수 없는 환경용: 글자 단위 토큰화, SentenceTransformer.encode처럼 호출 안에서 글자 수로 정렬 후 배치)
+
+실행: python -m bench.bench_embed_buckets --docs 2000
+      python -m bench.bench_embed_buckets --random-minilm --docs 2000 --budgets 8192,16384
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import api.embedding.vectorizer as vectorizer
+
+
+def _corpus(n: int, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed)
+    short = rng.random(n) < 0.3
+    sizes = np.where(short, rng.integers(20, 80, n), rng.lognormal(np.log(600), 1.0, n)).clip(20, 8000).astype(int)
+    syllables = np.array([chr(c) for c in range(0xAC00, 0xAC00 + 400)])
+    texts = []
+    for size in sizes:
+        chars = rng.choice(syllables, size)
+        chars[rng.random(size) < 0.25] = " "
+        texts.append("".join(chars).strip() or "공고")
+    return texts
+
+
+class _RandomMiniLM:
+    """all-MiniLM-L6-v2와 같은 구조의 무작위 가중치 인코더 (패딩 포함 토큰 수 기록)"""
+
+    def __init__(self, max_len: int = 256):
+        import torch
+        from transformers import BertConfig, BertModel
+
+        torch.manual_seed(0)
+        cfg = BertConfig(vocab_size=30522, hidden_size=384, num_hidden_layers=6, num_attention_heads=12,
+                         intermediate_size=1536, max_position_embeddings=512)
+        self.torch = torch
+        self.model = BertModel(cfg).eval()
+        self.max_len = max_len
+        self.real = 0
+        self.padded = 0
+
+    def _ids(self, text: str) -> list[int]:
+        ids = [101] + [1000 + ord(c) % 29000 for c in text if not c.isspace()] + [102]
+        return ids[:self.max_len - 1] + [102] if len(ids) > self.max_len else ids
+
+    def count_tokens(self, texts: list[str]) -> np.ndarray:
+        return np.array([len(self._ids(t)) for t in texts], dtype=np.int64)
+
+    def encode(self, texts: list[str], batch_size: int = 64) -> np.ndarray:
+        torch = self.torch
+        order = np.argsort([-len(t) for t in texts], kind="stable")  # SentenceTransformer.encode와 같은 호출 내 정렬
+        out = np.empty((len(texts), 384), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            ids = [self._ids(texts[i]) for i in idx]
+            width = max(len(x) for x in ids)
+            self.real += sum(len(x) for x in ids)
+            self.padded += width * len(ids)
+            input_ids = torch.zeros((len(ids), width), dtype=torch.long)
+            mask = torch.zeros((len(ids), width), dtype=torch.long)
+            for row, x in enumerate(ids):
+                input_ids[row, :len(x)] = torch.tensor(x)
+                mask[row, :len(x)] = 1
+            with torch.inference_mode():
+                h = self.model(input_ids=input_ids, attention_mask=mask).last_hidden_state
+                m = mask.unsqueeze(-1).float()
+                v = (h * m).sum(1) / m.sum(1)
+            out[idx] = torch.nn.functional.normalize(v, dim=1).numpy()
+        return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=2000)
+    ap.add_argument("--budgets", default=str(vectorizer.EMBED_TOKEN_BUDGET), help="비교할 EMBED_TOKEN_BUDGET 목록")
+    ap.add_argument("--max-batch", type=int, default=vectorizer.EMBED_MAX_BATCH)
+    ap.add_argument("--random-minilm", action="store_true", help="모델 다운로드 없이 같은 구조의 무작위 BERT 사용")
+    args = ap.parse_args()
+
+    texts = _corpus(args.docs)
+    if args.random_minilm:
+        enc = _RandomMiniLM()
+        encode, count = enc.encode, enc.count_tokens
+    else:
+        enc = None
+        encode, count = vectorizer.embed_texts, vectorizer.count_tokens
+    encode(["warmup"])  # 모델 로드/첫 forward 비용 제외
+
+    lengths = count(texts)
+    print(f"docs={len(texts)} tokens: p50={np.median(lengths):.0f} p90={np.percentile(lengths, 90):.0f} "
+          f"max={lengths.max()} (문자 수 p50={np.median([len(t) for t in texts]):.0f})")
+
+    def chunked():
+        return np.concatenate([encode(texts[s:s + 512], batch_size=64) for s in range(0, len(texts), 512)])
+
+    modes = [("chunked-64", chunked), ("fixed-64", lambda: encode(texts, batch_size=64))]
+    for budget in (int(b) for b in args.budgets.split(",")):
+        modes.append((f"token {budget}", lambda budget=budget: vectorizer.embed_corpus(
+            texts, encode=encode, lengths=lengths, token_budget=budget, max_batch=args.max_batch)))
+
+    ref = None
+    for name, fn in modes:
+        if enc is not None:
+            enc.real = enc.padded = 0
+        t0 = time.perf_counter()
+        vecs = fn()
+        elapsed = time.perf_counter() - t0
+        if name == "fixed-64":
+            ref = vecs
+        diff = "" if ref is None else f" max|Δ| vs fixed-64={np.abs(vecs - ref).max():.1e}"
+        pad = "" if enc is None else f" 패딩 효율={enc.real / enc.padded:6.1%}"
+        print(f"[{name:>12}] {len(texts) / elapsed:8.1f} docs/s ({elapsed:6.2f}s){pad}{diff}")
+
+
+if __name__ == "__main__":
+    main()
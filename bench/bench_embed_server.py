@@ -0,0 +1,142 @@
+"""
+워커별 모델(local) vs 공유 임베딩 서버(server) 비교: 워커 W개 전체 메모리와 합계 QPS
+- 워커 프로세스 W개가 uvicorn 워커처럼 각자 클라이언트 스레드 C개로 쿼리 임베딩을 계속 요청
+  (워커 안에서는 /ai/similar처럼 QueryBatcher로 묶음, 요청마다 다른 쿼리)
+- local : 워커마다 모델 로드, 스레드는 vCPU // W개씩 (cpu_tuning과 같은 배분)
+- server: 모델은 embed_server 프로세스 하나 (스레드 vCPU개), 워커는 EMBED_SERVER_SOCKET으로 요청
+- 측정 끝에 모든 프로세스의 RSS 합과 PSS 합(공유 페이지를 나눠 계산) 출력
+- 기본은 실제 SBERT 모델, --random-minilm 이면 같은 구조의 무작위 가중치 BERT (bench.bench_embed_buckets)
+
+실행: python -m bench.bench_embed_server --workers 4 --clients 8 --seconds 10
+      python -m bench.bench_embed_server --random-minilm --workers 2
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+
+
+def _mem_mb(pid: int) -> tuple[float, float]:
+    # (RSS, PSS) MB
+    vals = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                vals[parts[0]] = int(parts[1]) / 1024
+    return vals["Rss:"], vals["Pss:"]
+
+
+def _threads(n: int) -> None:
+    import torch
+    torch.set_num_threads(max(1, n))
+
+
+def _encoder(random_minilm: bool):
+    if random_minilm:
+        from bench.bench_embed_buckets import _RandomMiniLM
+        enc = _RandomMiniLM()
+        return enc.encode, enc.count_tokens, 384
+    import api.embedding.vectorizer as vectorizer
+    return vectorizer.embed_texts, vectorizer.count_tokens, vectorizer.embedding_dimension()
+
+
+def _serve(socket_path: str, random_minilm: bool, threads: int) -> None:
+    _threads(threads)
+    from api.embedding.embed_server import EmbedServer
+    encode, count, dim = _encoder(random_minilm)
+    encode(["warmup"])
+    EmbedServer(socket_path, encode=encode, count=count, dim=dim).serve_forever()
+
+
+def _worker(wid: int, args, socket_path: str, ready, start, out) -> None:
+    import api.embedding.vectorizer as vectorizer
+    from api.core.query_batcher import QueryBatcher
+
+    if socket_path:
+        vectorizer.EMBED_SERVER_SOCKET = socket_path
+        encode = vectorizer.embed_texts
+    else:
+        _threads(args.vcpu // args.workers)
+        encode = _encoder(args.random_minilm)[0]
+    encode(["warmup"])
+    batcher = QueryBatcher(lambda items: list(encode(items)), max_batch=32, window_ms=0, max_queue=0, deadline_ms=0)
+    ready.put(os.getpid())
+    start.wait()
+
+    done = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def client(c: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            batcher.submit(f"워커 {wid} 클라이언트 {c} 창업 아이디어 {i} 기반 서비스")
+            i += 1
+        with lock:
+            done[0] += i
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put((done[0], _mem_mb(os.getpid())))
+    if socket_path:
+        vectorizer._remote().close()
+
+
+def run(args, mode: str) -> None:
+    ctx = mp.get_context("spawn")  # torch가 올라간 프로세스 fork 방지
+    tmp = tempfile.mkdtemp()
+    server = None
+    socket_path = ""
+    if mode == "server":
+        socket_path = os.path.join(tmp, "embed.sock")
+        server = ctx.Process(target=_serve, args=(socket_path, args.random_minilm, args.vcpu), daemon=True)
+        server.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.05)
+
+    ready, out, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(w, args, socket_path, ready, start, out)) for w in range(args.workers)]
+    for p in procs:
+        p.start()
+    for _ in procs:
+        ready.get()
+    server_mem = _mem_mb(server.pid) if server is not None else (0.0, 0.0)
+    t0 = time.perf_counter()
+    start.set()
+    results = [out.get() for _ in procs]
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+    if server is not None:
+        server_mem = max(server_mem, _mem_mb(server.pid))
+        server.terminate()
+        server.join()
+
+    total = sum(n for n, _ in results)
+    rss = sum(m[0] for _, m in results) + server_mem[0]
+    pss = sum(m[1] for _, m in results) + server_mem[1]
+    print(f"[{mode:>6}] workers={args.workers} clients/worker={args.clients} QPS={total / elapsed:8.1f} "
+          f"RSS 합={rss:7.0f}MB PSS 합={pss:7.0f}MB (서버 RSS {server_mem[0]:.0f}MB)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--clients", type=int, default=8, help="워커당 동시 요청 스레드 수")
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--vcpu", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--random-minilm", action="store_true")
+    args = ap.parse_args()
+    for mode in ("local", "server"):
+        run(args, mode)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+인코더 백엔드 비교: PyTorch fp32 vs ONNX Runtime fp32 vs ONNX 동적 양자화 int8
+- 백엔드별 모델 로드 시간, 단건 쿼리 지연(p50/p99), 색인용 대량 임베딩 처리량(docs/s, embed_corpus)
+- torch 결과와의 코사인 일치도(최소/평균)와 쿼리별 top-k 겹침 비율
+- 로드할 수 없는 백엔드(onnxruntime 미설치, 모델 파일 없음)는 이유만 출력하고 건너뜀
+
+실행: EMBED_MODEL_DIR=models/all-MiniLM-L6-v2 python -m bench.bench_encoders --docs 1000 --queries 200
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import api.embedding.vectorizer as vectorizer
+from bench.bench_embed_buckets import _corpus
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default=",".join(vectorizer.BACKENDS))
+    ap.add_argument("--docs", type=int, default=1000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    args = ap.parse_args()
+
+    docs = _corpus(args.docs)
+    queries = [t[:40] for t in _corpus(args.queries, seed=1)]  # 쿼리는 짧은 아이디어 문장 길이
+    ref = None
+    for backend in args.backends.split(","):
+        t0 = time.perf_counter()
+        try:
+            vectorizer.load_model(backend)
+        except Exception as e:
+            print(f"[{backend:>9}] 건너뜀: {type(e).__name__}: {e}")
+            continue
+        load = time.perf_counter() - t0
+        vectorizer.embed_texts(["warmup"], backend=backend)  # 첫 forward 비용 제외
+
+        lat = []
+        qv = []
+        for q in queries:
+            t0 = time.perf_counter()
+            qv.append(vectorizer.embed_texts([q], backend=backend)[0])
+            lat.append(time.perf_counter() - t0)
+        lat = np.asarray(lat) * 1000
+
+        encode = lambda texts, batch_size=64: vectorizer.embed_texts(texts, batch_size, backend=backend)
+        t0 = time.perf_counter()
+        dv = vectorizer.embed_corpus(docs, encode=encode)
+        rate = len(docs) / (time.perf_counter() - t0)
+
+        qv = np.stack(qv)
+        parity = ""
+        if ref is None:
+            ref = (qv, dv)
+        else:
+            cos = np.concatenate([np.sum(qv * ref[0], axis=1), np.sum(dv * ref[1], axis=1)])
+            want = np.argsort(-(ref[0] @ ref[1].T), axis=1)[:, :args.k]
+            got = np.argsort(-(qv @ dv.T), axis=1)[:, :args.k]
+            overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(want, got)])
+            parity = f" cos min={cos.min():.4f} mean={cos.mean():.4f} top{args.k} 겹침={overlap:.1%}"
+        print(f"[{backend:>9}] load={load:5.1f}s query p50={np.percentile(lat, 50):6.2f}ms "
+              f"p99={np.percentile(lat, 99):6.2f}ms corpus={rate:7.1f} docs/s{parity}")
+
+
+if __name__ == "__main__":
+    main()
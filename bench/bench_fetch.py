@@ -0,0 +1,56 @@
+"""
+K-Startup 수집 단계만 측정 (임베딩 없음): 고정 perPage vs 자동 perPage, 장애 주입 포함
+- 로컬 가짜 서버(bench.fake_kstartup)에 지연/오류율/동시 요청 상한을 걸고 수집 시간과 요청 수 비교
+- --marker-page: 증분 수집(after_external_ref)에서 순차 스캔 vs 투기적 병렬 스캔 비교
+
+실행: python -m bench.bench_fetch --total 5000 --latency 0.1 --error-rate 0.05 --max-in-flight 8
+      python -m bench.bench_fetch --marker-page 40 --per-page 10
+"""
+
+import argparse
+import asyncio
+import time
+
+import api.services.startup_fetch_service as sfs
+from bench.fake_kstartup import FakeKStartup
+
+
+def _run(args, num_rows, speculative=None):
+    with FakeKStartup(total=args.total, latency=args.latency, error_rate=args.error_rate,
+                      max_in_flight=args.max_in_flight, max_per_page=args.max_per_page) as server:
+        sfs.BASE_URL = server.url
+        marker = None
+        if args.marker_page:
+            marker = str(server.items[min(len(server.items) - 1, args.marker_page * (num_rows or 10))]["pbanc_sn"])
+        t0 = time.perf_counter()
+        dtos = asyncio.run(sfs.fetch_startup_supports_async(
+            num_rows=num_rows, hard_max_pages=10 ** 6, after_external_ref=marker, speculative=speculative))
+        wall = time.perf_counter() - t0
+        return len(dtos), wall, server.requests, server.errors, server.throttled
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--total", type=int, default=5000)
+    ap.add_argument("--latency", type=float, default=0.1)
+    ap.add_argument("--error-rate", type=float, default=0.05)
+    ap.add_argument("--max-in-flight", type=int, default=8, help="초과 동시 요청은 429 (0이면 없음)")
+    ap.add_argument("--max-per-page", type=int, default=0, help="서버 perPage 상한 (0이면 없음)")
+    ap.add_argument("--marker-page", type=int, default=0, help="마커가 있는 페이지 (0이면 전체 수집)")
+    ap.add_argument("--per-page", type=int, default=10, help="--marker-page 비교 때 페이지 크기")
+    args = ap.parse_args()
+
+    print(f"total={args.total} latency={args.latency}s error_rate={args.error_rate} "
+          f"max_in_flight={args.max_in_flight} max_per_page={args.max_per_page}")
+    if args.marker_page:
+        runs = (("sequential", args.per_page, False), ("speculative", args.per_page, True))
+    else:
+        runs = (("perPage=10", 10, None), ("perPage=auto", None, None))
+    for label, num_rows, speculative in runs:
+        n, wall, reqs, errors, throttled = _run(args, num_rows, speculative)
+        print(f"{label:>13}: dtos={n:>6} wall={wall:6.2f}s requests={reqs:>5} "
+              f"injected_errors={errors:>4} throttled={throttled:>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+인덱스 종류별 recall@k / 검색 지연(p50, p99) 벤치마크
+- 합성 384차원 벡터 (가우시안 클러스터 혼합 → 실제 문장 임베딩처럼 뭉쳐 있는 분포)
+- 정답은 flat(정확 검색) 결과, 각 인덱스는 IndexConfig로 생성해 FaissStore에 넣고 검색
+- 지연은 단건 쿼리(/ai/similar 경로와 동일) 기준
+
+실행: python -m bench.bench_index_types --sizes 10000,100000,1000000 --types flat,ivf_flat,ivf_pq,hnsw
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig, build_index
+
+DIM = 384
+
+
+def clustered_vectors(n: int, dim: int, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((n_clusters, dim)).astype("float32")
+    assign = rng.integers(0, n_clusters, size=n)
+    vecs = centers[assign] + 0.6 * rng.standard_normal((n, dim)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs
+
+
+def build_store(cfg: IndexConfig, vecs: np.ndarray) -> tuple[FaissStore, float]:
+    # 학습이 필요한 인덱스는 전체 벡터로 한 번에 학습 후 추가
+    store = FaissStore(index_path="", dim=vecs.shape[1], config=cfg)
+    t0 = time.perf_counter()
+    store.index = build_index(cfg, vecs.shape[1], train_vecs=vecs)
+    store.index.add_with_ids(vecs, np.arange(vecs.shape[0], dtype=np.int64))
+    return store, time.perf_counter() - t0
+
+
+def timed_search(store: FaissStore, queries: np.ndarray, k: int) -> tuple[list[set], list[float]]:
+    found, lat = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = store.search_one(q, top_k=k)
+        lat.append((time.perf_counter() - t0) * 1000)
+        found.append({h["ref"] for h in hits})
+    return found, lat
+
+
+def run(n: int, types: list[str], args) -> None:
+    rng = np.random.default_rng(n)
+    corpus = clustered_vectors(n, DIM, n_clusters=max(16, n // 500), rng=rng)
+    queries = corpus[rng.integers(0, n, size=args.queries)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact, _ = build_store(IndexConfig(index_type="flat"), corpus)
+    truth, _ = timed_search(exact, queries, args.k)
+    del exact
+
+    for t in types:
+        cfg = IndexConfig(index_type=t, exact_threshold=0, nprobe=args.nprobe, ef_search=args.ef_search)
+        store, build_s = build_store(cfg, corpus)
+        found, lat = timed_search(store, queries, args.k)
+        recall = np.mean([len(f & g) / max(1, len(g)) for f, g in zip(found, truth)])
+        print(f"n={n:>8} type={t:>8} recall@{args.k}={recall:.3f} "
+              f"p50={np.percentile(lat, 50):.2f}ms p99={np.percentile(lat, 99):.2f}ms build={build_s:.1f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--types", default="flat,ivf_flat,ivf_pq,hnsw")
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--nprobe", type=int, default=16)
+    ap.add_argument("--ef-search", type=int, default=64)
+    args = ap.parse_args()
+
+    types = [t.strip() for t in args.types.split(",") if t.strip()]
+    for n in (int(s) for s in args.sizes.split(",")):
+        run(n, types, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+수집 → 변환 → 임베딩 → 색인: 일괄 처리 vs 스트리밍 파이프라인 비교 벤치마크
+- 로컬 가짜 K-Startup 서버(bench.fake_kstartup)에서 전체 수집(after_external_ref 없음)
+- batch: 원본 페이지를 전부 모은 뒤 변환 → 전체 임베딩 → 인덱스 반영 (이전 방식)
+- stream: 수집 중에 변환/임베딩을 겹쳐 실행, INGEST_FLUSH_ROWS개마다 인덱스 반영
+- 모드마다 새 프로세스에서 실행해 벽시계 시간과 최대 RSS(ru_maxrss)를 따로 측정
+  (모델 로드 후 RSS를 기준값으로 같이 출력)
+
+실행: python -m bench.bench_ingest_pipeline --total 3000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # linux: KB
+
+
+def _child(args) -> None:
+    os.environ["INDEX_PATH"] = os.path.join(args.workdir, "supports.faiss")
+    import api.embedding.vectorizer as vectorizer
+    if args.model:
+        vectorizer.MODEL_NAME = args.model
+    import api.services.startup_fetch_service as sfs
+    from api.services.ingest_jobs import IngestJobRunner
+    from api.services.vectorize_hook import vectorize_and_upsert_from_dtos
+    from bench.fake_kstartup import FakeKStartup
+
+    vectorizer.embed_texts(["warmup"])  # 모델 로드/첫 forward 비용 제외
+    base_rss = _rss_mb()
+
+    async def run_batch():
+        # 이전 방식: 원본 전부 모으기 → 변환 → 임베딩/색인
+        raw = []
+
+        async def emit(items):
+            raw.extend(items)
+
+        import httpx
+        from api.services.fetch_control import FetchController
+        async with httpx.AsyncClient() as client:
+            await sfs._crawl_pages(client, FetchController(initial_concurrency=args.concurrency), emit,
+                                   after_external_ref=None, num_rows=args.per_page or None,
+                                   max_empty_batches=2, hard_max_pages=10 ** 6)
+        dtos = [sfs.to_create_startup_response(it) for it in raw]
+        await asyncio.to_thread(vectorize_and_upsert_from_dtos, dtos)
+        return len(dtos)
+
+    async def run_stream():
+        runner = IngestJobRunner()
+        stream = runner.open_stream()
+        try:
+            dtos = await sfs.fetch_startup_supports_async(
+                num_rows=args.per_page or None, batch_concurrency=args.concurrency,
+                hard_max_pages=10 ** 6, on_batch=stream.feed)
+        finally:
+            await stream.close()
+        await asyncio.to_thread(runner.shutdown, True)  # 남은 임베딩/반영까지 대기
+        assert stream.job.status == "succeeded", stream.job.error
+        return len(dtos)
+
+    with FakeKStartup(total=args.total, latency=args.latency) as server:
+        sfs.BASE_URL = server.url
+        t0 = time.perf_counter()
+        n = asyncio.run(run_batch() if args.mode == "batch" else run_stream())
+        wall = time.perf_counter() - t0
+
+    print(json.dumps({"mode": args.mode, "dtos": n, "wall_s": round(wall, 2),
+                      "base_rss_mb": round(base_rss, 1), "peak_rss_mb": round(_rss_mb(), 1)}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--total", type=int, default=3000, help="가짜 서버 공고 수")
+    ap.add_argument("--latency", type=float, default=0.05, help="요청당 지연(초)")
+    ap.add_argument("--per-page", type=int, default=0, help="0이면 자동 (PAGE_SIZE_MAX부터)")
+    ap.add_argument("--concurrency", type=int, default=5)
+    ap.add_argument("--model", default="", help="임베딩 모델 이름/경로 (기본: 서비스 설정)")
+    ap.add_argument("--mode", choices=["batch", "stream"], help="(내부) 자식 프로세스 모드")
+    ap.add_argument("--workdir", help="(내부) 인덱스 저장 경로")
+    args = ap.parse_args()
+
+    if args.mode:
+        _child(args)
+        return
+
+    print(f"total={args.total} latency={args.latency}s per_page={args.per_page} concurrency={args.concurrency}")
+    for mode in ("batch", "stream"):
+        with tempfile.TemporaryDirectory() as workdir:
+            cmd = [sys.executable, "-m", "bench.bench_ingest_pipeline", "--mode", mode, "--workdir", workdir,
+                   "--total", str(args.total), "--latency", str(args.latency),
+                   "--per-page", str(args.per_page), "--concurrency", str(args.concurrency)]
+            if args.model:
+                cmd += ["--model", args.model]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(f"{r['mode']:>6}: dtos={r['dtos']:>6} wall={r['wall_s']:>7.2f}s "
+                  f"rss(after model)={r['base_rss_mb']:.0f}MB peak={r['peak_rss_mb']:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+저장 방식 비교: 저장마다 전체 기록 vs 기준 세그먼트 + 델타 세그먼트
+- 코퍼스 N개(기본 100k, 384차원)를 저장해 둔 뒤, 배치 업서트/삭제 후 save 한 번에 새로 쓴 바이트와 시간 측정
+- SEGMENT_DELTAS 끔/켬 비교, 델타를 쌓은 상태의 검색 지연/로드 시간과 합치기(fold) 시간도 출력
+
+실행: python -m bench.bench_segments --n 100000 --batch 100 --reps 10
+      python -m bench.bench_segments --index-types hnsw --n 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import api.embedding.faiss_store as faiss_store
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+
+
+def _vecs(n: int, dim: int, seed: int) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _written(d: str, before: set) -> int:
+    # save 한 번에 새로 생긴 파일 크기 합 (manifest 포함)
+    return sum(os.path.getsize(os.path.join(d, n)) for n in os.listdir(d)
+               if n not in before or n.endswith(".manifest.json"))
+
+
+def run(args, index_type: str, segments: bool) -> None:
+    faiss_store.SEGMENT_DELTAS = segments
+    cfg = IndexConfig(index_type=index_type, exact_threshold=1, hnsw_m=32, ef_search=64)
+    with tempfile.TemporaryDirectory() as d:
+        path = f"{d}/s.faiss"
+        store = FaissStore(index_path=path, dim=args.dim, config=cfg)
+        store.load()
+        refs = [str(1_000_000 + i) for i in range(args.n)]
+        store.add_with_external_ids(_vecs(args.n, args.dim, 0), refs)
+        store.save()
+
+        rng = np.random.default_rng(1)
+        sizes, times = [], []
+        for rep in range(args.reps):
+            batch = [refs[i] for i in rng.choice(args.n, args.batch, replace=False)]
+            store.upsert_with_external_ids(_vecs(args.batch, args.dim, 10 + rep), batch)
+            store.remove_by_external_ids([refs[i] for i in rng.choice(args.n, args.batch // 10, replace=False)])
+            before = set(os.listdir(d))
+            t0 = time.perf_counter()
+            store.save()
+            times.append(time.perf_counter() - t0)
+            sizes.append(_written(d, before))
+
+        q = _vecs(args.queries, args.dim, 99)
+        t0 = time.perf_counter()
+        store.search(q, top_k=30)
+        search = (time.perf_counter() - t0) / args.queries
+        t0 = time.perf_counter()
+        FaissStore(index_path=path, dim=args.dim, config=cfg).load()
+        load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.compact(purge=False)
+        store.save()
+        fold = time.perf_counter() - t0
+
+    mode = "segments" if segments else "full"
+    print(f"[{index_type:>4} {mode:>8}] save x{args.reps} (업서트 {args.batch} + 삭제 {args.batch // 10}):"
+          f" p50={np.median(times) * 1000:8.2f}ms, {np.median(sizes) / 1024:10.1f}KiB/회")
+    print(f"    search/query {search * 1000:.2f}ms, load {load * 1000:.1f}ms, fold+save {fold * 1000:.1f}ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--batch", type=int, default=100, help="저장 1회당 업서트 수 (삭제는 1/10)")
+    ap.add_argument("--reps", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--index-types", default="flat")
+    args = ap.parse_args()
+
+    for index_type in args.index_types.split(","):
+        for segments in (False, True):
+            run(args, index_type, segments)
+
+
+if __name__ == "__main__":
+    main()
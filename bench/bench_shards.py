@@ -0,0 +1,97 @@
+"""
+샤드 수별 검색 지연: 단일 FaissStore vs ShardedFaissStore (샤드 동시 검색 + 힙 병합)
+- 코퍼스 N개(기본 200k, 384차원)를 샤드 수마다 새로 만들고 같은 쿼리로 측정
+- 쿼리 1건(/ai/similar 한 요청)과 배치(QueryBatcher가 묶은 여러 건) 지연의 p50/p95, 필터 포함 검색도 같이 출력
+- 샤드 1개 = 기존 단일 인덱스, 결과가 단일 인덱스와 같은지(상위 k ID 일치율)도 확인
+- 샤드 검색 스레드 수는 INDEX_SHARD_THREADS (기본 min(샤드 수, vCPU)) → vCPU가 적으면 이득이 작음
+
+실행: python -m bench.bench_shards --n 200000 --shards 1,2,4,8
+      python -m bench.bench_shards --index-type hnsw --n 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+from api.embedding.metadata import SearchFilter
+from api.embedding.sharded_store import ShardedFaissStore
+
+REGIONS = ["서울", "경기", "부산", "대구", "광주", "전국"]
+
+
+def _vecs(n: int, dim: int, seed: int) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _rows(n: int):
+    end = (date(2099, 1, 1) - date(1970, 1, 1)).days
+    return [(REGIONS[i % len(REGIONS)], 0, 200, i % 3 != 0, end - 365 * (i % 5)) for i in range(n)]
+
+
+def _timed(fn, reps: int):
+    fn()
+    lat = []
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(lat, 50), np.percentile(lat, 95)
+
+
+def _build(path: str, shards: int, args, vecs, refs, rows):
+    cfg = IndexConfig(index_type=args.index_type, exact_threshold=1, hnsw_m=32, ef_search=64, nprobe=16)
+    if shards <= 1:
+        store = FaissStore(index_path=path, dim=args.dim, config=cfg)
+    else:
+        store = ShardedFaissStore(index_path=path, dim=args.dim, shards=shards, shard_by=args.shard_by, config=cfg)
+    store.load()
+    store.upsert_with_external_ids(vecs, refs, metadata=rows)
+    return store
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--shards", default="1,2,4,8")
+    ap.add_argument("--shard-by", default="hash", choices=["hash", "region", "year"])
+    ap.add_argument("--index-type", default="flat")
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--batch", type=int, default=16, help="배치 검색 쿼리 수")
+    ap.add_argument("--reps", type=int, default=50)
+    args = ap.parse_args()
+
+    vecs = _vecs(args.n, args.dim, 0)
+    refs = [str(1_000_000 + i) for i in range(args.n)]
+    rows = _rows(args.n)
+    q = _vecs(args.batch, args.dim, 99)
+    flt = SearchFilter(region="부산", recruiting_only=True)
+    print(f"n={args.n} dim={args.dim} index={args.index_type} shard_by={args.shard_by} "
+          f"k={args.k} vcpu={os.cpu_count()}")
+    print(f"{'shards':>6} {'1건 p50':>9} {'1건 p95':>9} {f'{args.batch}건 p50':>10} {'필터 p50':>9} {'일치율':>7}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as d:
+        for n_shards in (int(s) for s in args.shards.split(",")):
+            store = _build(f"{d}/s{n_shards}.faiss", n_shards, args, vecs, refs, rows)
+            one = _timed(lambda: store.search_one(q[0], top_k=args.k), args.reps)
+            batch = _timed(lambda: store.search(q, top_k=args.k), args.reps)
+            filtered = _timed(lambda: store.search_one(q[0], top_k=args.k, flt=flt), args.reps)
+            ids = [[r["ref"] for r in row] for row in store.search(q, top_k=args.k)]
+            if baseline is None:
+                baseline = ids
+            overlap = np.mean([len(set(a) & set(b)) / max(1, len(b)) for a, b in zip(ids, baseline)])
+            print(f"{n_shards:>6} {one[0]:>7.2f}ms {one[1]:>7.2f}ms {batch[0]:>8.2f}ms "
+                  f"{filtered[0]:>7.2f}ms {overlap:>7.3f}")
+            del store
+
+
+if __name__ == "__main__":
+    main()
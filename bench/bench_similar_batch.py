@@ -0,0 +1,74 @@
+"""
+/ai/similar 단건 경로 vs /ai/similar/batch 배치 경로 처리량 비교 벤치마크
+- 합성 코퍼스(랜덤 정규화 벡터)로 FaissStore를 만들어 서비스 계층을 직접 호출
+- 인코딩은 실제 SBERT 모델 사용 (모델 로드 시간은 측정에서 제외)
+
+실행: python -m bench.bench_similar_batch --corpus 20000 --ideas 32 --k 30
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import api.services.recommend_service as sr
+from api.dto.recommended_dto import StartupRequestDTO
+from api.embedding.faiss_store import FaissStore
+from api.embedding.vectorizer import embed_texts, embedding_dimension
+
+
+def _synthetic_store(n: int, dim: int, seed: int = 0) -> FaissStore:
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    store = FaissStore(index_path="", dim=dim)
+    store.clear()
+    store.add_with_external_ids(vecs, [str(100000 + i) for i in range(n)])
+    return store
+
+
+def _ideas(n: int) -> list[StartupRequestDTO]:
+    topics = ["핀테크 해외진출", "AI 푸드 분류", "스마트 주차", "리테일 동선 분석", "친환경 포장재", "시니어 헬스케어"]
+    return [
+        StartupRequestDTO(
+            idea_title=f"{topics[i % len(topics)]} {i}",
+            idea_description=f"{topics[(i + 1) % len(topics)]} 기반 서비스 플랫폼 개발 아이디어 {i}",
+        )
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--corpus", type=int, default=20000)
+    ap.add_argument("--ideas", type=int, default=32)
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    dim = embedding_dimension()
+    store = _synthetic_store(args.corpus, dim)
+    sr.get_store = lambda: store  # 서비스가 합성 인덱스를 보도록
+    ideas = _ideas(args.ideas)
+    embed_texts(["warmup"])  # 첫 forward 비용 제외
+
+    def run_single():
+        for req in ideas:
+            sr.similar_top_k(req, k=args.k)
+
+    def run_batch():
+        sr.similar_top_k_batch(ideas, k=args.k)
+
+    for name, fn in (("single", run_single), ("batch", run_batch)):
+        times = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+        best = min(times)
+        print(f"{name:>6}: ideas={args.ideas} best={best * 1000:.1f}ms "
+              f"median={np.median(times) * 1000:.1f}ms throughput={args.ideas / best:.1f} ideas/s")
+
+
+if __name__ == "__main__":
+    main()
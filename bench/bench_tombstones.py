@@ -0,0 +1,93 @@
+"""
+삭제 방식 비교: remove_ids(벡터 배열 이동) vs tombstone 표시
+- 코퍼스 N개(기본 100k, 384차원)를 넣은 FaissStore에서 배치 업서트(같은 ID 재추가)/삭제 지연 측정
+- 인덱스 구조별(flat=IDMap2,Flat / hnsw=IDMap2,HNSW)로 TOMBSTONE_DELETES 끔/켬 비교
+  (HNSW는 remove_ids를 지원하지 않아 끔 모드에서는 삭제 때마다 재구성)
+- 표시가 쌓인 상태의 검색 지연과 압축(compact) 시간도 같이 출력
+
+실행: python -m bench.bench_tombstones --index-types flat --n 100000 --batch 100 --reps 10
+      python -m bench.bench_tombstones --index-types hnsw --n 20000 --reps 3  (끔 모드는 매번 재구성이라 느림)
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+import api.embedding.faiss_store as faiss_store
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+
+
+def _vecs(n: int, dim: int, seed: int) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _ms(samples) -> str:
+    return f"p50={np.median(samples) * 1000:8.2f}ms max={max(samples) * 1000:8.2f}ms"
+
+
+def run(args, index_type: str, tombstones: bool) -> None:
+    faiss_store.TOMBSTONE_DELETES = tombstones
+    cfg = IndexConfig(index_type=index_type, exact_threshold=1, hnsw_m=32, ef_search=64)
+    with tempfile.TemporaryDirectory() as d:
+        store = FaissStore(index_path=f"{d}/s.faiss", dim=args.dim, config=cfg)
+        store.load()
+        refs = [str(1_000_000 + i) for i in range(args.n)]
+        t0 = time.perf_counter()
+        store.add_with_external_ids(_vecs(args.n, args.dim, 0), refs)
+        build = time.perf_counter() - t0
+
+        rng = np.random.default_rng(1)
+        upserts, deletes = [], []
+        for rep in range(args.reps):
+            batch = [refs[i] for i in rng.choice(args.n, args.batch, replace=False)]
+            t0 = time.perf_counter()
+            store.upsert_with_external_ids(_vecs(args.batch, args.dim, 10 + rep), batch)
+            upserts.append(time.perf_counter() - t0)
+        gone = set()
+        for rep in range(args.reps):
+            batch = [refs[i] for i in rng.choice(args.n, args.batch, replace=False) if refs[i] not in gone]
+            gone.update(batch)
+            t0 = time.perf_counter()
+            store.remove_by_external_ids(batch)
+            deletes.append(time.perf_counter() - t0)
+
+        q = _vecs(args.queries, args.dim, 99)
+        t0 = time.perf_counter()
+        store.search(q, top_k=30)
+        search = (time.perf_counter() - t0) / args.queries
+
+        t0 = time.perf_counter()
+        dropped = store.compact()
+        compact = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        store.search(q, top_k=30)
+        search_after = (time.perf_counter() - t0) / args.queries
+
+    mode = "tombstone" if tombstones else "remove_ids"
+    print(f"[{index_type:>4} {mode:>10}] build={build:6.1f}s ntotal={store.ntotal}")
+    print(f"    upsert x{args.batch}: {_ms(upserts)}")
+    print(f"    delete x{args.batch}: {_ms(deletes)}")
+    print(f"    search/query: {search * 1000:.2f}ms (표시 {dropped}건) → 압축 {compact:.2f}s 후 {search_after * 1000:.2f}ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--batch", type=int, default=100, help="업서트/삭제 한 번에 바뀌는 ID 수")
+    ap.add_argument("--reps", type=int, default=10)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--index-types", default="flat,hnsw")
+    args = ap.parse_args()
+
+    for index_type in args.index_types.split(","):
+        for tombstones in (False, True):
+            run(args, index_type, tombstones)
+
+
+if __name__ == "__main__":
+    main()
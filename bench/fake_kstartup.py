@@ -0,0 +1,136 @@
+"""
+로컬 가짜 K-Startup 공고 API (벤치마크/부하 실험용)
+- 실제 API와 같은 파라미터(page, perPage, returnType)와 응답 형태({"data": [...], "totalCount": N})
+- 공고는 pbanc_sn 내림차순(최신 먼저), 본문 길이는 실제 공고와 비슷하게 수백~수천 자
+- latency: 요청당 지연(초), 별도 스레드 HTTP 서버라 비동기 클라이언트 동시 요청을 그대로 받음
+- 장애 주입: error_rate(무작위 500/503), max_in_flight(초과 동시 요청은 429 + Retry-After),
+  fail_pages(페이지별로 처음 N번 503), max_per_page(perPage 상한, 넘으면 잘라서 응답)
+
+사용:
+    with FakeKStartup(total=5000, latency=0.05) as server:
+        sfs.BASE_URL = server.url
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+_WORDS = ["창업", "지원", "사업화", "글로벌", "투자", "멘토링", "시제품", "기술", "스타트업", "교육",
+          "판로", "마케팅", "인공지능", "바이오", "친환경", "콘텐츠", "제조", "플랫폼", "청년", "지역"]
+
+
+def make_items(total: int, first_sn: int = 170000, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(total):
+        sn = first_sn + total - i  # 최신 먼저
+        body = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(80, 600)))
+        items.append({
+            "pbanc_sn": sn,
+            "biz_pbanc_nm": f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} 지원사업 공고 {sn}",
+            "pbanc_ctnt": body,
+            "supt_biz_clsfc": rng.choice(["사업화", "기술개발", "멘토링ㆍ컨설팅", "시설ㆍ공간"]),
+            "supt_regin": rng.choice(["서울", "경기", "부산", "전국"]),
+            "sprv_inst": rng.choice(["공공기관", "지자체", "민간"]) if i % 7 == 0 else "공공기관",
+            "pbanc_rcpt_bgng_dt": "20250101",
+            "pbanc_rcpt_end_dt": "20301231",
+            "rcrt_prgs_yn": "Y",
+        })
+    return items
+
+
+class FakeKStartup:
+    def __init__(self, total: int = 2000, latency: float = 0.05, seed: int = 0, error_rate: float = 0.0,
+                 max_in_flight: int = 0, fail_pages: Dict[int, int] | None = None, max_per_page: int = 0):
+        self.items = make_items(total, seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.max_in_flight = max_in_flight
+        self.fail_pages = dict(fail_pages or {})
+        self.max_per_page = max_per_page
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/getAnnouncementInformation"
+
+    def page(self, page: int, per_page: int) -> Dict[str, Any]:
+        if self.max_per_page:
+            per_page = min(per_page, self.max_per_page)
+        start = (page - 1) * per_page
+        data = self.items[start:start + per_page] if page >= 1 else []
+        return {"page": page, "perPage": per_page, "totalCount": len(self.items),
+                "currentCount": len(data), "data": data}
+
+    def respond(self, handler: BaseHTTPRequestHandler, page: int, per_page: int) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            throttled = self.max_in_flight and self.in_flight > self.max_in_flight
+            injected = self.fail_pages.get(page, 0) > 0 or self._rng.random() < self.error_rate
+            if self.fail_pages.get(page, 0) > 0:
+                self.fail_pages[page] -= 1
+            if throttled:
+                self.throttled += 1
+            elif injected:
+                self.errors += 1
+        try:
+            time.sleep(self.latency)
+            if throttled:
+                self.send_json(handler, 429, {"error": "too many requests"}, {"Retry-After": "0"})
+            elif injected:
+                self.send_json(handler, self._rng.choice([500, 503]), {"error": "injected"})
+            else:
+                self.send_json(handler, 200, self.page(page, per_page))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    @staticmethod
+    def send_json(handler: BaseHTTPRequestHandler, status: int, body: Dict[str, Any],
+                  headers: Dict[str, str] | None = None) -> None:
+        raw = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json;charset=UTF-8")
+        handler.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            handler.send_header(k, v)
+        handler.end_headers()
+        handler.wfile.write(raw)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                q = parse_qs(urlparse(self.path).query)
+                with fake._lock:
+                    fake.requests += 1
+                fake.respond(self, int(q.get("page", ["1"])[0]), int(q.get("perPage", ["10"])[0]))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> "FakeKStartup":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,121 @@
+"""
+/ai/similar 동시 요청 부하 테스트: 요청별 단건 처리 vs 묶음 처리(QueryBatcher)
+- FastAPI 스레드풀처럼 클라이언트 스레드 C개가 similar_top_k를 동시에 계속 호출 (요청마다 다른 쿼리 → 캐시 적중 없음)
+- 모드별 QPS / p50 / p99 지연과 평균 묶음 크기, 과부하로 거절된(429/503) 요청 수 출력
+  (--queue-max / --deadline-ms로 INFERENCE_QUEUE_MAX / INFERENCE_DEADLINE_MS 조정, 성공한 요청만 지연에 포함)
+- 기본은 실제 SBERT 모델, --fake-encode-ms "고정,건당" 을 주면 인코더 대신 그만큼 CPU를 점유하는 가짜 인코더
+  (가짜 인코더는 전역 락으로 직렬화 → 동시 인코딩이 코어를 나눠 쓰는 상황 흉내)
+
+실행: python -m bench.load_similar --clients 16 --seconds 10
+      python -m bench.load_similar --fake-encode-ms 8,0.5 --clients 32
+      python -m bench.load_similar --fake-encode-ms 8,0.5 --clients 128 --queue-max 32 --deadline-ms 100
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import api.services.recommend_service as sr
+from api.dto.recommended_dto import StartupRequestDTO
+from api.embedding.faiss_store import FaissStore
+from api.core.query_batcher import Overloaded, QueryBatcher
+
+
+def _synthetic_store(n: int, dim: int) -> FaissStore:
+    vecs = np.random.default_rng(0).standard_normal((n, dim)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    store = FaissStore(index_path="", dim=dim)
+    store.clear()
+    store.add_with_external_ids(vecs, [str(100000 + i) for i in range(n)])
+    return store
+
+
+def _fake_encoder(spec: str, dim: int):
+    base_ms, per_ms = (float(x) for x in spec.split(","))
+    cpu = threading.Lock()
+
+    def encode(texts, batch_size=64):
+        with cpu:
+            time.sleep((base_ms + per_ms * len(texts)) / 1000.0)
+        v = np.random.default_rng(len(texts)).standard_normal((len(texts), dim)).astype("float32")
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+    return encode
+
+
+def run(args, mode: str, window_ms: float) -> None:
+    sr.SIMILAR_BATCHING = mode != "single"
+    sr._batcher = QueryBatcher(sr._search_coalesced, max_batch=args.max_batch, window_ms=window_ms,
+                               max_queue=args.queue_max, deadline_ms=args.deadline_ms)
+    label = mode if mode == "single" else f"{mode} window={window_ms:g}ms"  # 모드마다 다른 쿼리 (임베딩 캐시 적중 방지)
+    counter = iter(range(10 ** 9))
+    lock = threading.Lock()
+    latencies = []
+    rejected = {429: 0, 503: 0}
+    deadline = time.perf_counter() + args.seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(counter)
+            req = StartupRequestDTO(idea_title=f"{label} 아이디어 {i}", idea_description=f"설명 {i} 기반 서비스")
+            t0 = time.perf_counter()
+            try:
+                sr.similar_top_k(req, k=args.k)
+            except Overloaded as e:
+                with lock:
+                    rejected[e.status_code] += 1
+                time.sleep(args.backoff_ms / 1000.0)  # Retry-After 대신 짧게 쉬고 재시도
+                continue
+            dt = time.perf_counter() - t0
+            with lock:
+                latencies.append(dt)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        for _ in range(args.clients):
+            pool.submit(client)
+    elapsed = time.perf_counter() - t0
+
+    lat = np.asarray(latencies) * 1000
+    stats = sr.inference_stats() if sr.SIMILAR_BATCHING else {"avg_batch": 1.0}
+    print(f"[{label:>22}] clients={args.clients} QPS={len(lat) / elapsed:8.1f} "
+          f"p50={np.percentile(lat, 50):7.1f}ms p99={np.percentile(lat, 99):7.1f}ms avg_batch={stats['avg_batch']} "
+          f"429={rejected[429]} 503={rejected[503]}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--corpus", type=int, default=20000)
+    ap.add_argument("--k", type=int, default=30)
+    ap.add_argument("--max-batch", type=int, default=32)
+    ap.add_argument("--windows", default="0,2", help="묶음 모드에서 비교할 SIMILAR_BATCH_WINDOW_MS 목록")
+    ap.add_argument("--queue-max", type=int, default=0, help="묶음 모드 대기열 상한 (0이면 제한 없음)")
+    ap.add_argument("--deadline-ms", type=float, default=0, help="묶음 모드 대기 기한 (0이면 없음)")
+    ap.add_argument("--backoff-ms", type=float, default=20, help="거절된 클라이언트가 다시 보내기 전 대기")
+    ap.add_argument("--fake-encode-ms", default="", help='가짜 인코더 비용 "고정,건당" (ms)')
+    args = ap.parse_args()
+
+    sr._result_cache = sr.ResultCache(max_entries=0)
+    if args.fake_encode_ms:
+        dim = 384
+        sr.embed_texts = _fake_encoder(args.fake_encode_ms, dim)
+    else:
+        from api.embedding.vectorizer import embed_texts, embedding_dimension
+        dim = embedding_dimension()
+        embed_texts(["warmup"])  # 첫 forward 비용 제외
+    store = _synthetic_store(args.corpus, dim)
+    sr.get_store = lambda: store
+
+    run(args, "single", 0)
+    for window in (float(w) for w in args.windows.split(",")):
+        run(args, "batched", window)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 # main.py
 import os 
 import logging
-from api.core.cpu_tuning import apply_cpu_tuning
+from api.core.cpu_tuning import apply_cpu_tuning, apply_runtime_threads
 apply_cpu_tuning(default_workers=int(os.getenv("APP_WORKERS", "1"))) # 스레드 관리
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from api.routers.startup_router import router as startup_router
-from api.embedding.index_singleton import get_store
+from api.services.ingest_jobs import get_ingest_runner
+from api.services.expiry_sweeper import get_expiry_sweeper
+from api.services.warmup import get_warmup
 
 # ---- 로깅 설정  ----
 logger = logging.getLogger("startup_service")
@@ -25,9 +28,25 @@ app.include_router(startup_router)
 # 앱 시작 시
 @app.on_event("startup")
 async def _warmup():
-    get_store()  # 인덱스 1회 로드 (싱글톤 초기화)
+    apply_runtime_threads()  # import된 faiss/torch에 스레드 수 직접 반영
+    get_warmup().start()  # 인덱스 로드(모델 없이) → 모델 로드 + 인코딩/검색 워밍업 (백그라운드, 끝나면 /ready 200)
+    get_expiry_sweeper().start()  # 마감 공고 주기 정리
 
-# 헬스 체크
+# 앱 종료 시 진행 중인 수집 job 마무리
+@app.on_event("shutdown")
+def _shutdown():
+    get_warmup().stop()
+    get_expiry_sweeper().stop()
+    get_ingest_runner().shutdown(wait=True)
+
+# 헬스 체크 (프로세스 생존 여부라 항상 200, 워밍업 진행 상태/재시도 횟수는 참고용)
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    warmup = get_warmup().state()
+    return {"status": "ok", "warmup": {"status": warmup["status"], "attempts": warmup["attempts"]}}
+
+# 준비 상태: 워밍업(인덱스 + 인코딩/검색)이 끝나야 200, 그 전/실패 시 503 (로드밸런서 readiness probe용)
+@app.get("/ready")
+async def ready():
+    warmup = get_warmup()
+    return JSONResponse(warmup.state(), status_code=200 if warmup.ready else 503)
@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import api.services.startup_fetch_service as sfs
+import api.services.vectorize_hook as vh
+from api.services import fetch_control
+from api.services.announcement_store import AnnouncementStore, rebuild_from_store
+from bench.fake_kstartup import FakeKStartup
+
+
+def _item(sn, title="공고", body="본문"):
+    return {"pbanc_sn": sn, "biz_pbanc_nm": title, "pbanc_ctnt": body}
+
+
+def test_record_classifies_new_changed_unchanged_and_persists(tmp_path):
+    path = str(tmp_path / "raw.sqlite3")
+    store = AnnouncementStore(path)
+    assert store.record([_item(1), _item(2)]) == ["new", "new"]
+    assert store.record([_item(1)]) == ["new"]  # 색인 확정 전이면 다시 신규
+    assert store.mark_indexed(["1", "2"]) == 2
+    assert store.record([_item(1), _item(2, body="수정")]) == ["unchanged", "changed"]
+    assert store.record([_item(2)]) == ["unchanged"]  # 색인된 내용으로 되돌아옴 → 보류 지문 비움
+    store.set_state(last_sync_at=123.0)
+    store.close()
+
+    reopened = AnnouncementStore(path)
+    assert reopened.count() == 2
+    assert reopened.state() == {"last_sync_at": 123.0}
+    assert [it["pbanc_sn"] for it in reopened.iter_items(batch=1)] == [2, 1]
+    assert reopened.remove(["1"]) == 1
+    assert reopened.count() == 1
+
+
+def _fetch(server, store, **kw):
+    sfs.BASE_URL = server.url
+    return asyncio.run(sfs.fetch_startup_supports_async(num_rows=10, raw_store=store, **kw))
+
+
+def test_second_sync_returns_only_deltas_and_stops_on_known_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_control, "FETCH_RATE", 0.0)
+    monkeypatch.setattr(sfs, "KNOWN_RUN_STOP", 30)
+    store = AnnouncementStore(str(tmp_path / "raw.sqlite3"))
+    with FakeKStartup(total=300, latency=0.0) as server:
+        first = _fetch(server, store, changed_only=True)
+        assert len(first) == store.count() > 0
+        store.mark_indexed([d.external_ref for d in first])  # 색인 job 성공
+        assert len(_fetch(server, store)) == len(first)  # 요청하지 않으면 응답은 예전처럼 전체
+
+        # 새 공고 2건 + 기존 공고 1건 수정
+        public = {"sprv_inst": "공공기관"}
+        server.items.insert(0, {**server.items[1], **public, "pbanc_sn": 999999, "biz_pbanc_nm": "새 공고 B"})
+        server.items.insert(0, {**server.items[1], **public, "pbanc_sn": 999998, "biz_pbanc_nm": "새 공고 A"})
+        changed_ref = str(server.items[5]["pbanc_sn"])
+        server.items[5] = {**server.items[5], **public, "pbanc_ctnt": "본문 수정"}
+        before = server.requests
+        second = _fetch(server, store, changed_only=True)
+        requests = server.requests - before
+
+    assert [d.external_ref for d in second] == ["999998", "999999", changed_ref]
+    assert requests < 31  # 연속 30건 미변경에서 멈춤 (전체 30페이지보다 적게)
+
+
+def test_rebuild_from_store_without_network(tmp_path, monkeypatch):
+    store = AnnouncementStore(str(tmp_path / "raw.sqlite3"))
+    store.record([_item(10, "A"), _item(11, "B"), {**_item(12, "C"), "sprv_inst": "민간"}])
+    got = []
+    monkeypatch.setattr(vh, "vectorize_and_upsert_from_dtos", lambda dtos: got.extend(dtos))
+    assert rebuild_from_store(store) == 2
+    assert [d.external_ref for d in got] == ["11", "10"]
+    assert store.record([_item(10, "A"), _item(11, "B")]) == ["unchanged", "unchanged"]
+
+
+def test_full_rebuild_keeps_serving_old_index_until_embedding_finishes(tmp_path, monkeypatch, make_manager):
+    mgr = make_manager(tmp_path / "supports.faiss")
+    with mgr.transaction() as index:
+        index.upsert_with_external_ids(np.ones((1, 16), dtype="float32"), ["7"])
+    monkeypatch.setattr(vh, "get_store_manager", lambda: mgr)
+    monkeypatch.setattr(vh, "INDEX_PATH", str(tmp_path / "supports.faiss"))
+    monkeypatch.setattr(vh, "count_tokens", lambda texts: np.array([len(t) for t in texts]))
+    store = AnnouncementStore(str(tmp_path / "raw.sqlite3"))
+    store.record([_item(10, "A"), _item(11, "B")])
+
+    def failing(texts, batch_size=64):
+        raise RuntimeError("embed failed")
+
+    monkeypatch.setattr(vh, "embed_texts", failing)
+    with pytest.raises(RuntimeError):
+        rebuild_from_store(store, full=True)
+    assert mgr.current().ntotal == 1 and mgr.version == 1  # 빈 인덱스를 게시하지 않음
+
+    monkeypatch.setattr(vh, "embed_texts", lambda texts, batch_size=64: np.ones((len(texts), 16), dtype="float32"))
+    assert rebuild_from_store(store, full=True) == 2
+    current = mgr.current()
+    assert mgr.version == 2  # 비우기 + 업서트를 한 번에 게시
+    assert current.ntotal == 2 and current.hashes.get("7") is None and current.hashes.get("10") is not None
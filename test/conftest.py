@@ -0,0 +1,50 @@
+# 인덱스 테스트 공용 픽스처
+# - unit_vecs(n, seed): 정규화된 무작위 벡터 (n, dim)
+# - make_refs(n, start): 숫자 external_ref 목록
+# - make_store(path, **IndexConfig 인자): 로드까지 마친 FaissStore (path 생략 시 tmp_path/s.faiss)
+# - make_manager(path, **StoreManager 인자): 모델 없이 dim 픽스처 차원을 쓰는 StoreManager (기본 reload_interval=0)
+# - 차원은 dim 픽스처 (테스트 모듈에서 같은 이름으로 덮어쓰면 변경)
+
+import numpy as np
+import pytest
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+from api.embedding.store_manager import StoreManager
+
+
+@pytest.fixture
+def dim():
+    return 16
+
+
+@pytest.fixture
+def unit_vecs(dim):
+    def make(n, seed=0):
+        v = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+        return v / np.linalg.norm(v, axis=1, keepdims=True)
+    return make
+
+
+@pytest.fixture
+def make_refs():
+    def make(n, start=1000):
+        return [str(start + i) for i in range(n)]
+    return make
+
+
+@pytest.fixture
+def make_store(tmp_path, dim):
+    def make(path=None, **kw):
+        s = FaissStore(index_path=str(path or tmp_path / "s.faiss"), dim=dim, config=IndexConfig(**kw))
+        s.load()
+        return s
+    return make
+
+
+@pytest.fixture
+def make_manager(tmp_path, dim):
+    def make(path=None, **kw):
+        kw.setdefault("reload_interval", 0)
+        return StoreManager(index_path=str(path or tmp_path / "s.faiss"), dim_fn=lambda: dim, **kw)
+    return make
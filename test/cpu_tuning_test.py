@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+from api.core import auto_tune, cpu_tuning
+
+
+def _rows(curve):
+    # {threads: {batch: 요청/초}} → sweep 결과 형식
+    return [{"threads": t, "batch": b, "per_s": v} for t, by_batch in curve.items() for b, v in by_batch.items()]
+
+
+def test_choose_maximizes_total_throughput_and_smallest_good_batch():
+    rows = _rows({1: {1: 40, 8: 90, 32: 100}, 2: {1: 60, 8: 150, 32: 160}, 4: {1: 70, 8: 180, 32: 200}})
+    # 워커 수 자유: 1스레드 × 4워커 = 400 > 2 × 2 = 320 > 4 × 1 = 200
+    assert auto_tune.choose(rows, vcpu=4) == {"threads": 1, "workers": 4, "similar_batch_max": 8,
+                                              "predicted_per_s": 400}
+    # 워커 1개 고정이면 스레드를 늘리는 쪽, 배치는 최대의 90% 이상인 가장 작은 크기
+    best = auto_tune.choose(rows, vcpu=4, workers=1)
+    assert (best["threads"], best["workers"], best["similar_batch_max"]) == (4, 1, 8)  # 180 >= 0.9 × 200
+    # 워커 × 스레드가 vCPU를 넘는 조합은 제외
+    assert auto_tune.choose(rows, vcpu=4, workers=4)["threads"] == 1
+
+
+def test_sweep_reports_encode_and_search_per_point():
+    encode = lambda texts, batch_size=64: np.zeros((len(texts), 4), dtype="float32")
+    rows = auto_tune.sweep(encode, lambda q: q @ q.T, dim=4, threads=[1], batches=[1, 4], seconds=0.0)
+    assert [(r["threads"], r["batch"]) for r in rows] == [(1, 1), (1, 4)]
+    assert all(r["per_s"] > 0 and r["encode_ms"] >= 0 for r in rows)
+
+
+def test_profile_from_same_hardware_overrides_formula(tmp_path, monkeypatch):
+    path = str(tmp_path / "cpu_profile.json")
+    env = {"VCPU": "8", "APP_WORKERS": "2", "CPU_TUNING_PROFILE": path}
+    monkeypatch.setattr(os, "environ", dict(env))
+    monkeypatch.setattr(cpu_tuning, "IS_DARWIN", False)
+
+    cpu_tuning.apply_cpu_tuning()
+    assert os.environ["OMP_NUM_THREADS"] == "4"  # 프로파일 없음 → vcpu // workers (cap 4)
+
+    cpu_tuning.save_profile(path, {"threads": 2, "workers": 4, "similar_batch_max": 16,
+                                   "fingerprint": cpu_tuning.hardware_fingerprint(8)})
+    monkeypatch.setattr(os, "environ", dict(env))
+    cpu_tuning.apply_cpu_tuning()
+    assert os.environ["OMP_NUM_THREADS"] == "2" and os.environ["TORCH_NUM_THREADS"] == "2"
+    assert os.environ["SIMILAR_BATCH_MAX"] == "16"
+
+    # 다른 하드웨어에서 만든 프로파일은 무시
+    monkeypatch.setattr(os, "environ", dict(env, VCPU="16"))
+    cpu_tuning.apply_cpu_tuning()
+    assert os.environ["OMP_NUM_THREADS"] == "4" and "SIMILAR_BATCH_MAX" not in os.environ
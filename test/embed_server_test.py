@@ -0,0 +1,88 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import api.embedding.vectorizer as vectorizer
+from api.embedding.embed_server import EmbedClient, EmbedServer
+
+DIM = 8
+
+
+def _vec(text):
+    v = np.random.default_rng(sum(map(ord, text))).standard_normal(DIM).astype("float32")
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def server(tmp_path):
+    calls = []
+
+    def encode(texts, batch_size=64):
+        if "boom" in texts:
+            raise RuntimeError("encode failed")
+        calls.append(len(texts))
+        threading.Event().wait(0.01)  # 인코딩 중에 다른 요청이 쌓이게
+        return np.stack([_vec(t) for t in texts])
+
+    srv = EmbedServer(str(tmp_path / "embed.sock"), encode=encode,
+                      count=lambda texts: [len(t) for t in texts], dim=DIM)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    while srv._sock is None:
+        threading.Event().wait(0.01)
+    yield srv, calls
+    srv.stop()
+    thread.join(5)
+
+
+def test_vectorizer_routes_to_server_and_requests_from_threads_are_batched(server, monkeypatch):
+    srv, calls = server
+    monkeypatch.setattr(vectorizer, "EMBED_SERVER_SOCKET", srv.socket_path)
+    monkeypatch.setattr(vectorizer, "_client", None)
+
+    assert vectorizer.embedding_dimension() == DIM
+    assert vectorizer.count_tokens(["ab", "abcd"]).tolist() == [2, 4]
+
+    texts = [f"아이디어 {i}" for i in range(40)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        got = list(pool.map(lambda t: vectorizer.embed_texts([t]), texts))
+    for t, v in zip(texts, got):
+        assert v.dtype == np.float32 and v.shape == (1, DIM)
+        assert np.allclose(v[0], _vec(t))
+    assert sum(calls) == len(texts) and len(calls) < len(texts)  # 스레드(워커) 요청이 서버에서 묶임
+    vectorizer._client.close()
+
+
+def test_large_results_grow_shared_memory_and_errors_keep_connection(server):
+    srv, _ = server
+    client = EmbedClient(srv.socket_path)
+    try:
+        texts = [f"공고 {i}" for i in range(50_000)]  # 50000 × 8 × 4 = 1.6MB > 초기 1MiB
+        vecs = client.embed(texts, batch_size=256)
+        assert vecs.shape == (len(texts), DIM)
+        assert np.allclose(vecs[123], _vec(texts[123]))
+
+        with pytest.raises(RuntimeError, match="encode failed"):
+            client.embed(["boom"])
+        assert np.allclose(client.embed(["다시"])[0], _vec("다시"))
+        assert client.embed([]).shape == (0, DIM)
+    finally:
+        client.close()
+
+
+def test_client_fails_fast_when_server_runs_another_model(server):
+    # 워커의 모델 식별자(EMBED_MODEL_DIR/EMBED_BACKEND 반영)와 서버 모델이 다르면 임베딩하지 않음
+    srv, calls = server
+    ok = EmbedClient(srv.socket_path)
+    other = EmbedClient(srv.socket_path, model=vectorizer.model_identity("/models/other", "onnx-int8"))
+    try:
+        assert ok.info()["model"] == vectorizer.MODEL_ID
+        for call in (other.dimension, lambda: other.embed(["아이디어"]), lambda: other.count_tokens(["a"])):
+            with pytest.raises(RuntimeError, match="모델 불일치"):
+                call()
+        assert calls == []
+    finally:
+        ok.close()
+        other.close()
@@ -0,0 +1,72 @@
+import numpy as np
+
+from api.embedding.embedding_cache import EmbeddingCache, query_key
+
+
+def _vec(x, dim=4):
+    return np.full(dim, x, dtype=np.float32)
+
+
+def test_query_key_ignores_whitespace_but_not_model():
+    # 공백만 다른 쿼리는 같은 키, 모델이 다르면 다른 키
+    a = query_key("스마트  주차\n 혼잡 예측 ", "m1")
+    b = query_key("스마트 주차 혼잡 예측", "m1")
+    assert a == b
+    assert a != query_key("스마트 주차 혼잡 예측", "m2")
+
+
+def test_hit_miss_counters_and_read_only_values():
+    cache = EmbeddingCache(max_bytes=1 << 20)
+    assert cache.get("k") is None
+    cache.put("k", _vec(1.0))
+    got = cache.get("k")
+    assert np.allclose(got, 1.0)
+    assert not got.flags.writeable
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_evicts_least_recently_used_by_bytes():
+    one = EmbeddingCache._entry_bytes("a", _vec(0.0))
+    cache = EmbeddingCache(max_bytes=one * 2)
+    cache.put("a", _vec(1.0))
+    cache.put("b", _vec(2.0))
+    cache.get("a")  # a를 최근 사용으로
+    cache.put("c", _vec(3.0))  # 용량 초과 → b 제거
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("api.embedding.embedding_cache.time.monotonic", lambda: now[0])
+    cache = EmbeddingCache(max_bytes=1 << 20, ttl_seconds=10)
+    cache.put("k", _vec(1.0))
+    now[0] += 5
+    assert cache.get("k") is not None
+    now[0] += 6
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_embed_queries_encodes_only_missing_texts_once():
+    from api.embedding import vectorizer
+
+    calls = []
+
+    def fake_encode(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 0.0] for t in texts]
+
+    vectorizer._query_cache.clear()
+    out = vectorizer.embed_queries(["AI  푸드", "AI 푸드", "핀테크"], encode=fake_encode)
+    again = vectorizer.embed_queries([" 핀테크 "], encode=fake_encode)
+
+    assert calls == [["AI 푸드", "핀테크"]]  # 중복/재요청은 인코딩하지 않음
+    assert out.shape == (3, 2) and out.dtype == np.float32
+    assert np.allclose(out[0], out[1])
+    assert np.allclose(again[0], out[2])
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import api.embedding.vectorizer as vectorizer
+
+pytest.importorskip("onnxruntime")
+
+DOCS = [
+    "청년 창업자를 위한 초기 사업화 자금 지원", "AI 기반 푸드테크 스타트업 육성 프로그램",
+    "지역 소상공인 디지털 전환 바우처", "해외 진출 핀테크 기업 글로벌 액셀러레이팅",
+    "친환경 포장재 개발 기업 실증 지원", "시니어 헬스케어 서비스 창업 경진대회",
+    "스마트 주차 플랫폼 기술 개발 과제", "리테일 매장 동선 분석 솔루션 구축 지원",
+    "대학생 창업 동아리 활동비 지원 사업", "제조 스타트업 시제품 제작 및 양산 연계",
+    "social venture impact investment matching", "deep tech startup R&D commercialization grant",
+]
+QUERIES = ["AI 음식 사진 분류 앱", "해외 송금 핀테크", "노인 건강 관리 서비스", "포장 쓰레기 줄이는 소재"]
+
+
+@pytest.fixture(scope="module")
+def torch_vecs():
+    try:
+        return vectorizer.embed_texts(DOCS + QUERIES, backend="torch")
+    except OSError as e:  # 로컬 모델/허브 접근 불가
+        pytest.skip(f"모델 로드 불가: {e}")
+
+
+@pytest.mark.parametrize("backend, min_cos, min_overlap", [("onnx", 0.999, 1.0), ("onnx-int8", 0.97, 0.75)])
+def test_backend_matches_torch(torch_vecs, backend, min_cos, min_overlap):
+    vecs = vectorizer.embed_texts(DOCS + QUERIES, backend=backend)
+    assert vecs.dtype == np.float32 and vecs.shape == torch_vecs.shape
+    assert np.allclose(np.linalg.norm(vecs, axis=1), 1.0, atol=1e-4)
+
+    cos = np.sum(vecs * torch_vecs, axis=1)
+    assert cos.min() >= min_cos
+
+    k = 3
+    n = len(DOCS)
+    want = np.argsort(-(torch_vecs[n:] @ torch_vecs[:n].T), axis=1)[:, :k]
+    got = np.argsort(-(vecs[n:] @ vecs[:n].T), axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(want, got)])
+    assert overlap >= min_overlap
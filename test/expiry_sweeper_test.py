@@ -0,0 +1,107 @@
+import threading
+from datetime import date
+
+import numpy as np
+
+from api.dto.startup_dto import CreateStartupResponseDTO
+from api.embedding.faiss_store import FaissStore
+from api.embedding.metadata import metadata_row
+from api.embedding.store_manager import StoreManager
+import api.services.expiry_sweeper as es
+import api.services.ingest_jobs as ij
+import api.services.vectorize_hook as vh
+
+DIM = 8
+
+
+def _dto(ref, end_date):
+    return CreateStartupResponseDTO.model_construct(external_ref=ref, title=f"공고 {ref}", support_details="본문",
+                                                    end_date=end_date)
+
+
+def _wait(job, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if job.status in (ij.SUCCEEDED, ij.FAILED):
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job not finished: {job.status}")
+
+
+def _setup(tmp_path, monkeypatch):
+    mgr = StoreManager(index_path=str(tmp_path / "supports.faiss"), dim_fn=lambda: DIM, reload_interval=0)
+    monkeypatch.setattr(vh, "get_store_manager", lambda: mgr)
+    monkeypatch.setattr(vh, "get_store", mgr.current)
+    monkeypatch.setattr(vh, "INDEX_PATH", str(tmp_path / "supports.faiss"))
+    monkeypatch.setattr(es, "get_store", mgr.current)
+    monkeypatch.setattr(vh, "count_tokens", lambda texts: np.array([len(t.split()) + 2 for t in texts]))
+    monkeypatch.setattr(vh, "embed_texts", lambda texts, batch_size=64:
+                        np.random.default_rng(len(texts)).standard_normal((len(texts), DIM)).astype("float32"))
+    return mgr
+
+
+def _seed(mgr, ends):
+    # 이미 색인된 공고가 나중에 마감된 상황 (업서트 당시엔 유효했던 공고)
+    dtos = [_dto(str(100 + i), end) for i, end in enumerate(ends)]
+    with mgr.transaction() as store:
+        vecs = np.random.default_rng(0).standard_normal((len(dtos), DIM)).astype("float32")
+        store.upsert_with_external_ids(vecs, [d.external_ref for d in dtos], metadata=[metadata_row(d) for d in dtos])
+
+
+def test_search_excludes_expired_until_sweep(tmp_path, monkeypatch):
+    mgr = _setup(tmp_path, monkeypatch)
+    _seed(mgr, [date(2020, 1, 1), date(2099, 1, 1), None, date(2020, 6, 1)])
+    q = np.ones(DIM, dtype="float32")
+    assert {h["ref"] for h in mgr.current().search_one(q, top_k=10)} == {"101", "102"}
+    assert mgr.current().ntotal == 4
+
+    runner = ij.IngestJobRunner()
+    version = mgr.version
+    job = es.sweep_expired(runner=runner)
+    _wait(job)
+    assert job.status == ij.SUCCEEDED and sorted(job.expired_refs) == ["100", "103"]
+    assert mgr.version == version + 1  # 한 번에 삭제 + 저장 1회
+    assert mgr.current().ntotal == 2
+
+    # 재시작 후에도 마감일 유지, 더 지울 것이 없으면 job도 없음
+    reloaded = FaissStore(str(tmp_path / "supports.faiss"), DIM)
+    reloaded.load()
+    assert reloaded.meta.get(np.asarray([101], dtype=np.int64))[0][4] == (date(2099, 1, 1) - date(1970, 1, 1)).days
+    assert es.sweep_expired(runner=runner) is None
+    runner.shutdown()
+
+
+def test_expired_announcements_are_not_indexed(tmp_path, monkeypatch):
+    mgr = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", date(2020, 1, 1)), _dto("102", date(2099, 1, 1))])
+    assert mgr.current().hashes.get("101") is None
+    assert mgr.current().ntotal == 1
+
+
+def test_sweeper_thread_starts_and_stops(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(es, "sweep_expired", lambda: calls.append(1))
+    sweeper = es.ExpirySweeper(interval=0.01, lock_path=str(tmp_path / "sweeper.lock"))
+    sweeper.start()
+    for _ in range(200):
+        if calls:
+            break
+        threading.Event().wait(0.01)
+    sweeper.stop()
+    assert calls
+
+    disabled = es.ExpirySweeper(interval=0, lock_path=str(tmp_path / "sweeper.lock"))
+    disabled.start()
+    assert disabled._thread is None
+
+
+def test_only_one_worker_sweeps_and_another_takes_over(tmp_path):
+    # 워커마다 스위퍼가 있어도 락을 잡은 하나만 정리, 담당이 멈추면 다음 주기에 다른 워커가 이어받음
+    path = str(tmp_path / "sweeper.lock")
+    first, second = es.ExpirySweeper(interval=1, lock_path=path), es.ExpirySweeper(interval=1, lock_path=path)
+    assert first.is_leader()
+    assert not second.is_leader()
+    assert first.is_leader()  # 한 번 잡으면 계속 유지
+
+    first.stop()
+    assert second.is_leader()
+    second.stop()
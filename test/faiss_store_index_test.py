@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from api.embedding.index_factory import IndexConfig, index_kind, index_layout
+
+CFG = dict(exact_threshold=300, nlist=8, pq_m=4, pq_nbits=4, hnsw_m=8, nprobe=8, ef_search=64)
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        IndexConfig(index_type="lsh")
+
+
+@pytest.mark.parametrize("index_type,kind", [("ivf_flat", "ivf"), ("ivf_pq", "ivf"), ("hnsw", "hnsw")])
+def test_stays_exact_below_threshold_then_switches(index_type, kind, unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, index_type=index_type)
+    store.add_with_external_ids(unit_vecs(200), make_refs(200))
+    assert index_kind(store.index) == "flat"
+
+    store.add_with_external_ids(unit_vecs(200, seed=1), make_refs(200, start=5000))
+    assert index_kind(store.index) == kind
+    assert store.ntotal == 400
+
+    # 자기 자신 검색 시 대부분 1등으로 나와야 함 (근사 인덱스)
+    q = unit_vecs(200)
+    top1 = [row[0]["ref"] for row in store.search(q, top_k=1)]
+    assert np.mean([a == b for a, b in zip(top1, make_refs(200))]) > 0.8
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "hnsw"])
+def test_remove_keeps_ids_consistent(index_type, unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, index_type=index_type)
+    vecs = unit_vecs(400)
+    store.add_with_external_ids(vecs, make_refs(400))
+    removed = store.remove_by_external_ids(make_refs(10))
+    assert removed == 10
+    assert store.ntotal == 390
+
+    hits = store.search(vecs[10:20], top_k=1)
+    assert [h[0]["ref"] for h in hits] == make_refs(10, start=1010)
+    refs = {h["ref"] for row in store.search(vecs[:10], top_k=5) for h in row}
+    assert not refs & set(make_refs(10))
+
+
+def test_saved_ann_index_reloads_with_search_params(unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, index_type="ivf_flat")
+    store.add_with_external_ids(unit_vecs(400), make_refs(400))
+    store.save()
+
+    again = make_store(**CFG, index_type="ivf_flat")
+    assert index_kind(again.index) == "ivf"
+    assert again.ntotal == 400
+    import faiss
+    assert faiss.extract_index_ivf(again.index).nprobe == 8
+
+
+@pytest.mark.parametrize("index_type,codec", [("flat", "sq8"), ("flat", "fp16"), ("hnsw", "pq"), ("ivf_flat", "sq8")])
+def test_compressed_codec_with_exact_rerank(index_type, codec, unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, index_type=index_type, codec=codec, rerank_factor=4)
+    vecs = unit_vecs(400)
+    store.add_with_external_ids(vecs, make_refs(400))
+    assert index_layout(store.index)[1] == codec
+    assert len(store.raw) == 400
+
+    # 재정렬 후 점수는 원본 벡터 내적과 같아야 함
+    q = unit_vecs(20, seed=7)
+    for qi, row in zip(q, store.search(q, top_k=5)):
+        exact = [float(vecs[int(h["ref"]) - 1000] @ qi) for h in row]
+        assert np.allclose([h["score"] for h in row], exact, atol=1e-5)
+        assert exact == sorted(exact, reverse=True)
+
+
+def test_raw_vectors_persist_and_follow_removals(unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, codec="sq8", rerank_factor=4)
+    vecs = unit_vecs(400)
+    store.add_with_external_ids(vecs, make_refs(400))
+    store.remove_by_external_ids(make_refs(5))
+    store.save()
+
+    again = make_store(**CFG, codec="sq8", rerank_factor=4)
+    assert isinstance(again.raw.vecs, np.memmap)  # 디스크에서 mmap으로 열림
+    assert len(again.raw) == again.ntotal == 395
+    row = again.search_one(vecs[10], top_k=1)
+    assert row[0]["ref"] == "1010"
+    assert abs(row[0]["score"] - 1.0) < 1e-5
+
+
+def test_raw_vector_writes_keep_base_mapped_until_save(unit_vecs, make_refs, make_store):
+    store = make_store(**CFG, codec="sq8", rerank_factor=4)
+    vecs = unit_vecs(400)
+    store.add_with_external_ids(vecs, make_refs(400))
+    store.save()
+
+    again = make_store(**CFG, codec="sq8", rerank_factor=4)
+    base = again.raw.vecs
+    new = unit_vecs(3, seed=5)
+    again.remove_by_external_ids(make_refs(5))
+    again.upsert_with_external_ids(new, make_refs(3, start=1010))
+    assert again.raw.vecs is base  # 삭제/업서트가 기준 원본 배열을 복사하지 않음
+    assert len(again.raw) == again.ntotal == 395
+    got, found = again.raw.get(np.asarray([1000, 1010, 1020]))
+    assert found.tolist() == [False, True, True]
+    assert np.allclose(got[1:], [new[0], vecs[20]])
+
+    again.save()  # 델타 세그먼트만 기록, 원본 보관소는 그대로
+    assert again.raw.vecs is base
+    again.compact()
+    again.save()  # 기준 세그먼트를 새로 쓸 때 살아 있는 행만 새 파일로 압축
+    assert isinstance(again.raw.vecs, np.memmap) and len(again.raw.vecs) == 395
+    assert again.raw.n_dead == 0 and len(again.raw.tail_ids) == 0
+    assert again.search_one(new[0], top_k=1)[0]["ref"] == "1010"
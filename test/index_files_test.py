@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from api.embedding import faiss_store, index_files
+from api.embedding.index_files import cleanup_old_versions, read_manifest, versioned_path
+
+
+@pytest.fixture
+def dim():
+    return 8
+
+
+def test_save_publishes_new_version_and_keeps_only_recent_files(tmp_path, monkeypatch, unit_vecs, make_store):
+    monkeypatch.setattr(faiss_store, "SEGMENT_DELTAS", False)  # 저장마다 전체 기록 (델타는 segments_test)
+    monkeypatch.setattr(index_files, "INDEX_FILE_GRACE_SECONDS", 0)
+    path = tmp_path / "supports.faiss"
+    store = make_store(path)
+    for i in range(4):
+        store.upsert_with_external_ids(unit_vecs(1, seed=i), [str(100 + i)])
+        store.save()
+
+    manifest = read_manifest(str(path))
+    assert manifest["version"] == 4
+    assert manifest["ntotal"] == 4
+    assert manifest["files"]["index"] == os.path.basename(versioned_path(str(path), 4))
+    left = sorted(n for n in os.listdir(tmp_path) if n.startswith("supports.faiss.v"))
+    assert left == ["supports.faiss.v3", "supports.faiss.v3.hashes.json", "supports.faiss.v3.meta.npz",
+                    "supports.faiss.v4", "supports.faiss.v4.hashes.json", "supports.faiss.v4.meta.npz"]
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_files_dropped_from_a_recent_manifest_outlive_quick_publishes(tmp_path, monkeypatch, unit_vecs, make_store):
+    # 직전 manifest를 읽고 아직 파일을 열기 전인 워커 → 연달아 게시돼도 유예 시간 동안은 파일이 남아 있어야 함
+    monkeypatch.setattr(faiss_store, "SEGMENT_DELTAS", False)
+    path = tmp_path / "supports.faiss"
+    store = make_store(path)
+    for i in range(4):
+        store.upsert_with_external_ids(unit_vecs(1, seed=i), [str(100 + i)])
+        store.save()
+    assert os.path.exists(versioned_path(str(path), 1))
+    assert os.path.basename(versioned_path(str(path), 1)) in read_manifest(str(path))["retired"]
+
+    monkeypatch.setattr(index_files, "INDEX_FILE_GRACE_SECONDS", 0)  # 유예 시간이 지난 뒤 다음 게시
+    store.upsert_with_external_ids(unit_vecs(1, seed=9), ["200"])
+    store.save()
+    left = {n.split(".")[2] for n in os.listdir(tmp_path) if n.startswith("supports.faiss.v")}
+    assert left == {"v4", "v5"}
+
+
+def test_cleanup_keeps_files_another_worker_is_still_writing(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_files, "INDEX_FILE_GRACE_SECONDS", 0)
+    path = str(tmp_path / "supports.faiss")
+    for name in ("supports.faiss.v1", "supports.faiss.v1.meta.npz.ab12cd.tmp"):
+        (tmp_path / name).write_bytes(b"")
+    cleanup_old_versions(path, 5)
+    assert sorted(os.listdir(tmp_path)) == ["supports.faiss.v1.meta.npz.ab12cd.tmp"]
+
+
+def test_mmap_loaded_store_becomes_writable_on_first_mutation(tmp_path, monkeypatch, unit_vecs, make_store):
+    monkeypatch.setattr(faiss_store, "INDEX_MMAP", True)
+    monkeypatch.setattr(faiss_store, "SEGMENT_DELTAS", False)  # 델타가 켜져 있으면 추가도 기준 인덱스를 건드리지 않음
+    path = tmp_path / "supports.faiss"
+    store = make_store(path)
+    store.upsert_with_external_ids(unit_vecs(3), ["1", "2", "3"])
+    store.save()
+
+    mapped = make_store(path)
+    assert mapped._mapped
+    snapshot = mapped.copy()  # 트랜잭션 복사본도 독립 메모리여야 함
+    snapshot.upsert_with_external_ids(unit_vecs(1, seed=9), ["4"])
+    mapped.remove_by_external_ids(["1"])  # 삭제는 tombstone 표시만 → mmap 그대로
+    assert mapped._mapped
+    mapped.add_with_external_ids(unit_vecs(1, seed=5), ["5"])  # mmap 상태에서 바로 수정해도 abort 없이 사본으로 전환
+    assert not mapped._mapped
+    assert (mapped.ntotal, snapshot.ntotal) == (3, 4)
+
+
+def test_legacy_single_file_is_still_loaded(tmp_path, unit_vecs, make_store):
+    import faiss
+
+    path = tmp_path / "supports.faiss"
+    legacy = make_store(path)
+    legacy.upsert_with_external_ids(unit_vecs(2), ["7", "8"])
+    faiss.write_index(legacy.index, str(path))  # manifest 이전 형식
+
+    again = make_store(path)
+    assert again.ntotal == 2 and again.version == 0
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+
+import pytest
+
+from api.dto.startup_dto import CreateStartupResponseDTO
+from api.services.announcement_store import AnnouncementStore
+import api.services.ingest_jobs as ij
+
+
+@pytest.fixture(autouse=True)
+def raw_store(tmp_path, monkeypatch):
+    # 원본 저장소는 테스트마다 임시 파일 (기본 경로 data/에 만들지 않음)
+    store = AnnouncementStore(str(tmp_path / "raw.sqlite3"))
+    monkeypatch.setattr(ij, "get_announcement_store", lambda: store)
+    yield store
+    store.close()
+
+
+def _dto(ref, title="공고"):
+    return CreateStartupResponseDTO.model_construct(external_ref=ref, title=title, support_details="본문")
+
+
+def _wait(job, timeout=5.0):
+    for _ in range(int(timeout / 0.01)):
+        if job.status in (ij.SUCCEEDED, ij.FAILED):
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job not finished: {job.status}")
+
+
+def test_job_runs_in_background_and_reports_progress(monkeypatch):
+    calls = []
+
+    def fake_vectorize(dtos, expired_refs=None, progress=None):
+        progress("embedding", len(dtos), len(dtos))
+        calls.append(([d.external_ref for d in dtos], expired_refs))
+
+    monkeypatch.setattr(ij, "vectorize_and_upsert_from_dtos", fake_vectorize)
+    runner = ij.IngestJobRunner()
+    job = runner.submit([_dto("101"), _dto("102")], expired_refs=["90", "x"])
+    _wait(job)
+
+    assert calls == [(["101", "102"], ["90"])]
+    status = runner.get(job.id).to_dict()
+    assert status["status"] == "succeeded"
+    assert (status["stage"], status["done"], status["total"]) == ("embedding", 2, 2)
+    runner.shutdown()
+
+
+def test_sync_arriving_while_running_is_coalesced_into_one_pending_job(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fake_vectorize(dtos, expired_refs=None, progress=None):
+        started.set()
+        release.wait(5)
+        calls.append(([d.external_ref for d in dtos], expired_refs))
+
+    monkeypatch.setattr(ij, "vectorize_and_upsert_from_dtos", fake_vectorize)
+    runner = ij.IngestJobRunner()
+    first = runner.submit([_dto("101")])
+    assert started.wait(5)
+
+    # 실행 중에 들어온 요청 2개 → 대기 job 하나로 합쳐짐 (나중 요청의 마감 ref는 앞 업서트에서 제외)
+    second = runner.submit([_dto("102"), _dto("103")])
+    third = runner.submit([_dto("104")], expired_refs=["103"])
+    assert second is third
+    assert second.requests == 2
+
+    release.set()
+    _wait(first)
+    _wait(second)
+    assert calls == [(["101"], []), (["102", "104"], ["103"])]
+    runner.shutdown()
+
+
+def test_failed_job_keeps_error(monkeypatch):
+    def boom(dtos, expired_refs=None, progress=None):
+        raise RuntimeError("embed failed")
+
+    monkeypatch.setattr(ij, "vectorize_and_upsert_from_dtos", boom)
+    runner = ij.IngestJobRunner()
+    job = runner.submit([_dto("101")])
+    _wait(job)
+    assert job.status == "failed" and job.error == "embed failed"
+    assert runner.get("unknown") is None
+    runner.shutdown()
+
+
+def test_stream_job_embeds_batches_and_flushes_incrementally(monkeypatch):
+    applied = []
+    monkeypatch.setattr(ij, "INGEST_FLUSH_ROWS", 3)
+    monkeypatch.setattr(ij, "prepare_upserts",
+                        lambda dtos, expired: ij.UpsertPlan(texts=[d.title for d in dtos],
+                                                            refs=[d.external_ref for d in dtos],
+                                                            hashes=["h"] * len(dtos), metas=[None] * len(dtos)))
+    monkeypatch.setattr(ij, "embed_upserts", lambda texts: ij.np.zeros((len(texts), 4), dtype="float32"))
+    monkeypatch.setattr(ij, "apply_upserts",
+                        lambda vecs, plan, expired: applied.append((list(plan.refs), list(expired))))
+    runner = ij.IngestJobRunner()
+
+    async def run():
+        stream = runner.open_stream(expired_refs=["90"])
+        assert runner.open_stream() is None  # 실행 중이면 새 스트림 대신 submit()으로 합치기
+        await stream.feed([_dto("101"), _dto("102")])
+        await stream.feed([_dto("103")])
+        await stream.feed([_dto("104")])
+        await stream.close()
+        return stream.job
+
+    job = asyncio.run(run())
+    _wait(job)
+    # 3개 모이면 반영(첫 반영 때 마감 삭제 포함), 나머지는 종료 시 반영
+    assert applied == [(["101", "102", "103"], ["90"]), (["104"], [])]
+    assert job.status == "succeeded" and len(job.dtos) == 4
+    runner.shutdown()
+
+
+def test_fingerprints_are_committed_only_after_job_succeeds(monkeypatch, raw_store):
+    items = [{"pbanc_sn": 101, "biz_pbanc_nm": "A"}, {"pbanc_sn": 102, "biz_pbanc_nm": "B"}]
+    assert raw_store.record(items) == ["new", "new"]
+
+    def failing(dtos, expired_refs=None, progress=None):
+        raise RuntimeError("embed failed")
+
+    monkeypatch.setattr(ij, "vectorize_and_upsert_from_dtos", failing)
+    runner = ij.IngestJobRunner()
+    job = runner.submit([_dto("101"), _dto("102")])
+    _wait(job)
+    assert job.status == ij.FAILED
+    assert raw_store.record(items) == ["new", "new"]  # 실패한 job의 공고는 다시 변경분
+
+    monkeypatch.setattr(ij, "vectorize_and_upsert_from_dtos", lambda dtos, expired_refs=None, progress=None: None)
+    job = runner.submit([_dto("101"), _dto("102")])
+    _wait(job)
+    assert raw_store.record(items) == ["unchanged", "unchanged"]
+    runner.shutdown()
@@ -0,0 +1,166 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from api.dto.startup_dto import CreateStartupResponseDTO
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig, index_kind, index_layout
+from api.embedding.metadata import SearchFilter, metadata_row
+from api.embedding.store_manager import StoreManager
+import api.services.vectorize_hook as vh
+
+DIM = 16
+REGIONS = ["서울", "경기", "부산", "전국"]
+AGES = ["제한 없음", "만 39세 이하", "만 20세 이상 ~ 만 39세 이하", "만 40세 이상"]
+
+
+def _dto(ref, i, **kw):
+    fields = dict(external_ref=ref, title=f"공고 {ref}", support_details="본문",
+                  region=REGIONS[i % 4], target_age=AGES[(i // 4) % 4],
+                  is_recruiting=i % 3 != 0, end_date=date(2099, 1, 1 + i % 28))
+    fields.update(kw)
+    return CreateStartupResponseDTO.model_construct(**fields)
+
+
+def _passes(dto, flt):
+    region, lo, hi, recruiting, end_day = metadata_row(dto)
+    return ((not flt.region or not region or flt.region in region or "전국" in region)
+            and (flt.age is None or lo <= flt.age <= hi)
+            and (not flt.recruiting_only or recruiting != 0)
+            and (flt.open_on is None or dto.end_date is None or dto.end_date >= flt.open_on))
+
+
+def _store(tmp_path, index_type, n=400, **kw):
+    cfg = IndexConfig(index_type=index_type, exact_threshold=1, nprobe=64, ef_search=200, **kw)
+    store = FaissStore(str(tmp_path / "supports.faiss"), DIM, config=cfg)
+    store.load()
+    dtos = [_dto(str(170000 + i), i) for i in range(n)]
+    vecs = np.random.default_rng(0).standard_normal((n, DIM)).astype("float32")
+    store.upsert_with_external_ids(vecs, [d.external_ref for d in dtos],
+                                   metadata=[metadata_row(d) for d in dtos])
+    return store, dtos, vecs
+
+
+def test_metadata_row_parses_normalized_dto_fields():
+    row = metadata_row(_dto("1", 0, region=" 서울 ", target_age="만 20세 이상 ~ 만 39세 이하",
+                            is_recruiting=True, end_date=date(1970, 1, 11)))
+    assert row == ("서울", 20, 39, 1, 10)
+    # 정보가 없거나 못 읽는 형식이면 모든 조건 통과 값
+    assert metadata_row(CreateStartupResponseDTO.model_construct(external_ref="2", title="t"))[:4] == ("", 0, 200, -1)
+    assert metadata_row(_dto("3", 0, target_age="대학생"))[1:3] == (0, 200)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf_flat"])
+def test_filtered_search_returns_only_matching_and_keeps_k(tmp_path, index_type):
+    store, dtos, vecs = _store(tmp_path, index_type)
+    assert index_kind(store.index) == index_type.split("_")[0]
+    by_ref = {d.external_ref: d for d in dtos}
+    flt = SearchFilter(region="서울", age=30, recruiting_only=True, open_on=date(2099, 1, 10))
+    matching = sum(_passes(d, flt) for d in dtos)
+    assert 10 <= matching < len(dtos) // 4
+
+    hits = store.search(vecs[:3], top_k=10, flt=flt)
+    for row in hits:
+        assert len(row) == 10  # 검색 뒤에 거르는 방식이면 k개보다 적게 남음
+        assert all(_passes(by_ref[h["ref"]], flt) for h in row)
+
+
+def test_flat_pq_filters_and_tombstones_without_selector(tmp_path):
+    # IndexPQ는 검색 파라미터(선택자)를 받지 않음 → 뽑고 거르기, 통과한 후보가 모자라면 더 뽑음
+    store, dtos, vecs = _store(tmp_path, "flat", codec="pq", pq_m=4, pq_nbits=4, rerank_factor=4)
+    assert index_layout(store.index) == ("flat", "pq")
+    removed = {d.external_ref for d in dtos[:60:2]}
+    store.remove_by_external_ids(removed)
+    by_ref = {d.external_ref: d for d in dtos}
+    flt = SearchFilter(region="서울", age=30, recruiting_only=True, open_on=date(2099, 1, 10))
+
+    for row in store.search(vecs[:5], top_k=10, flt=flt):
+        assert len(row) == 10
+        assert all(_passes(by_ref[h["ref"]], flt) and h["ref"] not in removed for h in row)
+    assert all(len(row) == 10 for row in store.search(vecs[:5], top_k=10))
+
+
+def test_filter_survives_save_reload_and_copy(tmp_path):
+    store, dtos, vecs = _store(tmp_path, "flat")
+    store.save()
+    again = FaissStore(str(tmp_path / "supports.faiss"), DIM, config=store.config)
+    again.load()
+    flt = SearchFilter(region="부산")
+    assert {h["ref"] for h in again.search_one(vecs[0], top_k=400, flt=flt)} == \
+        {d.external_ref for d in dtos if _passes(d, flt)}
+
+    # 복사본 수정이 원본 메타데이터에 영향 없음
+    other = again.copy()
+    other.remove_by_external_ids([dtos[2].external_ref])
+    other.update_metadata([dtos[6].external_ref], [metadata_row(_dto(dtos[6].external_ref, 0, region="서울"))])
+    assert len(other.search_one(vecs[0], top_k=400, flt=flt)) == len(again.search_one(vecs[0], top_k=400, flt=flt)) - 2
+
+
+def test_metadata_only_change_skips_embedding_but_updates_filter(tmp_path, monkeypatch):
+    mgr = StoreManager(index_path=str(tmp_path / "supports.faiss"), dim_fn=lambda: DIM, reload_interval=0)
+    monkeypatch.setattr(vh, "get_store_manager", lambda: mgr)
+    monkeypatch.setattr(vh, "get_store", mgr.current)
+    monkeypatch.setattr(vh, "INDEX_PATH", str(tmp_path / "supports.faiss"))
+    calls = []
+
+    def fake_embed(texts, batch_size=64):
+        calls.append(list(texts))
+        return np.random.default_rng(len(calls)).standard_normal((len(texts), DIM)).astype("float32")
+
+    monkeypatch.setattr(vh, "count_tokens", lambda texts: np.array([len(t.split()) + 2 for t in texts]))
+    monkeypatch.setattr(vh, "embed_texts", fake_embed)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", 1), _dto("102", 2)])
+    flt = SearchFilter(recruiting_only=True)
+    q = np.ones(DIM, dtype="float32")
+    assert {h["ref"] for h in mgr.current().search_one(q, top_k=5, flt=flt)} == {"101", "102"}
+
+    # 본문은 그대로, 모집 마감만 바뀜 → 임베딩 없이 필터에 반영
+    vh.vectorize_and_upsert_from_dtos([_dto("101", 1, is_recruiting=False), _dto("102", 2)])
+    assert len(calls) == 1
+    assert {h["ref"] for h in mgr.current().search_one(q, top_k=5, flt=flt)} == {"102"}
+    assert {h["ref"] for h in mgr.current().search_one(q, top_k=5)} == {"101", "102"}
+
+
+def test_ids_above_last_excluded_id_are_not_dropped(tmp_path):
+    # 비트맵 끝(가장 큰 제외 ID) 뒤의 ID도 항상 통과해야 함
+    store, dtos, vecs = _store(tmp_path, "flat", n=64)
+    flt = SearchFilter(region="서울")
+    expected = {d.external_ref for d in dtos if _passes(d, flt)}
+    for _ in range(20):
+        assert {h["ref"] for h in store.search_one(vecs[0], top_k=64, flt=flt)} == expected
+
+
+def test_exclusion_cache_is_safe_across_search_threads(tmp_path, monkeypatch):
+    # 캐시가 가득 차서 비워지는 동안 다른 스레드가 같은 스냅샷으로 필터 검색해도 KeyError 없이 같은 결과
+    import sys
+    import threading
+
+    import api.embedding.metadata as metadata
+    monkeypatch.setattr(metadata, "_SELECTOR_CACHE_MAX", 1)
+    store, _, _ = _store(tmp_path, "flat", n=64)
+    filters = [SearchFilter(age=age) for age in range(18, 50)]
+    errors = []
+
+    expected = {flt: set(store.meta.excluded_ids(flt).tolist()) for flt in filters}
+
+    def worker(seed):
+        try:
+            for i in range(3000):
+                flt = filters[(seed + i) % len(filters)]
+                excl = store.meta.exclusion(flt)
+                assert set(excl.ids.tolist() if excl is not None else []) == expected[flt]
+        except Exception as e:  # noqa: BLE001 - 스레드 안 예외를 모아서 확인
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # 스레드 전환을 잦게 해서 확인 ~ 조회 사이 끼어들기 재현
+    try:
+        threads = [threading.Thread(target=worker, args=(s,)) for s in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import api.services.recommend_service as sr
+from api.dto.recommended_dto import StartupRequestDTO
+from api.embedding.faiss_store import FaissStore
+from api.embedding.metadata import SearchFilter
+from api.core.query_batcher import Overloaded, QueryBatcher
+
+DIM = 8
+
+
+def test_concurrent_requests_are_coalesced_and_answered_in_order():
+    first = threading.Event()
+    release = threading.Event()
+    sizes = []
+
+    def run_batch(items):
+        sizes.append(len(items))
+        if len(sizes) == 1:
+            first.set()
+            release.wait(5)  # 첫 묶음을 처리하는 동안 나머지 요청이 쌓이게
+        return [x * 10 for x in items]
+
+    batcher = QueryBatcher(run_batch, max_batch=8)
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        head = pool.submit(batcher.submit, 0)
+        first.wait(5)
+        rest = [pool.submit(batcher.submit, i) for i in range(1, 20)]
+        threading.Event().wait(0.05)
+        release.set()
+        assert head.result() == 0
+        assert [f.result() for f in rest] == [i * 10 for i in range(1, 20)]
+
+    assert sizes[0] == 1 and max(sizes) == 8 and sum(sizes) == 20
+    stats = batcher.stats()
+    assert stats["requests"] == 20 and stats["batches"] == len(sizes) < 20
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    failing = [True]
+
+    def run_batch(items):
+        if failing[0]:
+            raise RuntimeError("encode failed")
+        return items
+
+    batcher = QueryBatcher(run_batch, window_ms=20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(batcher.submit, i) for i in range(4)]
+        for f in futures:
+            with pytest.raises(RuntimeError):
+                f.result()
+    # 실패 후에도 다음 요청은 처리됨
+    failing[0] = False
+    assert batcher.submit("x") == "x"
+
+
+def test_similar_top_k_batches_concurrent_queries_with_same_results(monkeypatch, tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((200, DIM)).astype("float32")
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    store = FaissStore(index_path=str(tmp_path / "s.faiss"), dim=DIM)
+    store.load()
+    store.upsert_with_external_ids(vecs, [str(1000 + i) for i in range(200)],
+                                   metadata=[("서울" if i % 2 else "부산", 0, 200, 1, 2 ** 31 - 1) for i in range(200)])
+
+    calls = []
+
+    def fake_embed(texts, batch_size=64):
+        calls.append(len(texts))
+        return np.stack([vecs[int(t.split()[-1])] for t in texts])
+
+    monkeypatch.setattr(sr, "embed_texts", fake_embed)
+    monkeypatch.setattr(sr, "get_store", lambda: store)
+    monkeypatch.setattr(sr, "_result_cache", sr.ResultCache(max_entries=0))
+    monkeypatch.setattr(sr, "_batcher", QueryBatcher(sr._search_coalesced, max_batch=16, window_ms=50))
+
+    reqs = [(StartupRequestDTO(idea_title="아이디어", idea_description=f"설명 {i}"), 5 + i % 3,
+             SearchFilter(region="서울") if i % 2 else None) for i in range(24)]
+    with ThreadPoolExecutor(max_workers=24) as pool:
+        got = list(pool.map(lambda r: sr.similar_top_k(r[0], k=r[1], flt=r[2]), reqs))
+
+    assert len(calls) < len(reqs)  # 임베딩이 묶여서 호출됨
+    for (req, k, flt), out in zip(reqs, got):
+        i = int(req.idea_description.split()[-1])
+        want = store.search_one(vecs[i], top_k=k, **({"flt": flt} if flt else {}))
+        assert [d.external_ref for d in out] == [h["ref"] for h in want]
+        assert out[0].external_ref == str(1000 + i) or flt is not None
+
+
+def _blocking_batcher(**kw):
+    started, release = threading.Event(), threading.Event()
+
+    def run_batch(items):
+        started.set()
+        release.wait(5)
+        return items
+
+    return QueryBatcher(run_batch, **kw), started, release
+
+
+def test_full_queue_is_rejected_with_429_and_retry_after():
+    batcher, started, release = _blocking_batcher(max_batch=2, max_queue=3, deadline_ms=0)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        running = pool.submit(batcher.submit, "a")
+        started.wait(5)
+        queued = [pool.submit(batcher.submit, x) for x in "bcd"]
+        while batcher.stats()["queue_depth"] < 3:
+            threading.Event().wait(0.01)
+        with pytest.raises(Overloaded) as e:
+            batcher.submit("e")
+        assert e.value.status_code == 429 and e.value.retry_after >= 1
+        release.set()
+        assert [f.result() for f in [running, *queued]] == list("abcd")
+    stats = batcher.stats()
+    assert stats["rejected_queue_full"] == 1 and stats["queue_depth"] == 0 and stats["wait_ms_p99"] > 0
+
+
+def test_batch_larger_than_queue_limit_is_admitted_when_queue_is_empty():
+    # 대기열 한도보다 큰 배치(/ai/similar/batch 최대 100건)도 빈 대기열이면 처리 → 재시도해도 늘 429인 상황 방지
+    batcher = QueryBatcher(lambda items: [x * 2 for x in items], max_batch=4, max_queue=3, deadline_ms=1)
+    batcher._batch_seconds = 1.0  # 예상 대기가 기한을 넘는 상태
+    assert batcher.submit_many(list(range(10))) == [x * 2 for x in range(10)]
+    assert batcher.stats()["rejected_queue_full"] == 0 and batcher.stats()["rejected_deadline"] == 0
+
+
+def test_requests_past_deadline_get_503():
+    batcher, started, release = _blocking_batcher(deadline_ms=50)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        running = pool.submit(batcher.submit, "a")
+        started.wait(5)
+        with pytest.raises(Overloaded) as e:
+            batcher.submit("b")  # 대기 중 기한 만료 (실행 중인 묶음이 안 끝남)
+        assert e.value.status_code == 503
+        release.set()
+        assert running.result() == "a"  # 이미 실행 중인 요청은 기한이 지나도 결과를 받음
+    assert batcher.stats()["expired_in_queue"] == 1
+
+    # 묶음 시간이 기한보다 길다고 알려진 뒤에는 대기열에 넣지 않고 바로 503
+    slow = QueryBatcher(lambda items: (threading.Event().wait(0.1), items)[1], deadline_ms=50)
+    slow.submit("x")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        busy = pool.submit(slow.submit, "y")
+        while slow.stats()["running_batches"] == 0:
+            threading.Event().wait(0.005)
+        with pytest.raises(Overloaded) as e:
+            slow.submit("z")
+        busy.result()
+    assert e.value.status_code == 503 and slow.stats()["rejected_deadline"] == 1
+
+
+def test_router_maps_overload_to_status_with_retry_after(monkeypatch):
+    from fastapi import HTTPException
+
+    import api.routers.startup_router as router
+
+    def overloaded(*args, **kwargs):
+        raise Overloaded(429, 3, "full")
+
+    monkeypatch.setattr(router, "similar_top_k", overloaded)
+    req = StartupRequestDTO(idea_title="아이디어", idea_description="설명")
+    with pytest.raises(HTTPException) as e:
+        router.get_similar_supports(req, k=5, flt=SearchFilter())
+    assert e.value.status_code == 429 and e.value.headers == {"Retry-After": "3"}
@@ -90,3 +90,51 @@ def test_similar_top_k_falls_back_to_score_when_score01_missing(monkeypatch):
     assert abs(out[0].score - (-0.2)) < 1e-9
     assert out[1].external_ref == "SUP-XYZ"
     assert abs(out[1].score - 0.3) < 1e-9
+
+
+class FakeStoreMulti:
+    def __init__(self):
+        self.calls = 0
+
+    def is_empty(self):
+        return False
+
+    def search(self, qv, top_k=30):
+        # 한 번의 다중 행 검색으로 쿼리별 결과 반환
+        self.calls += 1
+        return [[{"ref": f"{i}-{j}", "score": 0.5} for j in range(top_k)] for i in range(len(qv))]
+
+
+def test_similar_top_k_batch_embeds_and_searches_once(monkeypatch):
+    # 아이디어 여러 개를 임베딩 1회, 검색 1회로 처리하고 요청 순서를 유지
+    embed_calls = []
+
+    def fake_batch_embed(texts, encode=None):
+        embed_calls.append(list(texts))
+        return [[0.1, 0.2, 0.3] for _ in texts]
+
+    store = FakeStoreMulti()
+    monkeypatch.setattr(sr, "embed_queries", fake_batch_embed)
+    monkeypatch.setattr(sr, "get_store", lambda: store)
+
+    reqs = [
+        StartupRequestDTO(idea_title="스마트 주차", idea_description="V2I 기반 혼잡 예측"),
+        StartupRequestDTO(idea_title="", idea_description="  "),
+        StartupRequestDTO(idea_title="리테일 분석", idea_description="매장 동선 트래킹"),
+    ]
+    out = sr.similar_top_k_batch(reqs, k=2)
+
+    assert len(embed_calls) == 1
+    assert embed_calls[0] == ["스마트 주차 V2I 기반 혼잡 예측", "리테일 분석 매장 동선 트래킹"]
+    assert store.calls == 1
+    assert [len(r) for r in out] == [2, 0, 2]
+    assert out[0][0].external_ref == "0-0"
+    assert out[2][1].external_ref == "1-1"
+
+
+def test_similar_top_k_batch_returns_empty_lists_when_index_empty(monkeypatch):
+    monkeypatch.setattr(sr, "embed_queries", lambda texts, encode=None: [[0.0] for _ in texts])
+    monkeypatch.setattr(sr, "get_store", lambda: FakeStoreEmpty())
+
+    reqs = [StartupRequestDTO(idea_title="AI 푸드", idea_description="이미지 인식으로 음식 분류")] * 2
+    assert sr.similar_top_k_batch(reqs, k=5) == [[], []]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.result_cache import ResultCache
+
+
+def _hits(n):
+    return [{"ref": str(i), "score": 1.0 - i / 100} for i in range(n)]
+
+
+def test_smaller_k_is_served_by_slicing_larger_entry():
+    cache = ResultCache(max_entries=8)
+    cache.put("q", 1, 10, _hits(10))
+    assert cache.get("q", 1, 3) == _hits(3)
+    assert cache.get("q", 1, 20) is None  # 더 큰 k는 다시 검색해야 함
+
+
+def test_short_result_is_complete_for_any_k():
+    # 인덱스가 작아 k보다 적게 나온 결과는 더 큰 k에도 그대로 사용 가능
+    cache = ResultCache(max_entries=8)
+    cache.put("q", 1, 10, _hits(4))
+    assert cache.get("q", 1, 50) == _hits(4)
+
+
+def test_new_generation_invalidates_and_stale_put_is_ignored():
+    cache = ResultCache(max_entries=8)
+    cache.put("q", 1, 10, _hits(10))
+    assert cache.get("q", 2, 5) is None
+    cache.put("q", 1, 10, _hits(10))  # 교체 전 스냅샷 결과
+    assert cache.get("q", 2, 5) is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_store_generation_changes_on_every_mutation(tmp_path):
+    store = FaissStore(index_path=str(tmp_path / "s.faiss"), dim=4)
+    store.load()
+    seen = [store.generation]
+    vecs = np.eye(4, dtype=np.float32)[:2]
+    store.upsert_with_external_ids(vecs, ["1", "2"])
+    seen.append(store.generation)
+    store.remove_by_external_ids(["1"])
+    seen.append(store.generation)
+    store.save()
+    seen.append(store.generation)
+    assert seen == sorted(set(seen))
+    assert store.copy().generation == store.generation
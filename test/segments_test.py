@@ -0,0 +1,106 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import api.embedding.faiss_store as faiss_store
+import api.embedding.index_files as index_files
+import api.embedding.segments as segments
+from api.embedding.index_files import read_manifest
+from api.embedding.metadata import SearchFilter
+
+CFG = dict(exact_threshold=1, hnsw_m=8, ef_search=128)
+
+
+def _meta(n, start=0):
+    return [("서울" if (start + i) % 2 else "부산", 0, 200, 1, 2 ** 31 - 1) for i in range(n)]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_saves_after_base_write_only_deltas_and_reload_matches(tmp_path, index_type, unit_vecs, make_refs, make_store):
+    path = tmp_path / "s.faiss"
+    store = make_store(path, index_type=index_type, **CFG)
+    store.upsert_with_external_ids(unit_vecs(300), make_refs(300), content_hashes=["h"] * 300, metadata=_meta(300))
+    store.save()
+    base = read_manifest(str(path))["files"]["index"]
+    base_stat = os.stat(tmp_path / base)
+
+    store.upsert_with_external_ids(unit_vecs(5, seed=1), make_refs(5), content_hashes=["h2"] * 5, metadata=_meta(5, 1))
+    store.save()
+    store.remove_by_external_ids(make_refs(3, start=1100) + make_refs(1))  # 기준 쪽 3건 + 델타 쪽 1건
+    store.update_metadata(["1200"], [("대전", 0, 200, 1, 2 ** 31 - 1)])
+    store.save()
+
+    manifest = read_manifest(str(path))
+    assert manifest["version"] == 3 and manifest["files"]["index"] == base
+    assert manifest["segments"] == ["s.faiss.v2.seg.npz", "s.faiss.v3.seg.npz"]
+    assert os.stat(tmp_path / base).st_mtime_ns == base_stat.st_mtime_ns
+    assert os.path.getsize(tmp_path / "s.faiss.v2.seg.npz") < base_stat.st_size / 5
+    assert store.ntotal == manifest["ntotal"] == 296 and store.delta.ntotal == 4
+
+    again = make_store(path, index_type=index_type, **CFG)
+    assert again.ntotal == 296 and again.segments == manifest["segments"]
+    assert again.hashes.get("1001") == "h2" and again.hashes.get("1000") is None
+    assert again.meta.get(np.asarray([1200, 1001]))[0][0] == "대전"
+    q = np.concatenate([unit_vecs(5, seed=1), unit_vecs(300)[100:110]])
+    for flt in (None, SearchFilter(region="서울")):
+        assert again.search(q, top_k=10, flt=flt) == store.search(q, top_k=10, flt=flt)
+    hits = store.search(unit_vecs(5, seed=1), top_k=1)
+    assert [row[0]["ref"] for row in hits[1:]] == make_refs(4, start=1001)  # 다시 넣은 벡터는 델타에서 나옴
+
+
+def test_transaction_copies_share_the_mapped_base(monkeypatch, unit_vecs, make_refs, make_store, make_manager):
+    monkeypatch.setattr(faiss_store, "INDEX_MMAP", True)
+    mgr = make_manager()
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(50), make_refs(50))
+    mgr._current = make_store(**CFG)  # 디스크에서 mmap으로 다시 읽은 상태
+    old = mgr.current()
+    assert old._mapped
+
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(2, seed=1), make_refs(2))
+        assert store.index is old.index  # 기준 인덱스 복사 없음
+    new = mgr.current()
+    assert new.index is old.index and new._mapped and new.delta.ntotal == 2
+    assert old.search_one(unit_vecs(2, seed=1)[0], top_k=1)[0]["score"] < 0.999  # 이전 스냅샷은 그대로
+    assert new.search_one(unit_vecs(2, seed=1)[0], top_k=1)[0]["ref"] == "1000"
+
+
+def test_manager_folds_deltas_into_new_base(tmp_path, monkeypatch, unit_vecs, make_refs, make_manager):
+    monkeypatch.setattr(segments, "SEGMENT_MAX_DELTAS", 3)
+    monkeypatch.setattr(index_files, "INDEX_FILE_GRACE_SECONDS", 0)
+    mgr = make_manager()
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(100), make_refs(100))
+    for i in range(3):
+        with mgr.transaction() as store:
+            store.upsert_with_external_ids(unit_vecs(1, seed=10 + i), make_refs(1, start=2000 + i))
+    q = unit_vecs(3, seed=10)
+
+    for _ in range(500):
+        if not mgr.current().segments:
+            break
+        threading.Event().wait(0.01)
+    current = mgr.current()
+    manifest = read_manifest(str(tmp_path / "s.faiss"))
+    assert manifest["segments"] == [] and manifest["files"]["index"] == f"s.faiss.v{manifest['version']}"
+    assert current.delta is None and current.ntotal == 103 and current.index.ntotal == 103
+    assert current.search_one(q[0], top_k=1)[0]["ref"] == "2000"
+    # 합쳐진 델타는 직전 버전(교체 중인 워커용)만 남고 정리됨
+    assert [n for n in os.listdir(tmp_path) if n.endswith(".seg.npz")] == [f"s.faiss.v{manifest['version'] - 1}.seg.npz"]
+
+
+def test_empty_base_with_delta_rows_serves_batched_and_filtered_search(tmp_path, unit_vecs, make_refs, make_store):
+    # 빈 기준 세그먼트 게시 후 추가분은 전부 델타 → 쿼리 20개 이상(BLAS 경로)/필터 검색도 기준 인덱스는 건너뜀
+    store = make_store(**CFG)
+    store.save()
+    assert store.index.ntotal == 0
+    store.upsert_with_external_ids(unit_vecs(50), make_refs(50), metadata=_meta(50))
+    assert store.index.ntotal == 0 and store.delta.ntotal == 50
+
+    q = unit_vecs(50)[:25]
+    assert [row[0]["ref"] for row in store.search(q, top_k=3)] == make_refs(25)
+    for row in store.search(q, top_k=5, flt=SearchFilter(region="서울")):
+        assert row and all(store.meta.get(np.asarray([int(h["ref"])]))[0][0] == "서울" for h in row)
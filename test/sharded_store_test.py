@@ -0,0 +1,128 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_factory import IndexConfig
+from api.embedding.index_files import read_manifest
+from api.embedding.metadata import NO_END, SearchFilter
+from api.embedding.sharded_store import ShardedFaissStore
+from api.embedding.store_manager import StoreManager
+
+REF_START = 170000
+REGIONS = ["서울", "경기", "부산", "대구", "전국"]
+
+
+def _rows(n):
+    end = (date(2099, 1, 1) - date(1970, 1, 1)).days
+    return [(REGIONS[i % 5], 0, 200, i % 3 != 0, end + 365 * (i % 4) if i % 7 else NO_END) for i in range(n)]
+
+
+@pytest.fixture
+def fill(unit_vecs, make_refs):
+    def fill(store, n=300):
+        store.load()
+        store.upsert_with_external_ids(unit_vecs(n), make_refs(n, REF_START),
+                                       content_hashes=[f"h{i}" for i in range(n)], metadata=_rows(n))
+        return store
+    return fill
+
+
+def _cfg():
+    return IndexConfig(exact_threshold=10**6)
+
+
+@pytest.mark.parametrize("shard_by", ["hash", "region", "year"])
+def test_sharded_search_matches_single_store(tmp_path, shard_by, dim, fill, unit_vecs):
+    # 샤드별 top-k 병합 결과 = 단일 인덱스 결과 (필터 포함)
+    single = fill(FaissStore(str(tmp_path / "one.faiss"), dim, config=_cfg()))
+    sharded = fill(ShardedFaissStore(str(tmp_path / "s.faiss"), dim, shards=4, shard_by=shard_by, config=_cfg()))
+    assert sharded.ntotal == single.ntotal == 300
+    assert sum(s.ntotal > 0 for s in sharded.shards) > 1
+
+    q = unit_vecs(5, seed=9)
+    for flt in (None, SearchFilter(region="부산", recruiting_only=True)):
+        assert sharded.search(q, top_k=20, flt=flt) == single.search(q, top_k=20, flt=flt)
+    assert sharded.search_one(q[0], top_k=7) == single.search_one(q[0], top_k=7)
+
+
+@pytest.mark.parametrize("shard_by", ["hash", "region"])
+def test_upsert_remove_and_metadata_reach_owning_shard(tmp_path, shard_by, dim, fill, unit_vecs, make_refs):
+    store = fill(ShardedFaissStore(str(tmp_path / "s.faiss"), dim, shards=3, shard_by=shard_by, config=_cfg()))
+    refs = make_refs(300, REF_START)
+
+    # 지역이 바뀐 채로 다시 임베딩 → 이전 샤드에서 빠지고 한 곳에만 남음
+    row = ("제주", 0, 200, 1, NO_END)
+    store.upsert_with_external_ids(unit_vecs(1, seed=5), [refs[0]], content_hashes=["new"], metadata=[row])
+    assert store.ntotal == 300
+    assert sum(s.hashes.get(refs[0]) is not None for s in store.shards) == 1
+    assert store.hashes.unchanged([refs[0], refs[1]], ["new", "h1"]) == [True, True]
+    assert store.search_one(unit_vecs(1, seed=5)[0], top_k=1)[0]["ref"] == refs[0]
+
+    store.update_metadata([refs[1]], [("부산", 0, 200, 0, NO_END)])
+    ids = np.asarray([int(refs[0]), int(refs[1])])
+    assert store.meta.changed(ids, [row, ("부산", 0, 200, 0, NO_END)]) == [False, False]
+    assert int(refs[1]) in store.meta.excluded_ids(SearchFilter(recruiting_only=True))
+
+    assert store.remove_by_external_ids(refs[:10]) == 10
+    assert store.ntotal == 290
+    hits = {r["ref"] for row in store.search(unit_vecs(300), top_k=5) for r in row}
+    assert hits.isdisjoint(refs[:10])
+
+
+def test_manager_publishes_shard_layout_and_other_worker_reloads(tmp_path, dim, unit_vecs, make_refs, make_manager):
+    path = str(tmp_path / "supports.faiss")
+    writer = make_manager(path, shards=4)
+    with writer.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(100), make_refs(100, REF_START), metadata=_rows(100))
+    manifest = read_manifest(path)
+    assert manifest["shards"] == 4 and manifest["shard_by"] == "hash"
+    assert manifest["ntotal"] == 100 and manifest["dim"] == dim
+
+    # 한 샤드만 바뀐 쓰기 → 나머지 샤드는 다시 저장하지 않음
+    before = read_manifest(path)["shard_versions"]
+    with writer.transaction() as store:
+        store.remove_by_external_ids([make_refs(100, REF_START)[0]])
+    after = read_manifest(path)["shard_versions"]
+    assert sum(a != b for a, b in zip(before, after)) == 1
+
+    # INDEX_SHARDS=1인 다른 워커도 저장된 구성대로 샤드로 열림
+    reader = StoreManager(index_path=path, dim_fn=lambda: pytest.fail("manifest 차원 사용"), reload_interval=0)
+    current = reader.current()
+    assert isinstance(current, ShardedFaissStore) and current.ntotal == 99
+    q = unit_vecs(3, seed=7)
+    assert current.search(q, top_k=10) == writer.current().search(q, top_k=10)
+
+
+def test_single_index_is_resharded_on_load_and_saved_on_next_write(tmp_path, unit_vecs, make_refs, make_manager):
+    path = str(tmp_path / "supports.faiss")
+    single = make_manager(path)
+    with single.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(120), make_refs(120, REF_START),
+                                       content_hashes=[f"h{i}" for i in range(120)], metadata=_rows(120))
+    expected = single.current().search(unit_vecs(4, seed=3), top_k=15)
+
+    sharded = make_manager(path, shards=3, shard_by="year")
+    current = sharded.current()
+    assert isinstance(current, ShardedFaissStore) and current.ntotal == 120
+    assert current.search(unit_vecs(4, seed=3), top_k=15) == expected
+    assert current.hashes.get(make_refs(120, REF_START)[5]) == "h5"
+    assert current.meta.get(np.asarray([int(make_refs(120, REF_START)[5])]))[0] == _rows(120)[5]
+
+    with sharded.transaction() as store:
+        store.remove_by_external_ids([make_refs(120, REF_START)[0]])
+    assert read_manifest(path)["shards"] == 3
+    reopened = make_manager(path, shards=3, shard_by="year")
+    assert reopened.current().ntotal == 119
+
+
+def test_shard_count_change_keeps_pool_used_by_in_flight_search(monkeypatch):
+    # 샤드 수가 바뀌어 더 큰 풀을 만들어도, 이전 스냅샷 검색이 이미 가져간 풀은 계속 작업을 받음
+    import api.embedding.sharded_store as sharded_store
+    monkeypatch.setattr(sharded_store, "INDEX_SHARD_THREADS", 0)
+    monkeypatch.setattr(sharded_store.os, "cpu_count", lambda: 64)
+    old = sharded_store._executor(3)
+    new = sharded_store._executor(7)
+    assert new is not old and sharded_store._executor(3) is old
+    assert list(old.map(lambda x: x * 2, range(3))) == [0, 2, 4]
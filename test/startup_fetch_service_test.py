@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+import api.services.startup_fetch_service as sfs
+from api.services import fetch_control
+from api.services.fetch_control import AimdLimiter, TokenBucket, backoff_delay
+from bench.fake_kstartup import FakeKStartup
+
+
+@pytest.fixture(autouse=True)
+def _fast_retries(monkeypatch):
+    # 테스트에서는 백오프/속도 제한을 짧게
+    monkeypatch.setattr(fetch_control, "FETCH_RATE", 0.0)
+    monkeypatch.setattr(fetch_control, "FETCH_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(fetch_control, "FETCH_BACKOFF_CAP", 0.05)
+    monkeypatch.setattr(fetch_control, "FETCH_TIMEOUT", 2.0)
+
+
+def _expected_refs(server):
+    return [str(it["pbanc_sn"]) for it in server.items if "민간" not in it["sprv_inst"]]
+
+
+def _fetch(server, **kw):
+    sfs.BASE_URL = server.url
+    return asyncio.run(sfs.fetch_startup_supports_async(**kw))
+
+
+def test_pipeline_streams_batches_while_crawling_and_returns_all_dtos():
+    calls = []
+
+    async def on_batch(dtos):
+        calls.append(("batch", len(dtos), server.requests))
+
+    with FakeKStartup(total=95, latency=0.01) as server:
+        dtos = _fetch(server, num_rows=10, on_batch=on_batch, embed_batch_size=20)
+        total_requests = server.requests
+
+    assert [d.external_ref for d in dtos] == _expected_refs(server)
+    assert sum(n for _, n, _ in calls) == len(dtos)
+    assert max(n for _, n, _ in calls) <= 20 + 10
+    assert calls[0][2] < total_requests  # 첫 묶음이 수집 도중에 전달됨 (수집과 임베딩이 겹침)
+
+
+def test_pipeline_keeps_fetching_when_embedding_stage_fails():
+    async def on_batch(dtos):
+        raise RuntimeError("embed failed")
+
+    with FakeKStartup(total=40, latency=0.0) as server:
+        dtos = _fetch(server, num_rows=10, on_batch=on_batch, embed_batch_size=5)
+    assert len(dtos) == len(_expected_refs(server))
+
+
+def test_transient_errors_are_retried_instead_of_ending_crawl_as_empty():
+    # 연속 두 페이지가 처음 두 번씩 503 → 예전에는 빈 배치 2번으로 수집이 끝났음
+    with FakeKStartup(total=200, latency=0.0, fail_pages={3: 2, 4: 2, 5: 2}, error_rate=0.1) as server:
+        dtos = _fetch(server, num_rows=10)
+    assert [d.external_ref for d in dtos] == _expected_refs(server)
+    assert server.errors > 0
+
+
+def test_concurrency_backs_off_on_429_and_all_pages_are_collected():
+    with FakeKStartup(total=300, latency=0.02, max_in_flight=3) as server:
+        dtos = _fetch(server, num_rows=10, batch_concurrency=8)
+    assert server.throttled > 0
+    assert [d.external_ref for d in dtos] == _expected_refs(server)
+
+
+def test_page_size_is_tuned_to_server_cap():
+    with FakeKStartup(total=250, latency=0.0, max_per_page=50) as server:
+        dtos = _fetch(server)  # num_rows 자동: 100 요청 → 서버 상한 50으로 맞춤
+        requests = server.requests
+    assert [d.external_ref for d in dtos] == _expected_refs(server)
+    assert requests == 5
+
+
+def test_marker_mode_stops_at_after_external_ref():
+    with FakeKStartup(total=120, latency=0.0) as server:
+        marker = str(server.items[57]["pbanc_sn"])
+        dtos = _fetch(server, num_rows=10, after_external_ref=marker)
+    assert [d.external_ref for d in dtos] == [r for r in _expected_refs(server) if int(r) > int(marker)]
+
+
+def test_aimd_limiter_and_backoff():
+    lim = AimdLimiter(initial=4, min_limit=1, max_limit=8)
+    lim.on_overload()
+    assert lim.limit == 2
+    for _ in range(10):
+        lim.on_success()
+    assert 2 < lim.limit <= 8
+    assert backoff_delay(0, "1.5", base=0.1, cap=5) == 1.5
+    assert 0 <= backoff_delay(3, None, base=0.1, cap=0.5) <= 0.5
+
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=1)
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        for _ in range(6):
+            await bucket.acquire()
+        return loop.time() - t0
+
+    assert asyncio.run(run()) >= 0.09  # 첫 1개 이후 5개 × 20ms
+
+
+@pytest.mark.parametrize("marker_pos", [3, 57, 118, 260])
+def test_speculative_marker_scan_matches_sequential_scan(marker_pos):
+    with FakeKStartup(total=300, latency=0.0, error_rate=0.05) as server:
+        marker = str(server.items[marker_pos]["pbanc_sn"])
+        seq = _fetch(server, num_rows=10, after_external_ref=marker, speculative=False)
+        seq_requests = server.requests
+        spec = _fetch(server, num_rows=10, after_external_ref=marker, speculative=True)
+    assert [d.external_ref for d in spec] == [d.external_ref for d in seq]
+    assert [d.external_ref for d in spec] == [r for r in _expected_refs(server) if int(r) > int(marker)]
+    assert seq_requests > 0
+
+
+def test_speculative_scan_overlaps_requests_and_cancels_after_marker():
+    with FakeKStartup(total=400, latency=0.05) as server:
+        marker = str(server.items[205]["pbanc_sn"])  # 21번째 페이지
+        dtos = _fetch(server, num_rows=10, after_external_ref=marker, speculative=True)
+        peak = server.peak_in_flight
+    assert len(dtos) == len([r for r in _expected_refs(server) if int(r) > int(marker)])
+    assert peak > 1
+
+
+def test_vanished_marker_falls_back_to_numeric_cut():
+    with FakeKStartup(total=200, latency=0.0) as server:
+        marker = str(server.items[77]["pbanc_sn"])
+        del server.items[77]  # 상류에서 마커 공고 삭제
+        for speculative in (False, True):
+            dtos = _fetch(server, num_rows=10, after_external_ref=marker, speculative=speculative)
+            assert [d.external_ref for d in dtos] == [r for r in _expected_refs(server) if int(r) > int(marker)]
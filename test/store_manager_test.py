@@ -0,0 +1,127 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_files import read_manifest
+from api.embedding.store_manager import StoreManager
+
+
+@pytest.fixture
+def dim():
+    return 8
+
+
+@pytest.fixture
+def manager(tmp_path, make_manager):
+    def make(**kw):
+        return make_manager(tmp_path / "supports.faiss", **kw)
+    return make
+
+
+def test_transaction_swaps_in_new_snapshot_and_keeps_old_one_intact(tmp_path, unit_vecs, manager):
+    # 트랜잭션 커밋 후 새 스냅샷으로 교체, 이전 스냅샷을 잡고 있던 검색은 그대로
+    mgr = manager()
+    old = mgr.current()
+    assert old.ntotal == 0
+
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(3), ["101", "102", "103"])
+        assert mgr.current() is old  # 커밋 전에는 기존 스냅샷 유지
+
+    assert old.ntotal == 0
+    assert mgr.current().ntotal == 3
+    assert mgr.version == 1
+    assert read_manifest(str(tmp_path / "supports.faiss"))["version"] == 1
+
+
+def test_transaction_applies_deletes_and_upserts_with_single_save(monkeypatch, unit_vecs, manager):
+    mgr = manager()
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(3), ["101", "102", "103"])
+
+    saves = []
+    orig_save = FaissStore.save
+    monkeypatch.setattr(FaissStore, "save", lambda self: (saves.append(1), orig_save(self)))
+
+    with mgr.transaction() as store:
+        store.remove_by_external_ids(["101"])
+        store.upsert_with_external_ids(unit_vecs(1, seed=1), ["104"])
+
+    assert len(saves) == 1
+    refs = {h["ref"] for h in mgr.current().search(unit_vecs(1, seed=1), top_k=10)[0]}
+    assert refs == {"102", "103", "104"}
+
+
+def test_failed_transaction_does_not_swap(tmp_path, unit_vecs, manager):
+    # 예외가 나면 복사본은 버리고 서빙 스냅샷/버전 유지
+    mgr = manager()
+    before = mgr.current()
+    with pytest.raises(RuntimeError):
+        with mgr.transaction() as store:
+            store.upsert_with_external_ids(unit_vecs(2), ["201", "202"])
+            raise RuntimeError("boom")
+    assert mgr.current() is before
+    assert mgr.version == 0
+    assert read_manifest(str(tmp_path / "supports.faiss")) is None
+
+
+def test_picks_up_version_published_by_another_worker(unit_vecs, manager):
+    # 다른 워커(다른 StoreManager)가 게시한 버전을 주기 확인으로 반영
+    reader = manager(reload_interval=0.01)
+    writer = manager()
+    assert reader.current().ntotal == 0
+
+    with writer.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(2), ["301", "302"])
+
+    import time
+    time.sleep(0.02)
+    assert reader.current().ntotal == 2
+    assert reader.current().version == writer.current().version
+
+
+def test_index_opens_with_manifest_dim_without_loading_model(tmp_path, dim, unit_vecs, make_manager):
+    path = str(tmp_path / "supports.faiss")
+    mgr = make_manager(path, model="m1")
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(3), ["101", "102", "103"])
+    manifest = read_manifest(path)
+    assert (manifest["dim"], manifest["model"]) == (dim, "m1")
+
+    def no_model():
+        raise AssertionError("모델 로드 불필요")
+
+    # 재시작: manifest의 차원으로 바로 열림
+    again = StoreManager(index_path=path, dim_fn=no_model, reload_interval=0, model="m1")
+    assert again.current().ntotal == 3 and again.current().model == "m1"
+
+    # 다른 모델로 만든 인덱스면 모델 기준 차원 확인
+    calls = []
+    other = StoreManager(index_path=path, dim_fn=lambda: calls.append(1) or dim, reload_interval=0, model="m2")
+    assert other.current().ntotal == 3 and calls == [1]
+
+
+def _write_in_worker(path, dim, start, n):
+    # 별도 워커 프로세스: 작은 트랜잭션 여러 번 (매번 최신 버전 확인 → 저장 → 게시)
+    mgr = StoreManager(index_path=path, dim_fn=lambda: dim, reload_interval=0)
+    rng = np.random.default_rng(start)
+    for i in range(start, start + n, 10):
+        with mgr.transaction() as store:
+            store.upsert_with_external_ids(rng.standard_normal((10, dim)).astype("float32"),
+                                           [str(r) for r in range(i, i + 10)])
+
+
+def test_concurrent_worker_processes_do_not_lose_writes(tmp_path, dim, make_manager):
+    # 두 프로세스가 같은 인덱스에 번갈아 쓰기 → 프로세스 간 파일 락이 없으면 같은 버전을 덮어써서 쓰기가 사라짐
+    path = str(tmp_path / "supports.faiss")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_write_in_worker, args=(path, dim, start, 150)) for start in (1000, 5000)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(120)
+    assert [p.exitcode for p in procs] == [0, 0]
+    assert read_manifest(path)["ntotal"] == 300
+    assert make_manager(path).current().ntotal == 300
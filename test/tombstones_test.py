@@ -0,0 +1,129 @@
+import threading
+
+import numpy as np
+import pytest
+
+import api.embedding.faiss_store as faiss_store
+import api.embedding.tombstones as tombstones
+from api.embedding.index_factory import index_kind
+from api.embedding.index_files import read_manifest
+from api.embedding.metadata import SearchFilter
+
+CFG = dict(exact_threshold=1, hnsw_m=8, ef_search=128)
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_upsert_marks_old_positions_and_search_sees_only_live(index_type, unit_vecs, make_refs, make_store):
+    store = make_store(index_type=index_type, **CFG)
+    old = unit_vecs(200)
+    store.upsert_with_external_ids(old, make_refs(200))
+    assert index_kind(store.index) == index_type
+
+    new = unit_vecs(50, seed=1)
+    store.upsert_with_external_ids(new, make_refs(50))  # 같은 ID 다시 넣기 → 예전 위치는 표시만
+    assert store.tomb.count == 50 and store.index.ntotal == 250 and store.ntotal == 200
+
+    # 바뀐 벡터로 찾으면 자기 자신, 예전 벡터로는 예전 위치가 나오지 않음 (top-k는 그대로)
+    assert [row[0]["ref"] for row in store.search(new[:20], top_k=1)] == make_refs(20)
+    for row in store.search(old[:50], top_k=10):
+        assert len(row) == 10
+    assert store.search_one(old[0], top_k=1)[0]["score"] < 0.999
+
+    assert store.remove_by_external_ids(make_refs(10, start=1100) + ["999999"]) == 10
+    assert store.ntotal == 190
+    refs = {h["ref"] for row in store.search(unit_vecs(200)[100:110], top_k=5) for h in row}
+    assert not refs & set(make_refs(10, start=1100))
+
+
+def test_tombstones_survive_reload_and_combine_with_filter(tmp_path, unit_vecs, make_refs, make_store):
+    store = make_store(**CFG)
+    vecs = unit_vecs(100)
+    store.upsert_with_external_ids(vecs, make_refs(100), metadata=[("서울" if i % 2 else "부산", 0, 200, 1, 2 ** 31 - 1)
+                                                               for i in range(100)])
+    store.remove_by_external_ids(make_refs(10))
+    store.save()
+    assert "tomb" in read_manifest(str(tmp_path / "s.faiss"))["files"]
+
+    again = make_store(**CFG)
+    assert again.tomb.count == 10 and again.ntotal == 90
+    hits = again.search(vecs[:20], top_k=100, flt=SearchFilter(region="서울"))
+    for row in hits:
+        refs = [int(h["ref"]) for h in row]
+        assert len(refs) == 45 and all(r % 2 and r >= 1010 for r in refs)
+
+    # 압축하면 표시가 사라지고 결과는 같음
+    assert again.compact() == 10
+    assert again.tomb.count == 0 and again.index.ntotal == 90
+    assert again.search(vecs[:20], top_k=100, flt=SearchFilter(region="서울")) == hits
+
+
+def test_manager_compacts_in_background_past_threshold(monkeypatch, unit_vecs, make_refs, make_manager):
+    monkeypatch.setattr(tombstones, "TOMBSTONE_COMPACT_MIN", 5)
+    monkeypatch.setattr(tombstones, "TOMBSTONE_COMPACT_RATIO", 0.2)
+    mgr = make_manager()
+    with mgr.transaction() as store:
+        store.upsert_with_external_ids(unit_vecs(40), make_refs(40))
+    with mgr.transaction() as store:
+        store.remove_by_external_ids(make_refs(4))  # 4/40 → 압축 안 함
+    assert mgr.current().tomb.count == 4
+    with mgr.transaction() as store:
+        store.remove_by_external_ids(make_refs(6, start=1004))  # 10/40 → 백그라운드 압축
+
+    for _ in range(500):
+        if mgr.current().tomb.count == 0:
+            break
+        threading.Event().wait(0.01)
+    assert mgr.current().tomb.count == 0 and mgr.current().ntotal == 30
+
+
+def test_tombstones_can_be_disabled(monkeypatch, unit_vecs, make_refs, make_store):
+    monkeypatch.setattr(faiss_store, "TOMBSTONE_DELETES", False)
+    store = make_store(**CFG)
+    store.upsert_with_external_ids(unit_vecs(20), make_refs(20))
+    store.upsert_with_external_ids(unit_vecs(5, seed=1), make_refs(5))
+    assert store.tomb.count == 0 and store.index.ntotal == 20
+
+
+def test_overfetch_and_selector_search_agree(monkeypatch, unit_vecs, make_refs, make_store):
+    store = make_store(**CFG)
+    vecs = unit_vecs(300)
+    store.upsert_with_external_ids(vecs, make_refs(300), metadata=[("서울" if i % 10 else "부산", 0, 200, 1, 2 ** 31 - 1)
+                                                               for i in range(300)])
+    store.upsert_with_external_ids(unit_vecs(30, seed=3), make_refs(30, start=1100))
+    flt = SearchFilter(region="서울")
+    results = {}
+    for ratio in (0.0, 1.0):  # 0: 항상 선택자, 1: 제외 비율과 무관하게 더 뽑아서 거르기
+        monkeypatch.setattr(faiss_store, "SEARCH_OVERFETCH_MAX_RATIO", ratio)
+        results[ratio] = store.search(vecs[:30], top_k=20, flt=flt)
+    # BLAS/순차 내적은 마지막 자리 오차만 다름 (점수가 거의 같은 후보는 순서가 바뀔 수 있어 점수로 비교)
+    assert np.allclose([[h["score"] for h in row] for row in results[0.0]],
+                       [[h["score"] for h in row] for row in results[1.0]], atol=1e-5)
+    for row in results[1.0]:
+        refs = [int(h["ref"]) for h in row]
+        # 다시 넣은 1100~1129는 메타데이터 없이 들어가서 필터 통과
+        assert len(refs) == 20 and all(r % 10 or 1100 <= r < 1130 for r in refs)
+
+
+def test_delete_finds_positions_without_scanning_the_id_map(monkeypatch, unit_vecs, make_refs, make_store):
+    # 위치 조회는 정렬 배열 searchsorted → 삭제할 때 전체 ID 맵을 np.isin으로 훑지 않음
+    monkeypatch.setattr(faiss_store, "SEGMENT_DELTAS", False)  # 추가도 기준 인덱스로 (위치 배열 갱신 확인)
+    store = make_store(**CFG)
+    store.upsert_with_external_ids(unit_vecs(200), make_refs(200))
+    store.upsert_with_external_ids(unit_vecs(20, seed=1), make_refs(20, start=1010))  # 같은 ID의 예전 위치가 남음
+    store.upsert_with_external_ids(unit_vecs(10, seed=2), make_refs(10, start=5000))
+
+    id_map = store._id_map_view()
+    want = make_refs(15, start=1005) + make_refs(3, start=5000) + ["999999"]
+    ids = np.asarray([int(r) for r in want])
+    expected = np.flatnonzero(np.isin(id_map, ids) & ~store.tomb.dead[:len(id_map)])
+
+    def no_isin(*a, **kw):
+        raise AssertionError("전체 ID 맵 스캔")
+
+    monkeypatch.setattr(tombstones.np, "isin", no_isin)
+    assert store.tomb.live_positions(id_map, ids).tolist() == expected.tolist()
+    monkeypatch.undo()
+    assert store.remove_by_external_ids(want) == 18
+    assert store.ntotal == 192
+    refs = {h["ref"] for row in store.search(unit_vecs(20, seed=1), top_k=3) for h in row}
+    assert not refs & set(want)
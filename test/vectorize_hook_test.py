@@ -0,0 +1,125 @@
+import numpy as np
+
+from api.dto.startup_dto import CreateStartupResponseDTO
+from api.embedding.faiss_store import FaissStore
+from api.embedding.index_files import read_manifest
+from api.embedding.store_manager import StoreManager
+from api.embedding.content_hashes import content_hash
+from api.embedding.vectorizer import MODEL_NAME, embed_corpus, model_identity, plan_token_batches
+import api.services.vectorize_hook as vh
+
+DIM = 8
+
+
+def _dto(ref, title, details="본문"):
+    return CreateStartupResponseDTO.model_construct(external_ref=ref, title=title, support_details=details)
+
+
+def _setup(tmp_path, monkeypatch):
+    # 실제 인덱스 파일 + 텍스트 기반 가짜 임베딩 (호출된 텍스트 기록)
+    mgr = StoreManager(index_path=str(tmp_path / "supports.faiss"), dim_fn=lambda: DIM, reload_interval=0)
+    monkeypatch.setattr(vh, "get_store_manager", lambda: mgr)
+    monkeypatch.setattr(vh, "get_store", mgr.current)
+    monkeypatch.setattr(vh, "INDEX_PATH", str(tmp_path / "supports.faiss"))
+    calls = []
+
+    def fake_embed(texts, batch_size=64):
+        calls.append(list(texts))
+        rng = np.random.default_rng(len(calls))
+        return rng.standard_normal((len(texts), DIM)).astype("float32")
+
+    monkeypatch.setattr(vh, "count_tokens", lambda texts: np.array([len(t.split()) + 2 for t in texts]))
+    monkeypatch.setattr(vh, "embed_texts", fake_embed)
+    return mgr, calls
+
+
+def test_unchanged_announcements_are_not_re_embedded(tmp_path, monkeypatch):
+    mgr, calls = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A"), _dto("102", "B")])
+    assert len(calls) == 1 and len(calls[0]) == 2
+    version = mgr.version
+
+    # 같은 내용 재수집 → 임베딩/저장 모두 생략
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A"), _dto("102", "B")])
+    assert len(calls) == 1
+    assert mgr.version == version
+
+    # 바뀐 공고 + 새 공고만 임베딩
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A"), _dto("102", "B 수정"), _dto("103", "C")])
+    assert calls[-1] == ["B 수정 본문", "C 본문"]
+    assert mgr.current().ntotal == 3
+
+
+def test_hash_table_is_published_with_index_and_survives_reload(tmp_path, monkeypatch):
+    mgr, calls = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A")])
+    assert "hashes" in read_manifest(str(tmp_path / "supports.faiss"))["files"]
+
+    # 재시작(새 프로세스) 가정: 디스크에서 다시 로드해도 해시 유지
+    mgr2, calls2 = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A")])
+    assert calls2 == []
+
+
+def test_expired_ref_drops_hash_so_it_is_embedded_again(tmp_path, monkeypatch):
+    mgr, calls = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A")])
+    vh.vectorize_and_upsert_from_dtos([], expired_refs=["101"])
+    assert mgr.current().hashes.get("101") is None
+
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A")])
+    assert len(calls) == 2
+    assert mgr.current().ntotal == 1
+
+
+def test_skip_is_rechecked_against_transaction_copy(tmp_path, monkeypatch):
+    # 서빙 스냅샷은 변경 없다고 봤지만 다른 워커가 그 사이 지운 공고 → 트랜잭션 안에서 다시 임베딩
+    mgr, calls = _setup(tmp_path, monkeypatch)
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A"), _dto("102", "B")])
+    other = StoreManager(index_path=str(tmp_path / "supports.faiss"), dim_fn=lambda: DIM, reload_interval=0)
+    with other.transaction() as store:
+        store.remove_by_external_ids(["101"])
+    assert mgr.current().hashes.get("101") is not None  # 아직 이전 스냅샷
+
+    vh.vectorize_and_upsert_from_dtos([_dto("101", "A"), _dto("102", "B"), _dto("103", "C")])
+    assert calls[1:] == [["C 본문"], ["A 본문"]]
+    current = mgr.current()
+    assert current.ntotal == 3 and current.hashes.get("101") is not None
+
+
+def test_model_identity_covers_model_source_and_backend():
+    # 기본 구성은 예전 manifest/해시와 같은 값, 로컬 모델이나 다른 백엔드면 다른 값 → 재색인
+    assert model_identity(MODEL_NAME, "torch") == MODEL_NAME
+    ids = {model_identity(MODEL_NAME, "torch"), model_identity(MODEL_NAME, "onnx-int8"),
+           model_identity("/models/minilm/", "torch"), model_identity("/models/minilm", "onnx")}
+    assert len(ids) == 4
+    assert model_identity("/models/minilm/", "torch") == model_identity("/models/minilm", "torch")
+    assert len({content_hash("공고 본문", m) for m in ids}) == 4
+
+
+def test_token_batches_group_by_length_within_budget():
+    lengths = [5, 200, 12, 256, 7, 30, 256, 9]
+    batches = plan_token_batches(lengths, token_budget=512, max_batch=4)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        padded = max(lengths[i] for i in b) * len(b)
+        assert padded <= 512 or len(b) == 1
+        assert len(b) <= 4
+    # 긴 것부터 비슷한 길이끼리, 짧은 글은 max_batch까지 크게 묶임
+    assert [b.tolist() for b in batches] == [[3, 6], [1, 5], [2, 7, 4, 0]]
+
+
+def test_embed_corpus_returns_vectors_in_input_order():
+    texts = [" ".join(["w"] * n) for n in (3, 40, 1, 17, 40, 2, 9)]
+    seen = []
+
+    def encode(batch, batch_size=64):
+        seen.append((len(batch), batch_size))
+        return np.array([[len(t.split()), 0.0] for t in batch], dtype="float32")
+
+    done = []
+    vecs = embed_corpus(texts, encode=encode, lengths=[len(t.split()) for t in texts],
+                        progress=lambda d, total: done.append((d, total)), token_budget=80, max_batch=8)
+    assert vecs[:, 0].tolist() == [len(t.split()) for t in texts]
+    assert [n for n, _ in seen] == [b for _, b in seen] and len(seen) > 1
+    assert done[-1] == (len(texts), len(texts))
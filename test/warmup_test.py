@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import numpy as np
+
+import api.services.warmup as wu
+from api.embedding.faiss_store import FaissStore
+
+DIM = 8
+
+
+def _store(tmp_path, n=20):
+    v = np.random.default_rng(0).standard_normal((n, DIM)).astype("float32")
+    store = FaissStore(index_path=str(tmp_path / "s.faiss"), dim=DIM)
+    store.load()
+    store.upsert_with_external_ids(v, [str(100 + i) for i in range(n)])
+    return store
+
+
+def test_warmup_encodes_and_searches_before_ready(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    searched = []
+    search = store.search
+    monkeypatch.setattr(store, "search", lambda q, **kw: searched.append(len(q)) or search(q, **kw))
+    monkeypatch.setattr(wu, "get_store", lambda: store)
+    monkeypatch.setattr(wu, "embed_texts", lambda texts: np.ones((len(texts), DIM), dtype="float32"))
+
+    w = wu.Warmup()
+    assert w.state()["status"] == wu.WARMING and not w.ready
+    w.start()
+    assert w.wait(5)
+    assert searched == [1, len(wu._QUERIES), len(wu._QUERIES)]
+    assert {"index_load_ms", "model_load_ms", "encode_ms", "search_ms", "total_ms"} <= set(w.state()["timings_ms"])
+
+
+def test_failed_warmup_is_not_ready_and_ready_endpoint_reports_it(tmp_path, monkeypatch):
+    import main
+
+    def broken(texts):
+        raise OSError("model not found")
+
+    monkeypatch.setattr(wu, "get_store", lambda: _store(tmp_path))
+    monkeypatch.setattr(wu, "embed_texts", broken)
+    w = wu.Warmup()
+    monkeypatch.setattr(main, "get_warmup", lambda: w)
+
+    resp = asyncio.run(main.ready())
+    assert resp.status_code == 503 and json.loads(resp.body)["status"] == wu.WARMING
+    w.run()
+    resp = asyncio.run(main.ready())
+    assert resp.status_code == 503 and "model not found" in json.loads(resp.body)["error"]
+    assert asyncio.run(main.health()) == {"status": "ok", "warmup": {"status": wu.FAILED, "attempts": 1}}
+
+    # 워밍업을 끄면 인덱스만 열고 준비 완료
+    w = wu.Warmup(enabled=False)
+    monkeypatch.setattr(main, "get_warmup", lambda: w)
+    w.run()
+    assert asyncio.run(main.ready()).status_code == 200
+
+
+def test_failed_warmup_retries_with_backoff_until_ready(tmp_path, monkeypatch):
+    # 일시 장애(모델 다운로드 실패 등) 뒤에는 재시작 없이 다시 시도해서 준비 완료
+    calls = []
+
+    def flaky(texts):
+        calls.append(len(texts))
+        if len(calls) <= 2:
+            raise OSError("hub unreachable")
+        return np.ones((len(texts), DIM), dtype="float32")
+
+    monkeypatch.setattr(wu, "get_store", lambda: _store(tmp_path))
+    monkeypatch.setattr(wu, "embed_texts", flaky)
+    w = wu.Warmup(retry_base=0.01, retry_max=0.02)
+    w.start()
+    assert w.wait(5)
+    state = w.state()
+    assert state["status"] == wu.READY and state["attempts"] == 3 and "error" not in state